@@ -0,0 +1,122 @@
+"""
+绩效指标数值内核：回撤、滚动均值/标准差、Beta 回归。
+安装 numba 时走 njit 编译的单趟循环，否则退化为等价的 numpy 向量化实现；输入均为已 dropna 的数组。
+float32 输入保持原精度读取（内存带宽减半），累加一律在 float64 中进行。
+"""
+import numpy as np
+
+from utils.jit import HAS_NUMBA, njit, register_warmup
+
+
+@njit
+def _drawdown_nb(w):
+    out = np.empty(w.shape[0])
+    peak = -np.inf
+    for i in range(w.shape[0]):
+        if w[i] > peak:
+            peak = w[i]
+        out[i] = (w[i] - peak) / peak
+    return out
+
+
+@njit
+def _rolling_mean_std_nb(r, win):
+    n = r.shape[0]
+    mean = np.full(n, np.nan)
+    std = np.full(n, np.nan)
+    for i in range(win - 1, n):
+        s = 0.0
+        for j in range(i - win + 1, i + 1):
+            s += r[j]
+        m = s / win
+        ss = 0.0
+        for j in range(i - win + 1, i + 1):
+            d = r[j] - m
+            ss += d * d
+        mean[i] = m
+        std[i] = np.sqrt(ss / (win - 1))
+    return mean, std
+
+
+@njit
+def _beta_alpha_nb(s, b):
+    n = s.shape[0]
+    ms = 0.0
+    mb = 0.0
+    for i in range(n):
+        ms += s[i]
+        mb += b[i]
+    ms /= n
+    mb /= n
+    cov = 0.0
+    var = 0.0
+    for i in range(n):
+        cov += (s[i] - ms) * (b[i] - mb)
+        var += (b[i] - mb) * (b[i] - mb)
+    beta = cov / var if var != 0 else 0.0
+    ss_res = 0.0
+    ss_tot = 0.0
+    for i in range(n):
+        e = s[i] - beta * b[i]
+        ss_res += e * e
+        ss_tot += (s[i] - ms) * (s[i] - ms)
+    r2 = 1.0 - ss_res / ss_tot if ss_tot > 0 else 0.0
+    return beta, ms - beta * mb, r2
+
+
+def _as_float(x):
+    x = np.ascontiguousarray(x)
+    return x if x.dtype in (np.float32, np.float64) else x.astype(np.float64)
+
+
+def drawdown(wealth):
+    """净值序列 → 回撤序列 (W - 历史峰值) / 历史峰值（<=0）。"""
+    w = _as_float(wealth)
+    if HAS_NUMBA:
+        return _drawdown_nb(w)
+    peak = np.maximum.accumulate(w)
+    return (w - peak) / peak
+
+
+def max_drawdown(wealth):
+    """最大回撤（正数比例，如 0.25 表示 25%）；空序列返回 0。"""
+    if len(wealth) == 0:
+        return 0.0
+    return float(-drawdown(wealth).min())
+
+
+def rolling_mean_std(rets, window):
+    """滚动均值与样本标准差（ddof=1，同 pandas rolling），前 window-1 个位置为 NaN。"""
+    r = _as_float(rets)
+    if HAS_NUMBA:
+        return _rolling_mean_std_nb(r, int(window))
+    mean = np.full(len(r), np.nan)
+    std = np.full(len(r), np.nan)
+    if len(r) >= window:
+        view = np.lib.stride_tricks.sliding_window_view(r, window)
+        mean[window - 1:] = view.mean(axis=1, dtype=np.float64)
+        std[window - 1:] = view.std(axis=1, ddof=1, dtype=np.float64)
+    return mean, std
+
+
+def beta_alpha(strat, bench):
+    """
+    对齐后的策略/基准日收益 → (beta, alpha_daily, r_squared)。
+    beta = cov/var；r_squared 沿用 1 - Σ(s - beta·b)² / Σ(s - mean)² 的口径。
+    """
+    s = _as_float(strat)
+    b = _as_float(bench)
+    if HAS_NUMBA:
+        return _beta_alpha_nb(s, b)
+    s, b = s.astype(np.float64, copy=False), b.astype(np.float64, copy=False)
+    var = ((b - b.mean()) ** 2).sum()
+    beta = ((s - s.mean()) * (b - b.mean())).sum() / var if var != 0 else 0.0
+    ss_tot = ((s - s.mean()) ** 2).sum()
+    r2 = 1 - ((s - beta * b) ** 2).sum() / ss_tot if ss_tot > 0 else 0.0
+    return float(beta), float(s.mean() - beta * b.mean()), float(r2)
+
+
+_SAMPLE = np.linspace(0.01, -0.01, 8)
+register_warmup(_drawdown_nb, np.cumprod(1 + _SAMPLE))
+register_warmup(_rolling_mean_std_nb, _SAMPLE, 4)
+register_warmup(_beta_alpha_nb, _SAMPLE, _SAMPLE[::-1].copy())
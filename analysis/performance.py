@@ -2,9 +2,13 @@ import pandas as pd
 import numpy as np
 import backtrader as bt
 
+from ._kernels import beta_alpha, drawdown, max_drawdown, rolling_mean_std
+
 # 年化因子（日频）
 ANNUALIZE = np.sqrt(252)
 ANNUALIZE_MEAN = 252
+# 仅用于绘图的派生序列（净值、回撤、滚动指标）存为 float32；指标本身仍按 float64 计算
+PLOT_DTYPE = np.float32
 
 
 def report_from_returns(rets):
@@ -20,10 +24,7 @@ def report_from_returns(rets):
     cagr = (1 + total_ret) ** (1 / years) - 1 if years > 0 else 0
     volatility = rets.std() * np.sqrt(252) if len(rets) > 1 else 0
     sharpe = (rets.mean() / rets.std() * np.sqrt(252)) if rets.std() > 0 else 0
-    cum = (1 + rets).cumprod()
-    running_max = cum.cummax()
-    drawdown_pct = (cum - running_max) / running_max
-    max_dd = drawdown_pct.min() * 100
+    max_dd = -max_drawdown((1 + rets).cumprod().values) * 100
     metrics = {
         "年化收益率 (CAGR)": f"{cagr:.2%}",
         "夏普比率 (Sharpe)": f"{sharpe:.2f}",
@@ -130,8 +131,9 @@ def compute_rolling_metrics(rets, window=252):
     rets.index = pd.to_datetime(rets.index)
     if len(rets) < window:
         return pd.Series(dtype=float), pd.Series(dtype=float)
-    roll_mean = rets.rolling(window).mean()
-    roll_std = rets.rolling(window).std()
+    mean, std = rolling_mean_std(rets.values, window)
+    roll_mean = pd.Series(mean, index=rets.index)
+    roll_std = pd.Series(std, index=rets.index)
     rolling_vol = (roll_std * ANNUALIZE).dropna()
     rolling_sharpe = (roll_mean / roll_std * ANNUALIZE).replace([np.inf, -np.inf], np.nan).dropna()
     return rolling_sharpe, rolling_vol
@@ -151,19 +153,9 @@ def compute_beta_alpha(strat_rets, bench_rets, risk_free_daily=0.0):
         return {'beta': 0.0, 'alpha_annualized': 0.0, 'r_squared': 0.0}
     s = strat_rets.reindex(common).fillna(0) - risk_free_daily
     b = bench_rets.reindex(common).fillna(0) - risk_free_daily
-    cov_sb = s.cov(b)
-    var_b = b.var()
-    if var_b == 0:
-        beta = 0.0
-    else:
-        beta = cov_sb / var_b
-    alpha_daily = s.mean() - beta * b.mean()
+    # beta = cov/var，R² 为回归解释的方差比例（见 _kernels.beta_alpha）
+    beta, alpha_daily, r_squared = beta_alpha(s.values, b.values)
     alpha_annualized = alpha_daily * ANNUALIZE_MEAN
-    # R²: 回归解释的方差比例
-    pred = beta * b
-    ss_res = ((s - pred) ** 2).sum()
-    ss_tot = ((s - s.mean()) ** 2).sum()
-    r_squared = 1 - (ss_res / ss_tot) if ss_tot > 0 else 0
     return {'beta': float(beta), 'alpha_annualized': float(alpha_annualized), 'r_squared': float(r_squared)}
 
 
@@ -174,7 +166,48 @@ def get_beta_alpha_summary(strat_rets, bench_rets):
     """
     if bench_rets is None or strat_rets is None or len(strat_rets) < 2:
         return {}
-    res = compute_beta_alpha(strat_rets, bench_rets)
+    return format_beta_alpha(compute_beta_alpha(strat_rets, bench_rets))
+
+
+def compute_return_stats(rets, bench_close=None, window=252):
+    """
+    一次性计算可视化所需的收益派生量，各 plot_* 通过 stats= 复用，避免每张图重复推导。
+    bench_close: 基准收盘价 Series（如 load_benchmark_close 读取的 SPY），可为 None。
+    返回 dict: rets, wealth, drawdown, rolling_sharpe, rolling_vol, monthly（年×月收益和），
+    bench_close, bench_rets, aligned（共同交易日上的 (策略, 基准) 收益），beta（compute_beta_alpha 结果）；
+    无基准时 aligned/beta 为 None，重叠交易日不足时 aligned 为 None。
+    wealth/drawdown/rolling_* 先按 float64 计算再降为 PLOT_DTYPE，只供绘图。
+    """
+    rets = pd.Series(rets).dropna()
+    rets.index = pd.to_datetime(rets.index)
+    wealth = (1 + rets).cumprod()
+    dd = pd.Series(drawdown(wealth.values), index=wealth.index, dtype=PLOT_DTYPE)
+    wealth = wealth.astype(PLOT_DTYPE)
+    rolling_sharpe, rolling_vol = (x.astype(PLOT_DTYPE) for x in compute_rolling_metrics(rets, window=window))
+    monthly = None
+    if not rets.empty:
+        df = pd.DataFrame({'ret': rets, 'year': rets.index.year, 'month': rets.index.month})
+        monthly = df.groupby(['year', 'month'])['ret'].sum().unstack(level='month')
+    bench_rets = aligned = beta = None
+    if bench_close is not None:
+        bench_rets = bench_close.pct_change().dropna()
+        common = rets.index.intersection(bench_rets.index)
+        if len(rets) >= 2:
+            beta = compute_beta_alpha(rets, bench_rets)
+            if len(common) >= 2:
+                aligned = (rets.reindex(common).fillna(0), bench_rets.reindex(common).fillna(0))
+    return {
+        'rets': rets, 'wealth': wealth, 'drawdown': dd,
+        'rolling_sharpe': rolling_sharpe, 'rolling_vol': rolling_vol, 'window': window,
+        'monthly': monthly, 'bench_close': bench_close, 'bench_rets': bench_rets,
+        'aligned': aligned, 'beta': beta,
+    }
+
+
+def format_beta_alpha(res):
+    """compute_beta_alpha 结果 → 可打印的指标 dict（res 为 None 时返回空 dict）。"""
+    if not res:
+        return {}
     return {
         "Beta (vs SPY)": f"{res['beta']:.2f}",
         "Alpha (年化)": f"{res['alpha_annualized']:.2%}",
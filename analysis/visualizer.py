@@ -23,45 +23,58 @@ def load_benchmark_returns(benchmark_csv):
 
 def _load_benchmark_returns(benchmark_csv):
     """内部：从 data 目录 SPY CSV 加载日收益率 Series。"""
+    close = load_benchmark_close(benchmark_csv)
+    return close.pct_change().dropna() if close is not None else None
+
+
+_BENCH_CACHE = {}
+_BENCH_CACHE_MAX = 4
+
+
+def load_benchmark_close(benchmark_csv):
+    """
+    从 data 目录 SPY CSV 加载收盘价 Series（格式同个股 CSV：前 3 行为表头，第 4 行起为 Date, Close, ...）。失败返回 None。
+    只解析 Date/Close 两列；结果按 (路径, mtime, size) 缓存，文件更新后自动重读。返回值共享，调用方勿原地修改。
+    """
     if not benchmark_csv or not os.path.exists(benchmark_csv):
         return None
     try:
+        st = os.stat(benchmark_csv)
+        key = (os.path.abspath(benchmark_csv), st.st_mtime_ns, st.st_size)
+        if key in _BENCH_CACHE:
+            return _BENCH_CACHE[key]
         spy_df = pd.read_csv(
             benchmark_csv,
             skiprows=3,
             header=None,
-            names=['Date', 'Close', 'High', 'Low', 'Open', 'Volume'],
+            usecols=[0, 1],
+            names=['Date', 'Close'],
             parse_dates=[0],
-            index_col=0
+            index_col=0,
+            engine='c',
         )
-        spy_df['Close'] = pd.to_numeric(spy_df['Close'], errors='coerce')
-        spy_df = spy_df.dropna(subset=['Close'])
-        return spy_df['Close'].pct_change().dropna()
+        close = pd.to_numeric(spy_df['Close'], errors='coerce').dropna()
+        if len(_BENCH_CACHE) >= _BENCH_CACHE_MAX:
+            _BENCH_CACHE.pop(next(iter(_BENCH_CACHE)))
+        _BENCH_CACHE[key] = close
+        return close
     except Exception:
         return None
 
 
-def plot_equity_curve(rets, benchmark_csv=None, save_path='equity_curve.png', logger=None):
-    strat_cum = (1 + rets).cumprod()
+def plot_equity_curve(rets, benchmark_csv=None, save_path='equity_curve.png', logger=None, stats=None):
+    """净值曲线（策略 vs SPY）。stats 为 compute_return_stats 结果时直接复用其净值与基准收盘价。"""
+    if stats is not None:
+        strat_cum, bench_close = stats['wealth'], stats['bench_close']
+    else:
+        strat_cum, bench_close = (1 + rets).cumprod(), load_benchmark_close(benchmark_csv)
     plt.figure(figsize=(12, 6))
     plt.plot(strat_cum.index, strat_cum.values, label='Strategy', color='#1f77b4', linewidth=1.5)
-    if benchmark_csv and os.path.exists(benchmark_csv):
+    if bench_close is not None:
         try:
-            # 与 data 目录 CSV 格式一致：前 3 行为表头，第 4 行起为 Date, Close, ...
-            spy_df = pd.read_csv(
-                benchmark_csv,
-                skiprows=3,
-                header=None,
-                names=['Date', 'Close', 'High', 'Low', 'Open', 'Volume'],
-                parse_dates=[0],
-                index_col=0
-            )
-            spy_df['Close'] = pd.to_numeric(spy_df['Close'], errors='coerce')
-            spy_df = spy_df.dropna(subset=['Close'])
-            common_idx = strat_cum.index.intersection(spy_df.index)
+            common_idx = strat_cum.index.intersection(bench_close.index)
             if not common_idx.empty:
-                spy_df = spy_df.loc[common_idx]
-                spy_cum = (1 + spy_df['Close'].pct_change().fillna(0)).cumprod()
+                spy_cum = (1 + bench_close.loc[common_idx].pct_change().fillna(0)).cumprod()
                 spy_cum = spy_cum / spy_cum.iloc[0] * strat_cum.iloc[0]
                 plt.plot(spy_cum.index, spy_cum.values, label='Benchmark (SPY)', color='gray', linestyle='--', alpha=0.8)
         except Exception as e:
@@ -75,10 +88,13 @@ def plot_equity_curve(rets, benchmark_csv=None, save_path='equity_curve.png', lo
     plt.close()
 
 
-def plot_drawdown(rets, save_path='drawdown.png', logger=None):
-    strat_cum = (1 + rets).cumprod()
-    running_max = strat_cum.cummax()
-    drawdown = (strat_cum - running_max) / running_max
+def plot_drawdown(rets, save_path='drawdown.png', logger=None, stats=None):
+    if stats is not None:
+        drawdown = stats['drawdown']
+    else:
+        strat_cum = (1 + rets).cumprod()
+        running_max = strat_cum.cummax()
+        drawdown = (strat_cum - running_max) / running_max
     plt.figure(figsize=(12, 4))
     plt.fill_between(drawdown.index, drawdown, 0, color='red', alpha=0.3)
     plt.plot(drawdown.index, drawdown, color='red', linewidth=1, label='Drawdown')
@@ -91,12 +107,15 @@ def plot_drawdown(rets, save_path='drawdown.png', logger=None):
     plt.close()
 
 
-def plot_rolling_metrics(rets, window=252, save_path='rolling_metrics.png', logger=None):
+def plot_rolling_metrics(rets, window=252, save_path='rolling_metrics.png', logger=None, stats=None):
     """
     绘制滚动夏普比率与滚动波动率（年化），用于识别策略在特定时期（如 2020 熔断、2022 熊市）的失效。
     """
     from .performance import compute_rolling_metrics
-    rolling_sharpe, rolling_vol = compute_rolling_metrics(rets, window=window)
+    if stats is not None and stats.get('window') == window:
+        rolling_sharpe, rolling_vol = stats['rolling_sharpe'], stats['rolling_vol']
+    else:
+        rolling_sharpe, rolling_vol = compute_rolling_metrics(rets, window=window)
     if rolling_sharpe.empty or rolling_vol.empty:
         if logger:
             logger.warning("数据不足，无法绘制滚动指标")
@@ -117,19 +136,24 @@ def plot_rolling_metrics(rets, window=252, save_path='rolling_metrics.png', logg
     plt.close()
 
 
-def plot_monthly_heatmap(rets, save_path='monthly_heatmap.png', logger=None):
+def plot_monthly_heatmap(rets, save_path='monthly_heatmap.png', logger=None, stats=None):
     """
     月度收益热力图：年 × 月，一眼看出哪个月亏损最严重。
     """
-    rets = pd.Series(rets).dropna()
-    rets.index = pd.to_datetime(rets.index)
-    if rets.empty:
+    if stats is not None:
+        monthly = stats['monthly']
+    else:
+        rets = pd.Series(rets).dropna()
+        rets.index = pd.to_datetime(rets.index)
+        monthly = None
+        if not rets.empty:
+            df = pd.DataFrame({'ret': rets, 'year': rets.index.year, 'month': rets.index.month})
+            monthly = df.groupby(['year', 'month'])['ret'].sum().unstack(level='month')
+    if monthly is None:
         if logger:
             logger.warning("无收益数据，无法绘制月度热力图")
         return
-    df = pd.DataFrame({'ret': rets, 'year': rets.index.year, 'month': rets.index.month})
-    monthly = df.groupby(['year', 'month'])['ret'].sum()
-    monthly = monthly.unstack(level='month')
+    monthly = monthly.copy()
     month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
     monthly.columns = [month_names[int(c) - 1] if 1 <= int(c) <= 12 else str(int(c)) for c in monthly.columns]
     if HAS_SEABORN:
@@ -222,27 +246,33 @@ def plot_trades_on_prices(strategy_instance, data_dir, save_dir='.', max_stocks=
     log(f"买卖点图已保存至 {out_dir}，共 {len(tickers)} 只股票")
 
 
-def plot_beta_analysis(rets, benchmark_csv=None, save_path='beta_analysis.png', logger=None):
+def plot_beta_analysis(rets, benchmark_csv=None, save_path='beta_analysis.png', logger=None, stats=None):
     """
     基准对冲分析：策略 vs SPY 散点 + 回归线，标注 Beta / Alpha。
     收益来自大盘（Beta）还是选股能力（Alpha）一目了然。
     """
     from .performance import compute_beta_alpha
-    bench_rets = _load_benchmark_returns(benchmark_csv) if benchmark_csv else None
+    if stats is not None:
+        bench_rets, rets = stats['bench_rets'], stats['rets']
+    else:
+        bench_rets = _load_benchmark_returns(benchmark_csv) if benchmark_csv else None
     if bench_rets is None or rets is None or len(rets) < 2:
         if logger:
             logger.warning("缺少策略或基准收益，无法绘制 Beta 分析")
         return
-    rets = pd.Series(rets).dropna()
-    rets.index = pd.to_datetime(rets.index)
-    common = rets.index.intersection(bench_rets.index)
-    if len(common) < 2:
+    if stats is not None:
+        aligned = stats['aligned']
+    else:
+        rets = pd.Series(rets).dropna()
+        rets.index = pd.to_datetime(rets.index)
+        common = rets.index.intersection(bench_rets.index)
+        aligned = (rets.reindex(common).fillna(0), bench_rets.reindex(common).fillna(0)) if len(common) >= 2 else None
+    if aligned is None:
         if logger:
             logger.warning("策略与基准重叠交易日不足")
         return
-    s = rets.reindex(common).fillna(0)
-    b = bench_rets.reindex(common).fillna(0)
-    res = compute_beta_alpha(s, b)
+    s, b = aligned
+    res = stats['beta'] if stats is not None else compute_beta_alpha(s, b)
     beta, alpha_ann, r2 = res['beta'], res['alpha_annualized'], res['r_squared']
     fig, ax = plt.subplots(figsize=(7, 6))
     ax.scatter(b.values * 100, s.values * 100, alpha=0.4, s=8, color='#1f77b4')
@@ -1,11 +1,31 @@
 """加载 config/settings.yaml 配置"""
+import copy
 import os
 import yaml
-import datetime
+from collections import OrderedDict
 
-def parse_date(date_str):
-    """字符串转 datetime"""
-    return datetime.datetime.strptime(str(date_str), "%Y-%m-%d")
+from utils.helpers import parse_date
+
+# YAML 解析缓存：abspath -> (mtime_ns, size, config)；文件未变时免重复解析，LRU 上限 _CACHE_MAX
+_CACHE = OrderedDict()
+_CACHE_MAX = 100
+
+
+def _load_yaml_cached(config_path):
+    """按 (mtime_ns, size) 校验的 YAML 缓存；命中时返回深拷贝，调用方修改不会污染缓存。"""
+    path = os.path.abspath(config_path)
+    st = os.stat(path)
+    hit = _CACHE.get(path)
+    if hit is not None and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+        _CACHE.move_to_end(path)
+        return copy.deepcopy(hit[2])
+    with open(path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    _CACHE[path] = (st.st_mtime_ns, st.st_size, config)
+    _CACHE.move_to_end(path)
+    while len(_CACHE) > _CACHE_MAX:
+        _CACHE.popitem(last=False)
+    return copy.deepcopy(config)
 
 class ConfigLoader:
     def __init__(self, config_path=None):
@@ -14,8 +34,7 @@ class ConfigLoader:
             config_path = os.path.join(_dir, 'settings.yaml')
         if not os.path.exists(config_path):
             raise FileNotFoundError(f"配置文件未找到: {config_path}")
-        with open(config_path, 'r', encoding='utf-8') as f:
-            self.config = yaml.safe_load(f)
+        self.config = _load_yaml_cached(config_path)
 
     def get_backtest_config(self):
         """获取回测配置，并转换日期为 datetime"""
@@ -1,5 +1,6 @@
 """数据加载：从 CSV 目录加载并生成 Backtrader feeds"""
 import os
+import numpy as np
 import pandas as pd
 import backtrader as bt
 
@@ -51,20 +52,171 @@ def validate_data(df, strict=True):
     return True
 
 
+CACHE_DIR_NAME = '_cache'
+_CSV_COLUMNS = ['Close', 'High', 'Low', 'Open', 'Volume']
+# 进程内已驻留的全量行情 {规范化绝对路径: DataFrame}，_load_ohlcv 优先命中（见 SharedOHLCV）
+_PRELOADED = {}
+_ATTACHED = []
+
+
+def _parse_csv(filepath):
+    """解析单只股票 CSV 全量行情（skiprows=3, 列为 Date, Close, High, Low, Open, Volume），剔除非数值行。"""
+    df = pd.read_csv(
+        filepath,
+        skiprows=3,
+        header=None,
+        names=['Date'] + _CSV_COLUMNS,
+        parse_dates=[0],
+        index_col=0
+    )
+    for col in ['Open', 'High', 'Low', 'Close', 'Volume']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df.dropna(subset=['Open', 'High', 'Low', 'Close', 'Volume'])
+
+
+def _cache_path(filepath):
+    """CSV 对应的二进制缓存路径：<data_dir>/_cache/<ticker>.pkl"""
+    folder, name = os.path.split(filepath)
+    return os.path.join(folder, CACHE_DIR_NAME, os.path.splitext(name)[0] + '.pkl')
+
+
+def _load_ohlcv(filepath, use_cache=True, rebuild=False):
+    """
+    读取单只股票全量行情：优先读 _cache 下的 pickle（记录源 CSV 的 mtime/size，不一致即重建），
+    否则解析 CSV 并写入缓存。缓存写失败（如只读目录）时静默跳过。
+    已通过共享内存挂载（_PRELOADED）的标的直接返回内存中的 DataFrame（只读，勿原地修改）。
+    """
+    if not rebuild and _PRELOADED:
+        df = _PRELOADED.get(_frame_key(filepath))
+        if df is not None:
+            return df
+    if not use_cache:
+        return _parse_csv(filepath)
+    st = os.stat(filepath)
+    sig = (st.st_mtime_ns, st.st_size)
+    cpath = _cache_path(filepath)
+    if not rebuild and os.path.isfile(cpath):
+        try:
+            cached = pd.read_pickle(cpath)
+            if cached.get('src') == sig:
+                return cached['df']
+        except Exception:
+            pass
+    df = _parse_csv(filepath)
+    try:
+        os.makedirs(os.path.dirname(cpath), exist_ok=True)
+        tmp = f"{cpath}.{os.getpid()}.tmp"
+        pd.to_pickle({'src': sig, 'df': df}, tmp)
+        os.replace(tmp, cpath)
+    except OSError:
+        pass
+    return df
+
+
+def _frame_key(filepath):
+    return os.path.normcase(os.path.abspath(filepath))
+
+
+class SharedOHLCV:
+    """
+    将一组 CSV 的全量行情打包进一块 multiprocessing.shared_memory，供进程池 worker 零拷贝挂载：
+    布局为 int64 日期（n 行）+ float64 [n, 5]（列序同 CSV），spec 只含块名与各标的 (路径, 起始行, 行数)。
+    主进程构造一次，worker 在初始化时 attach_shared_ohlcv(spec)，之后 _load_ohlcv 不再读盘/解析。
+    主进程须在进程池关闭后 close()（同时 unlink）。
+    """
+
+    def __init__(self, filepaths):
+        from multiprocessing import shared_memory
+        frames = {}
+        for path in filepaths:
+            try:
+                frames[_frame_key(path)] = _load_ohlcv(path)
+            except Exception:
+                continue
+        n = sum(len(df) for df in frames.values())
+        ncol = len(_CSV_COLUMNS)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, n * 8 * (ncol + 1)))
+        dates = np.ndarray((n,), dtype=np.int64, buffer=self.shm.buf)
+        values = np.ndarray((n, ncol), dtype=np.float64, buffer=self.shm.buf, offset=n * 8)
+        meta = []
+        pos = 0
+        for key, df in frames.items():
+            k = len(df)
+            dates[pos:pos + k] = df.index.values.astype('datetime64[ns]').view(np.int64)
+            values[pos:pos + k] = df[_CSV_COLUMNS].to_numpy(dtype=np.float64)
+            meta.append((key, pos, k))
+            pos += k
+        del dates, values
+        self.spec = (self.shm.name, n, tuple(meta))
+        self.n_frames = len(frames)
+        self.nbytes = self.shm.size
+
+    def close(self):
+        if self.shm is None:
+            return
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach_shared_ohlcv(spec):
+    """
+    worker 端挂载 SharedOHLCV.spec：按元信息在共享块上切出只读视图并登记到 _PRELOADED，返回登记的标的数。
+    spec 为 None 时不做任何事。共享块引用保存在进程内，随进程退出释放。
+    """
+    if not spec:
+        return 0
+    from multiprocessing import shared_memory
+    name, n, meta = spec
+    shm = shared_memory.SharedMemory(name=name)
+    _ATTACHED.append(shm)
+    dates = np.ndarray((n,), dtype=np.int64, buffer=shm.buf)
+    values = np.ndarray((n, len(_CSV_COLUMNS)), dtype=np.float64, buffer=shm.buf, offset=n * 8)
+    values.flags.writeable = False
+    for key, pos, k in meta:
+        index = pd.DatetimeIndex(dates[pos:pos + k].view('datetime64[ns]'), name='Date')
+        _PRELOADED[key] = pd.DataFrame(values[pos:pos + k], index=index, columns=_CSV_COLUMNS, copy=False)
+    return len(meta)
+
+
+def build_ohlcv_cache(data_dir, tickers=None, rebuild=False, logger=None):
+    """
+    预先为 data_dir 下（或指定 tickers）的 CSV 生成/刷新二进制缓存，返回处理的文件数。
+    rebuild=True 时忽略已有缓存全部重建（对应 CLI --rebuild-cache）。
+    """
+    if not os.path.isdir(data_dir):
+        return 0
+    if tickers is None:
+        files = [f for f in os.listdir(data_dir) if f.endswith('.csv')]
+    else:
+        files = [f"{t}.csv" for t in tickers]
+    n = 0
+    for f in files:
+        path = os.path.join(data_dir, f)
+        if not os.path.isfile(path) or f == 'fundamentals.csv':
+            continue
+        try:
+            _load_ohlcv(path, rebuild=rebuild)
+            n += 1
+        except Exception as e:
+            if logger:
+                logger.warning(f"缓存 {f} 失败: {e}")
+    return n
+
+
 def _read_csv_to_df(filepath, start, end, min_bars=None):
-    """读取单只股票 CSV 为 DataFrame，与 add_csv_feed 相同解析逻辑。失败返回 None。"""
+    """读取单只股票 CSV 为 DataFrame（经二进制缓存），按 [start, end] 截取。失败返回 None。"""
     try:
-        df = pd.read_csv(
-            filepath,
-            skiprows=3,
-            header=None,
-            names=['Date', 'Close', 'High', 'Low', 'Open', 'Volume'],
-            parse_dates=[0],
-            index_col=0
-        )
-        for col in ['Open', 'High', 'Low', 'Close', 'Volume']:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-        df = df.dropna(subset=['Open', 'High', 'Low', 'Close', 'Volume'])
+        df = _load_ohlcv(filepath)
         df = df[(df.index >= pd.Timestamp(start)) & (df.index <= pd.Timestamp(end))]
         if len(df) == 0:
             return None
@@ -75,46 +227,141 @@ def _read_csv_to_df(filepath, start, end, min_bars=None):
         return None
 
 
-def add_csv_feed(cerebro, filepath, name, start, end, min_bars=None, logger=None):
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def select_universe(files, universe_size=None, universe_seed=None):
     """
-    读取单只股票 CSV，转换为 PandasData 并加入 cerebro。
-    兼容格式：skiprows=3, 列为 Date, Close, High, Low, Open, Volume。
-    min_bars: 若设置，窗口内 K 线数少于此数则不加载（用于 WFA 等避免 SMA200 等越界）。
+    从（已排序的）文件/代码列表中选出股票池。
+    universe_size 为空、<=0 或不小于列表长度时按原顺序返回全部；universe_seed 有值时用 random.sample
+    无放回抽 K 只（同种子可复现；只做 K 次选取，不打乱整个列表），否则按原顺序取前 K 只。
     """
+    files = list(files)
+    if universe_size is None or universe_size <= 0 or universe_size >= len(files):
+        return files
+    k = min(universe_size, len(files))
+    if universe_seed is not None:
+        import random
+        return random.Random(universe_seed).sample(files, k)
+    return files[:k]
+
+
+_UNIVERSE_CACHE = {}
+
+
+def universe_files(data_dir, universe_size=None, universe_seed=None):
+    """
+    data_dir 下参与股票池抽样的 CSV 文件名（排序、不含 SPY.csv，再经 select_universe 选取）。
+    结果按 (目录, 目录 mtime, universe_size, universe_seed) 记忆：优化中每个窗口/参数组合建 cerebro 时不再重复扫描目录；
+    增删文件会更新目录 mtime 从而失效。
+    """
+    key = (os.path.abspath(data_dir), os.stat(data_dir).st_mtime_ns, universe_size, universe_seed)
+    files = _UNIVERSE_CACHE.get(key)
+    if files is None:
+        with os.scandir(data_dir) as it:
+            names = sorted(e.name for e in it if e.name.endswith('.csv') and e.name != 'SPY.csv')
+        files = select_universe(names, universe_size, universe_seed)
+        _UNIVERSE_CACHE[key] = files
+    return list(files)
+
+
+class ColumnarPandasData(bt.feeds.PandasData):
+    """
+    整列预加载的 PandasData：preload 时把各列一次性写入 line 缓冲，取代父类逐行 iloc 的 _load 循环，
+    加载结果（含 fromdate/todate 截取与 datetime 数值）与逐行加载完全相同。
+    带过滤器、输入时区或非无界缓冲（exactbars）时退回父类逐行加载。
+    """
+
+    def preload(self):
+        if (self._filters or self._ffilters or self._tzinput or self._barstack or self._barstash
+                or self.lines.datetime.mode != bt.linebuffer.LineBuffer.UnBounded
+                or self._colmapping['datetime'] is not None):
+            return super().preload()
+        df = self.p.dataname
+        dts = np.array([bt.date2num(t) for t in df.index.to_pydatetime()], dtype=np.float64)
+        # 逐行加载的语义：早于 fromdate 的行跳过，遇到第一根晚于 todate 的行即停止
+        stop = int(np.argmax(dts > self.todate)) if (dts > self.todate).any() else len(dts)
+        keep = np.flatnonzero(dts[:stop] >= self.fromdate)
+        n = len(keep)
+        for alias in self.getlinealiases():
+            if alias == 'datetime':
+                values = dts[keep]
+            else:
+                colindex = self._colmapping[alias]
+                if colindex is None:
+                    values = np.full(n, np.nan)
+                else:
+                    values = df.iloc[:, colindex].to_numpy(dtype=np.float64)[keep]
+            getattr(self.lines, alias).array.frombytes(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+        self._idx = len(df)  # 行指针置于末尾：之后的 _load 与逐行加载完毕后一样直接返回 False
+        self._last()
+        self.home()
+
+
+def _make_feed(df, name, start, end):
+    """由已清洗的 OHLCV DataFrame 构造整列预加载的 PandasData feed（只传 OHLCV 五列，无 openinterest）。"""
+    return ColumnarPandasData(
+        dataname=df[OHLCV_COLUMNS],
+        name=name,
+        fromdate=start,
+        todate=end,
+        open='Open', high='High', low='Low', close='Close', volume='Volume',
+        openinterest=None
+    )
+
+
+def _load_feed_df(filepath, name, start, end, min_bars=None, logger=None):
+    """读取并严格校验单只股票数据，返回可直接建 feed 的 DataFrame；失败返回 None。"""
     try:
         df = _read_csv_to_df(filepath, start, end, min_bars=min_bars)
         if df is None:
-            return False
+            return None
         validate_data(df, strict=True)
-        data = bt.feeds.PandasData(
-            dataname=df,
-            name=name,
-            fromdate=start,
-            todate=end,
-            open='Open', high='High', low='Low', close='Close', volume='Volume',
-            openinterest=None
-        )
-        cerebro.adddata(data)
-        return True
+        return df
     except Exception as e:
         if logger:
             logger.warning(f"加载 {name} 失败: {e}")
+        return None
+
+
+def _align_to_spy(df, spy_index, name, logger=None):
+    """将 DataFrame 对齐到 SPY 日历（须无缺失日，Volume 缺日填 0 再替换为 1）；不满足返回 None。"""
+    # 只加载与 SPY 日历完全一致的股票（无缺失日），不 ffill，避免指标除零
+    if not spy_index.isin(df.index).all():
+        return None
+    df = df.loc[spy_index].copy()
+    if len(df) != len(spy_index):
+        return None
+    df['Volume'] = df['Volume'].fillna(0).replace(0, 1)
+    if df[['Open', 'High', 'Low', 'Close']].isna().any().any():
+        return None
+    try:
+        validate_data(df, strict=False)
+    except Exception as e:
+        if logger:
+            logger.warning(f"加载 {name} 失败: {e}")
+        return None
+    return df
+
+
+def add_csv_feed(cerebro, filepath, name, start, end, min_bars=None, logger=None):
+    """
+    读取单只股票 CSV，转换为 PandasData 并加入 cerebro。
+    兼容格式：skiprows=3, 列为 Date, Close, High, Low, Open, Volume。
+    min_bars: 若设置，窗口内 K 线数少于此数则不加载（用于 WFA 等避免 SMA200 等越界）。
+    """
+    df = _load_feed_df(filepath, name, start, end, min_bars=min_bars, logger=logger)
+    if df is None:
         return False
+    cerebro.adddata(_make_feed(df, name, start, end))
+    return True
 
 
 def _add_aligned_feed(cerebro, df, name, start, end, logger=None):
     """将已对齐到 SPY 日历的 DataFrame 加入 cerebro（OHLC 前向填充，Volume 缺日填 0）。"""
     try:
         validate_data(df, strict=False)
-        data = bt.feeds.PandasData(
-            dataname=df,
-            name=name,
-            fromdate=start,
-            todate=end,
-            open='Open', high='High', low='Low', close='Close', volume='Volume',
-            openinterest=None
-        )
-        cerebro.adddata(data)
+        cerebro.adddata(_make_feed(df, name, start, end))
         return True
     except Exception as e:
         if logger:
@@ -127,54 +374,40 @@ def load_data_into_cerebro(cerebro, data_dir, from_date, to_date, universe_size=
     将 data_dir 下的 CSV 加载到 cerebro：SPY 作为 data0，其余按 universe_size 限制数量。
     min_bars: 若设置，窗口内 K 线数少于此数的标的不加载（WFA 等需至少 252 根 K 线时设 252）。
     全市场（universe_size=null）时：仅加载与 SPY 日历完全一致的标的（无缺失日），避免 ffill 引发指标除零、且保证 next() 每日推进。
+    先把所有标的读入 {ticker: DataFrame}，再一次性创建 feed 加入 cerebro（SPY 只读一次）。
     """
     if not os.path.exists(data_dir):
         raise FileNotFoundError(f"数据目录不存在: {data_dir}")
-    all_files = sorted([f for f in os.listdir(data_dir) if f.endswith('.csv')])
     spy_path = os.path.join(data_dir, 'SPY.csv')
     # 全市场（universe_size=null）时：只加载与 SPY 日历完全一致的股票，避免 ffill 导致指标除零
     use_full_align = (universe_size is None or universe_size <= 0) and os.path.isfile(spy_path)
+    loaded = {}
     spy_index = None
-    if use_full_align:
-        spy_df = _read_csv_to_df(spy_path, from_date, to_date, min_bars=min_bars)
-        if spy_df is not None and len(spy_df) > 0:
+    if os.path.isfile(spy_path):
+        spy_df = _load_feed_df(spy_path, 'SPY', from_date, to_date, min_bars=min_bars, logger=logger)
+        if spy_df is not None:
+            loaded['SPY'] = spy_df
             spy_index = spy_df.index
-        else:
-            use_full_align = False
-    if 'SPY.csv' in all_files:
-        add_csv_feed(cerebro, spy_path, 'SPY', from_date, to_date, min_bars=min_bars, logger=logger)
-        all_files.remove('SPY.csv')
     else:
         if logger:
             logger.warning("未找到 SPY.csv，大盘风控可能失效")
-    if universe_size is not None and universe_size > 0:
-        if universe_seed is not None:
-            import random
-            rng = random.Random(universe_seed)
-            all_files = all_files.copy()
-            rng.shuffle(all_files)
-        target_files = all_files[:universe_size]
-    else:
-        target_files = all_files
+    if use_full_align and spy_index is None:
+        use_full_align = False
+    target_files = universe_files(data_dir, universe_size, universe_seed)
     for filename in target_files:
         ticker = filename.split('.')[0]
         filepath = os.path.join(data_dir, filename)
-        if use_full_align and spy_index is not None:
+        if use_full_align:
             df = _read_csv_to_df(filepath, from_date, to_date, min_bars=min_bars)
             if df is None or len(df) == 0:
                 continue
-            # 只加载与 SPY 日历完全一致的股票（无缺失日），不 ffill，避免指标除零
-            if not spy_index.isin(df.index).all():
-                continue
-            df = df.loc[spy_index].copy()
-            if len(df) != len(spy_index):
-                continue
-            df['Volume'] = df['Volume'].fillna(0).replace(0, 1)
-            if df[['Open', 'High', 'Low', 'Close']].isna().any().any():
-                continue
-            _add_aligned_feed(cerebro, df, ticker, from_date, to_date, logger=logger)
+            df = _align_to_spy(df, spy_index, ticker, logger=logger)
         else:
-            add_csv_feed(cerebro, filepath, ticker, from_date, to_date, min_bars=min_bars, logger=logger)
+            df = _load_feed_df(filepath, ticker, from_date, to_date, min_bars=min_bars, logger=logger)
+        if df is not None:
+            loaded[ticker] = df[OHLCV_COLUMNS]
+    for ticker, df in loaded.items():
+        cerebro.adddata(_make_feed(df, ticker, from_date, to_date))
     if logger:
         logger.info(f"📊 [数据] 装载完成。总计: {len(cerebro.datas)} 只 (含SPY)" + ("，仅加载与 SPY 日历一致的标的" if use_full_align else ""))
     return len(cerebro.datas)
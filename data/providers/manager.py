@@ -10,9 +10,13 @@ import argparse
 import yfinance as yf
 import pandas as pd
 import requests
+from pandas.tseries.holiday import USFederalHolidayCalendar
+from pandas.tseries.offsets import CustomBusinessDay
 
 # 与 main 一致：S&P 500 数据目录
 DATA_DIR = os.path.join('data', 'SP500')
+# 判断本地数据是否覆盖区间用的近似交易日历（联邦假日，与 NYSE 略有出入）
+_TRADING_DAY = CustomBusinessDay(calendar=USFederalHolidayCalendar())
 
 
 def get_sp500_tickers():
@@ -36,11 +40,69 @@ def get_sp500_tickers():
         return ['NVDA', 'AMD', 'TSLA', 'AAPL', 'MSFT', 'AMZN', 'GOOG', 'META', 'NFLX', 'PLTR', 'COIN', 'MARA']
 
 
-def download_spy(start_date='2017-01-01', end_date='2026-02-01', data_dir=None):
-    """仅下载 SPY 到指定目录（默认 data/SP500/）"""
+# 首个数据行之前最多容忍的表头行数（yfinance 多级表头为 Price / Ticker / Date 三行）
+_MAX_HEADER_LINES = 5
+
+
+def _first_field_date(line):
+    """行首字段解析为日期，非日期（表头行、空字段）返回 None。"""
+    try:
+        ts = pd.Timestamp(line.split(b',', 1)[0].decode().strip())
+    except ValueError:
+        return None
+    return None if pd.isna(ts) else ts
+
+
+def _file_date_span(path):
+    """
+    只读 CSV 的首个数据行与末行取 (首日, 末日)，不解析全文件；文件缺失或格式不符返回 None。
+    首个数据行为开头几行中第一个行首字段是日期的行，单行表头与三行表头（_parse_csv 的 skiprows=3 格式）均可。
+    """
+    try:
+        with open(path, 'rb') as f:
+            first = None
+            for _ in range(_MAX_HEADER_LINES + 1):
+                line = f.readline()
+                if not line:
+                    break
+                first = _first_field_date(line)
+                if first is not None:
+                    break
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - 4096))
+            last = _first_field_date(f.read().rstrip(b'\r\n').rsplit(b'\n', 1)[-1])
+    except (OSError, UnicodeDecodeError):
+        return None
+    if first is None or last is None:
+        return None
+    return first, last
+
+
+def _needs_download(path, start_date, end_date):
+    """
+    本地 CSV 已覆盖 [start_date, end_date) 时返回 False：start 到首日之前、末日之后到 end（不含，同 yfinance）
+    之间都没有交易日。日历为近似值，误判为未覆盖时只是多下载一次。
+    """
+    span = _file_date_span(path)
+    if span is None:
+        return True
+    first, last = span
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    one_day = pd.Timedelta(days=1)
+    if len(pd.date_range(start, first - one_day, freq=_TRADING_DAY)) > 0:
+        return True
+    return len(pd.date_range(last + one_day, end - one_day, freq=_TRADING_DAY)) > 0
+
+
+def download_spy(start_date='2017-01-01', end_date='2026-02-01', data_dir=None, force=False):
+    """仅下载 SPY 到指定目录（默认 data/SP500/）；本地文件已覆盖区间时跳过（force=True 强制重下）"""
     target_dir = data_dir or DATA_DIR
     if not os.path.exists(target_dir):
         os.makedirs(target_dir)
+    if not force and not _needs_download(os.path.join(target_dir, 'SPY.csv'), start_date, end_date):
+        print("✅ SPY.csv 已覆盖所需区间，跳过下载。")
+        return
     print("正在单独下载 SPY 数据...")
     df = yf.download('SPY', start=start_date, end=end_date, auto_adjust=True, progress=False)
     if df.empty:
@@ -53,11 +115,22 @@ def download_spy(start_date='2017-01-01', end_date='2026-02-01', data_dir=None):
     print(f"✅ SPY.csv 已保存至 {out_path}")
 
 
-def download_data(tickers, start_date='2017-01-01', end_date='2026-01-01', data_dir=None):
-    """批量下载数据并保存为 CSV"""
+def download_data(tickers, start_date='2017-01-01', end_date='2026-01-01', data_dir=None, force=False):
+    """
+    批量下载数据并保存为 CSV。本地 CSV 已覆盖区间的标的跳过（force=True 强制全部重下）；
+    未覆盖的按完整区间重下，因复权价会随分红拆股整体重算，不做增量拼接。
+    """
     target_dir = data_dir or DATA_DIR
     if not os.path.exists(target_dir):
         os.makedirs(target_dir)
+    if not force:
+        stale = [t for t in tickers if _needs_download(os.path.join(target_dir, f"{t}.csv"), start_date, end_date)]
+        if len(stale) < len(tickers):
+            print(f"跳过 {len(tickers) - len(stale)} 只已覆盖区间的标的。")
+        tickers = stale
+        if not tickers:
+            print("✅ 本地数据已覆盖所需区间，无需下载。")
+            return
     print(f"开始下载数据 ({start_date} 至 {end_date})...")
     print(f"目标股票数: {len(tickers)} (全量下载可能需要 5–10 分钟)")
     data = yf.download(tickers, start=start_date, end=end_date, group_by='ticker', auto_adjust=True, threads=True, progress=False)
@@ -92,9 +165,10 @@ if __name__ == '__main__':
     parser.add_argument('--spy-only', action='store_true', help='仅下载 SPY')
     parser.add_argument('--start', default='2017-01-01', help='起始日期')
     parser.add_argument('--end', default='2026-02-01', help='结束日期')
+    parser.add_argument('--force', action='store_true', help='忽略本地已有数据，全部重新下载')
     args = parser.parse_args()
     if args.spy_only:
-        download_spy(start_date=args.start, end_date=args.end)
+        download_spy(start_date=args.start, end_date=args.end, force=args.force)
     else:
         tickers = get_sp500_tickers()
-        download_data(tickers, start_date=args.start, end_date=args.end)
+        download_data(tickers, start_date=args.start, end_date=args.end, force=args.force)
@@ -3,7 +3,7 @@ import logging
 import backtrader as bt
 from data.manager import load_data_into_cerebro
 from utils.logger import Logger
-from engine.optimizer import run_optstrategy, _extract_metric, _params_to_dict
+from engine.optimizer import run_optstrategy, _extract_metric, _params_to_dict, resolve_processes
 
 
 class BacktestEngine:
@@ -89,10 +89,12 @@ class BacktestEngine:
         self.log_sys.info("")
         return results[0] if results else None
 
-    def run_optimization(self, strategy_cls, param_grid, metric='sharperatio', maximize=True, composite_weights=None):
+    def run_optimization(self, strategy_cls, param_grid, metric='sharperatio', maximize=True, composite_weights=None,
+                         processes=None):
         """
         利用 Backtrader optstrategy 做网格搜索，返回最优参数字典、最优指标值、以及全部 (params, value) 列表。
         metric 为 "composite" 且 composite_weights 有值时，value 为多指标 dict，由调用方用 compute_composite_score 汇总排序。
+        processes: 并行进程数（传给 Backtrader 的 maxcpus；None=全部核，1=串行）。
         """
         grid = {k: v for k, v in param_grid.items() if isinstance(v, (list, tuple)) and not isinstance(v, str)}
         fixed = {k: v for k, v in param_grid.items() if k not in grid}
@@ -103,7 +105,7 @@ class BacktestEngine:
         is_composite = (metric and metric.lower() == 'composite' and composite_weights)
         self.log_sys.info(f"  {_product_size(grid)} 组参数" + (" (综合指标)" if is_composite else "") + " ...")
         runonce = len(self.cerebro.datas) <= 1
-        run_results = self.cerebro.run(runonce=runonce)
+        run_results = self.cerebro.run(runonce=runonce, maxcpus=resolve_processes(processes))
         strategies_flat = []
         for x in run_results:
             if isinstance(x, (list, tuple)):
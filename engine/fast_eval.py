@@ -0,0 +1,203 @@
+"""
+免回测快速评估：把 ModularScreenerStrategy 的选股规则在 (日期 × 标的) 面板上向量化，
+用「当日入选标的次日收益按风险仓位加权」的收益序列直接计算指标，不经过 Cerebro 的逐 bar 状态递推。
+仅用于贝叶斯/网格内循环的粗筛：止损、止盈、时间止损、末位淘汰等持仓管理不建模，
+最终参数仍用完整回测验证（run_optimization 的 run_final_backtest）。
+"""
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from data.manager import _read_csv_to_df, universe_files
+from engine.optimizer import get_param_combos
+
+ANNUALIZE = np.sqrt(252)
+MAX_WEIGHT = 0.30  # 与 portfolio.risk.position_size 的单票 30% 上限一致
+SUPPORTED_METRICS = ('sharperatio', 'sharpe', 'ir', 'cagr', 'final_value', 'value',
+                     'drawdown', 'max_drawdown', 'calmar', 'sortino')
+
+
+def load_panel(data):
+    """读取 SPY 与股票池行情为面板 {'close','high','low','volume': DataFrame[日期 × 标的], 'spy': Series}，按 SPY 日历对齐。"""
+    data_dir = data['data_dir']
+    start, end = data['from_date'], data['to_date']
+    spy = _read_csv_to_df(os.path.join(data_dir, 'SPY.csv'), start, end)
+    if spy is None:
+        raise ValueError("fast_eval 需要 SPY.csv 作为日历与大盘风控基准")
+    frames = {}
+    for f in universe_files(data_dir, data.get('universe_size'), data.get('universe_seed')):
+        df = _read_csv_to_df(os.path.join(data_dir, f), start, end)
+        if df is not None:
+            frames[f[:-4]] = df
+    if not frames:
+        raise ValueError("fast_eval 股票池为空")
+    panel = {col.lower(): pd.DataFrame({t: df[col] for t, df in frames.items()}).reindex(spy.index)
+             for col in ('Close', 'High', 'Low', 'Volume')}
+    panel['spy'] = spy['Close']
+    return panel
+
+
+def _wilder(x, period):
+    return x.ewm(alpha=1.0 / period, adjust=False, min_periods=period).mean()
+
+
+def _atr(panel, period):
+    prev = panel['close'].shift(1)
+    tr = np.maximum(panel['high'] - panel['low'],
+                    np.maximum((panel['high'] - prev).abs(), (panel['low'] - prev).abs()))
+    return _wilder(tr, period)
+
+
+def _rsi(close, period):
+    diff = close.diff()
+    up = _wilder(diff.clip(lower=0), period)
+    down = _wilder((-diff).clip(lower=0), period)
+    return 100.0 - 100.0 / (1.0 + up / down)
+
+
+def _minmax_rows(x, mask):
+    """按行在 mask 内做 min-max 归一化到 0-1（同 StockScreener.calculate_composite_score；行内无差异时为 0.5）。"""
+    xm = np.where(mask, x, np.nan)
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)  # 无候选的行为 All-NaN
+        mn = np.nanmin(xm, axis=1, keepdims=True)
+        mx = np.nanmax(xm, axis=1, keepdims=True)
+        return np.where(mx > mn, (x - mn) / (mx - mn), 0.5)
+
+
+def _branch_score(mask, roc, rsi, atr_pct, weights=(0.40, 0.30, 0.30)):
+    score = (weights[0] * _minmax_rows(roc, mask)
+             + weights[1] * np.clip(rsi, 0, 100) / 100.0
+             + weights[2] * _minmax_rows(atr_pct, mask)) * 100.0
+    return np.where(mask, np.clip(score, 0, 100), -np.inf)
+
+
+class FastEvaluator:
+    """
+    params -> 指标值。面板在构造时读取一次，ATR/RSI 按周期缓存，可 pickle 后在进程池中使用。
+    建模规则：SPY > MA200 时交易；流动性 / 量比 / 趋势(>MA200) 过滤后取追涨(涨幅 > 0.5ATR 且 RSI≤75)
+    与低吸(RSI<35)两类信号，按综合得分取前 top_n；仓位 = min(risk_per_trade_pct / 止损距离%, 30%)，
+    总仓位不超过 100%，次日收益扣除换手佣金。
+    """
+
+    def __init__(self, data, metric='sharperatio', panel=None):
+        name = str(metric).lower().strip()
+        if name not in SUPPORTED_METRICS:
+            raise ValueError(f"fast_eval 不支持指标: {metric}")
+        self.metric = name
+        self.initial_capital = float(data.get('initial_capital', 100000.0))
+        self.commission = float(data.get('commission', 0.0) or 0.0)
+        self.panel = panel if panel is not None else load_panel(data)
+        close = self.panel['close']
+        self._ma200 = close.rolling(200).mean().to_numpy()
+        self._vol_ma = self.panel['volume'].rolling(20).mean().to_numpy()
+        self._roc = (close / close.shift(126) - 1.0).to_numpy()
+        self._fwd = (close.shift(-1) / close - 1.0).to_numpy()
+        spy = self.panel['spy']
+        self._risk_on = (spy > spy.rolling(200).mean()).to_numpy()
+        self._spy_rets = spy.pct_change().shift(-1).to_numpy()
+        self._atr_cache = {}
+        self._rsi_cache = {}
+
+    def _atr_of(self, period):
+        if period not in self._atr_cache:
+            self._atr_cache[period] = _atr(self.panel, period).to_numpy()
+        return self._atr_cache[period]
+
+    def _rsi_of(self, period):
+        if period not in self._rsi_cache:
+            self._rsi_cache[period] = _rsi(self.panel['close'], period).to_numpy()
+        return self._rsi_cache[period]
+
+    def returns(self, params):
+        """按 params 生成组合日收益序列（index 为持有日）。"""
+        p = params
+        close = self.panel['close'].to_numpy()
+        prev = np.roll(close, 1, axis=0)
+        prev[0] = np.nan
+        volume = self.panel['volume'].to_numpy()
+        atr = self._atr_of(int(p.get('atr_period', 14)))
+        rsi = self._rsi_of(int(p.get('rsi_period', 14)))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            atr_pct = np.where(atr > 0, (close - prev) / atr, 0.0)
+            base = (self._risk_on[:, None]
+                    & ~np.isnan(self._ma200) & ~np.isnan(self._roc)
+                    & (close >= float(p.get('min_price', 10.0))) & (volume > 0)
+                    & (close * volume >= float(p.get('min_dollar_vol', 0) or 0))
+                    & (close > self._ma200))
+            if p.get('min_avg_dollar_vol') is not None:
+                base &= close * self._vol_ma >= float(p['min_avg_dollar_vol'])
+            vol_mult = p.get('vol_multiplier')
+            if vol_mult is not None and vol_mult > 0:
+                base &= volume >= self._vol_ma * float(vol_mult)
+            breakout = base & (close - prev > atr * 0.5) & (rsi >= 0) & (rsi <= 75)
+            dip = base & (rsi < 35)
+            score = np.maximum(_branch_score(breakout, self._roc, rsi, atr_pct),
+                               _branch_score(dip, self._roc, rsi, atr_pct))
+        top_n = max(1, int(p.get('top_n', 5)))
+        n_cols = score.shape[1]
+        k = min(top_n, n_cols)
+        picks = np.argpartition(-score, k - 1, axis=1)[:, :k] if k < n_cols else np.tile(np.arange(n_cols), (len(score), 1))
+        chosen = np.zeros_like(base)
+        rows = np.arange(len(score))[:, None]
+        chosen[rows, picks] = np.isfinite(score[rows, picks])
+        stop_dist = float(p.get('stop_atr_mult', 3.5)) * atr / close
+        with np.errstate(invalid='ignore', divide='ignore'):
+            w = np.where(chosen, np.minimum(float(p.get('risk_per_trade_pct', 0.03)) / stop_dist, MAX_WEIGHT), 0.0)
+        w = np.nan_to_num(w, nan=0.0, posinf=0.0)
+        total = w.sum(axis=1, keepdims=True)
+        w = np.where(total > 1.0, w / np.where(total > 0, total, 1.0), w)
+        turnover = np.abs(np.diff(w, axis=0, prepend=0.0)).sum(axis=1)
+        port = np.nansum(w * np.nan_to_num(self._fwd, nan=0.0), axis=1) - self.commission * turnover
+        idx = self.panel['close'].index
+        return pd.Series(port[:-1], index=idx[1:])
+
+    def __call__(self, params):
+        return self.score(self.returns(params))
+
+    def score(self, rets):
+        r = rets.to_numpy()
+        name = self.metric
+        if len(r) < 2:
+            return None
+        if name in ('sharperatio', 'sharpe'):
+            sd = r.std(ddof=1)
+            return float(r.mean() / sd * ANNUALIZE) if sd > 0 else None
+        if name == 'ir':
+            active = r - np.nan_to_num(self._spy_rets[:-1], nan=0.0)
+            sd = active.std(ddof=1)
+            return float(active.mean() / sd * ANNUALIZE) if sd > 0 else None
+        wealth = np.cumprod(1.0 + r)
+        if name in ('final_value', 'value'):
+            return float(self.initial_capital * wealth[-1])
+        dd = float((1.0 - wealth / np.maximum.accumulate(wealth)).max() * 100.0)
+        if name in ('drawdown', 'max_drawdown'):
+            return dd
+        years = (rets.index[-1] - rets.index[0]).days / 365.25
+        cagr = float(wealth[-1] ** (1.0 / years) - 1.0) if years > 0 else None
+        if name == 'cagr':
+            return cagr
+        if name == 'calmar':
+            return float(cagr / (dd / 100.0)) if cagr is not None and dd > 0 else None
+        downside = r[r < 0]
+        if len(downside) < 2 or downside.std(ddof=1) == 0:
+            return None
+        return float(r.mean() * 252 / (downside.std(ddof=1) * ANNUALIZE))
+
+
+def fast_grid_search(evaluator, param_grid, fixed_params=None, maximize=True, max_combos=None, random_state=42):
+    """
+    用 FastEvaluator 评估 param_grid 的全部（或抽样 max_combos）组合。
+    返回 (best_params, best_value, [(params, value), ...])，params 仅含网格键，与 grid_search 一致。
+    """
+    fixed_params = fixed_params or {}
+    results = []
+    for params in get_param_combos(param_grid, max_combos=max_combos, random_state=random_state):
+        results.append((params, evaluator({**fixed_params, **params})))
+    valid = [(p, v) for p, v in results if v is not None]
+    if not valid:
+        return None, None, results
+    best = max(valid, key=lambda x: x[1]) if maximize else min(valid, key=lambda x: x[1])
+    return best[0], best[1], results
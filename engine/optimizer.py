@@ -4,11 +4,15 @@
 """
 import itertools
 import logging
+import multiprocessing
+import os
+import pickle
 from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 import backtrader as bt
 
-from data.manager import load_data_into_cerebro
+from data.manager import attach_shared_ohlcv, load_data_into_cerebro
 from utils.logger import Logger
 
 
@@ -119,6 +123,44 @@ def compute_robustness_score(result_idx, all_results, grid_candidates, metric_id
     return mean_v / (std_v + 1e-9)
 
 
+def compute_robustness_scores(all_results, grid_candidates, metric_idx=1, radius=1):
+    """
+    批量版 compute_robustness_score：先把每条结果映射为网格下标矩阵，
+    再用一次 (N, N) 距离矩阵求出全部邻域，均值/标准差按行归约，结果与逐条计算一致。
+    各条结果参数键不一致时退回逐条计算。
+    """
+    import numpy as np
+    n = len(all_results)
+    if n == 0:
+        return []
+    first_keys = set(all_results[0][0])
+    if any(set(p) != first_keys for p, *_ in all_results):
+        return [compute_robustness_score(i, all_results, grid_candidates, metric_idx, radius) for i in range(n)]
+    grid_keys = [k for k in all_results[0][0] if k in grid_candidates and grid_candidates[k]]
+    if grid_keys:
+        idx = np.array([[_grid_param_index(p.get(k, 0), grid_candidates[k]) for k in grid_keys]
+                        for p, *_ in all_results])
+        mask = np.abs(idx[:, None, :] - idx[None, :, :]).sum(axis=2) <= radius * len(grid_keys)
+    else:
+        mask = np.ones((n, n), dtype=bool)
+    values = np.full(n, np.nan)
+    for i, r in enumerate(all_results):
+        v = r[metric_idx]
+        if v is not None:
+            try:
+                values[i] = float(v)
+            except (TypeError, ValueError):
+                pass
+    valid = mask & ~np.isnan(values)[None, :]
+    counts = valid.sum(axis=1)
+    vals = np.where(valid, values[None, :], 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_v = vals.sum(axis=1) / counts
+        std_v = np.sqrt(np.where(valid, (values[None, :] - mean_v[:, None]) ** 2, 0.0).sum(axis=1) / counts)
+    scores = np.where(std_v < 1e-9, mean_v * 1e6, mean_v / (std_v + 1e-9))
+    return [float(s) if c else 0.0 for s, c in zip(scores, counts)]
+
+
 def _build_grid_candidates(param_keys, all_results, grid_candidates_from_flow):
     """统一得到 grid_candidates。"""
     if grid_candidates_from_flow:
@@ -357,7 +399,7 @@ def select_final_params(all_results, method='best', top_pct=0.2, maximize=True,
         metric_vals = [r[1] for r in all_results]
         bad = float('-inf') if maximize else float('inf')
         ranks_metric = _rank_values(metric_vals, maximize)
-        robustness_scores = [compute_robustness_score(i, all_results, grid_candidates, metric_idx=1, radius=robust_radius) for i in range(len(all_results))]
+        robustness_scores = compute_robustness_scores(all_results, grid_candidates, metric_idx=1, radius=robust_radius)
         ranks_robust = _rank_values(robustness_scores, True)
         composite = [robust_alpha * ranks_metric[i] + (1 - robust_alpha) * ranks_robust[i] for i in range(len(all_results))]
         best_idx = max(range(len(composite)), key=lambda i: composite[i])
@@ -590,13 +632,100 @@ def compute_composite_score(results_with_metrics, composite_weights, maximize=Tr
     return out
 
 
+def resolve_processes(processes=None):
+    """进程数配置：None/0 → CPU 核数；负数 → 核数减去该值（至少 1）；其余按给定值。"""
+    n_cpu = os.cpu_count() or 1
+    if processes is None or processes == 0:
+        return n_cpu
+    processes = int(processes)
+    if processes < 0:
+        return max(1, n_cpu + processes)
+    return processes
+
+
+def _init_worker(log_path=None, shared_spec=None):
+    """
+    进程池 worker 初始化：让 Logger 复用主进程的日志文件（追加写），
+    避免 spawn 模式下每个 worker 新建时间戳日志并触发旧日志清理；
+    shared_spec 为 SharedOHLCV.spec 时挂载主进程共享的行情，worker 内不再各自读盘解析。
+    """
+    if log_path:
+        Logger(log_dir=os.path.dirname(log_path) or '.', file_name=os.path.basename(log_path),
+               console_level=logging.WARNING, quiet_console_init=True)
+    attach_shared_ohlcv(shared_spec)
+
+
+def _pool_context():
+    """
+    worker 进程的启动方式：POSIX 上用 forkserver，不直接 fork 主进程。
+    主进程跑过 prange 并行内核后已有 numba 线程池（如 tbb），fork 出的子进程继承其锁状态，可能在退出时卡死；
+    forkserver 从干净的服务进程派生 worker，行情经 SharedOHLCV 共享、日志经 _init_worker 复用，与 spawn 一致。
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return None
+
+
+def make_worker_pool(processes=None, logger=None, shared_spec=None):
+    """
+    创建优化用进程池（ProcessPoolExecutor），worker 按 _init_worker 初始化。
+    可传给 grid_search / walk_forward_analysis / run_bayesian_optimization 的 pool 参数，在多个阶段复用。
+    """
+    return ProcessPoolExecutor(max_workers=resolve_processes(processes), mp_context=_pool_context(),
+                               initializer=_init_worker, initargs=(getattr(logger, 'log_path', None), shared_spec))
+
+
+def _picklable(obj):
+    try:
+        pickle.dumps(obj)
+        return True
+    except Exception:
+        return False
+
+
+def _eval_params(cerebro_factory, params, metric, composite_keys=None):
+    """worker 内执行单组参数回测，返回 (value, error_message)；factory 返回 None 时返回 None。策略实例不跨进程返回。"""
+    try:
+        cerebro = cerebro_factory(params)
+        if cerebro is None:
+            return None
+        run_result = cerebro.run()
+        strat = run_result[0] if run_result else None
+        if composite_keys:
+            return {k: _extract_metric(strat, k) for k in composite_keys}, None
+        return _extract_metric(strat, metric), None
+    except Exception as e:
+        return ({} if composite_keys else None), str(e)
+
+
+def _worker_count(processes, n_tasks, payload, log, what, pool=None):
+    """实际并行进程数：不超过任务数（传入 pool 时以其进程数为上限）；payload 不可 pickle 时退回串行（1）。"""
+    cap = getattr(pool, '_max_workers', None) or resolve_processes(processes)
+    n_workers = min(cap, n_tasks)
+    if n_workers > 1 and not _picklable(payload):
+        log.warning(f"{what} 不可 pickle，改为串行")
+        return 1
+    return max(1, n_workers)
+
+
+def _parallel_map(func, n_workers, log, *iterables, pool=None):
+    """在 n_workers 个进程上执行 func，结果顺序与输入一致；传入 pool 时复用之，否则临时建池。"""
+    if pool is not None:
+        return list(pool.map(func, *iterables))
+    with make_worker_pool(n_workers, log) as pool:
+        return list(pool.map(func, *iterables))
+
+
 def grid_search(cerebro_factory, strategy_cls, param_grid, metric='sharperatio', maximize=True,
-                max_combos=None, random_state=42, composite_weights=None, logger=None):
+                max_combos=None, random_state=42, composite_weights=None, logger=None, processes=1, pool=None):
     """
     网格搜索：对 param_grid 的笛卡尔积逐一运行 cerebro，比较 metric，返回最优参数字典与全部结果。
     cerebro_factory(params) 返回已配置好该参数策略并 load 好数据的 cerebro，本函数只 run 并取结果。
     max_combos: 若设置且组合数超过则随机抽样至 max_combos 以控制耗时。
     composite_weights: 若设置则每轮提取多指标 dict，由调用方 compute_composite_score 排序；此时 best 为 None。
+    processes: 并行进程数（见 resolve_processes，1 为串行）。并行时 cerebro_factory 须可 pickle，
+    结果中的策略实例为 None；不可 pickle 时自动退回串行。
+    pool: 可选的已建进程池（make_worker_pool），传入时复用而不新建。
     """
     log = logger or Logger()
     combos = get_param_combos(param_grid, max_combos=max_combos, random_state=random_state)
@@ -605,22 +734,36 @@ def grid_search(cerebro_factory, strategy_cls, param_grid, metric='sharperatio',
     if max_combos and total > max_combos:
         log.info(f"  组合数 {total} > max_combos={max_combos}，已随机抽样 {len(combos)} 组")
     results = []
-    for params in combos:
-        try:
-            cerebro = cerebro_factory(params)
-            if cerebro is None:
+    n_workers = _worker_count(processes, len(combos), cerebro_factory, log, "cerebro_factory", pool)
+    if n_workers > 1:
+        keys = list(composite_weights) if composite_weights else None
+        log.info(f"  并行网格搜索: {len(combos)} 组参数 / {n_workers} 进程")
+        outputs = _parallel_map(_eval_params, n_workers, log, itertools.repeat(cerebro_factory), combos,
+                                itertools.repeat(metric), itertools.repeat(keys), pool=pool)
+        for params, out in zip(combos, outputs):
+            if out is None:
                 continue
-            run_result = cerebro.run()
-            strat = run_result[0] if run_result else None
-            if composite_weights:
-                value = {k: _extract_metric(strat, k) for k in composite_weights}
-            else:
-                value = _extract_metric(strat, metric)
-            results.append((params, value, strat))
-        except Exception as e:
-            if logger:
-                log.warning(f"参数 {params} 运行失败: {e}")
-            results.append((params, None if not composite_weights else {}, None))
+            value, err = out
+            if err and logger:
+                log.warning(f"参数 {params} 运行失败: {err}")
+            results.append((params, value, None))
+    else:
+        for params in combos:
+            try:
+                cerebro = cerebro_factory(params)
+                if cerebro is None:
+                    continue
+                run_result = cerebro.run()
+                strat = run_result[0] if run_result else None
+                if composite_weights:
+                    value = {k: _extract_metric(strat, k) for k in composite_weights}
+                else:
+                    value = _extract_metric(strat, metric)
+                results.append((params, value, strat))
+            except Exception as e:
+                if logger:
+                    log.warning(f"参数 {params} 运行失败: {e}")
+                results.append((params, None if not composite_weights else {}, None))
 
     if composite_weights:
         best_params, best_value = None, None
@@ -677,62 +820,84 @@ def run_optstrategy(cerebro, strategy_cls, param_grid, metric='sharperatio', max
 _WFA_MIN_CALENDAR_DAYS = 365
 
 
+def _wfa_windows(from_date, to_date, train_days, test_days, train_cal, lookback_cal):
+    """滚动窗口列表：[(train_start, train_end, test_start, test_end), ...]，与参数无关，预先生成一次。"""
+    import pandas as pd
+    from_ts = pd.Timestamp(from_date)
+    to_ts = pd.Timestamp(to_date)
+    windows = []
+    current = from_ts
+    while current + pd.Timedelta(days=train_days + test_days) <= to_ts:
+        train_end = current + pd.Timedelta(days=train_days)
+        test_end = current + pd.Timedelta(days=train_days + test_days)
+        # 训练窗口：至少加载 train_cal 天，保证 SMA200 有足够 K 线
+        train_start = train_end - pd.Timedelta(days=train_cal)
+        # 测试窗口：从 train_end 前 lookback_cal 天开始加载
+        test_start = train_end - pd.Timedelta(days=lookback_cal)
+        windows.append((train_start, train_end, test_start, test_end))
+        current = current + pd.Timedelta(days=test_days)
+    return windows
+
+
+def _eval_wfa_window(cerebro_factory, strategy_cls, params, window, metric):
+    """单个 (参数, 窗口) 任务：先跑训练段，再跑测试段并返回 (测试段指标, 错误信息)。可在子进程执行。"""
+    train_start, train_end, test_start, test_end = window
+    try:
+        cerebro = cerebro_factory(train_start, train_end, strategy_cls, params)
+        if cerebro is None:
+            return None, None
+        cerebro.run()
+        cerebro2 = cerebro_factory(test_start, test_end, strategy_cls, params)
+        if cerebro2 is None:
+            return None, None
+        run_result = cerebro2.run()
+        strat = run_result[0] if run_result else None
+        return _extract_metric(strat, metric), None
+    except Exception as e:
+        return None, str(e)
+
+
 def walk_forward_analysis(cerebro_factory, strategy_cls, param_grid, train_days, test_days,
                           from_date, to_date, data_dir, universe_size=None,
-                          lookback_days=252, metric='sharperatio', maximize=True, logger=None):
+                          lookback_days=252, metric='sharperatio', maximize=True, logger=None, processes=1,
+                          pool=None):
     """
     向前步进分析：将区间按 train_days / test_days 滚动划分，每段用 train 区间跑，test 区间用该参数跑并记录指标。
     cerebro_factory: (start, end, strategy_cls, params) -> cerebro。
     lookback_days: 测试窗口加载数据时向前多取的天数。与 train_days 均会至少取 _WFA_MIN_CALENDAR_DAYS，
     以保证 SMA200 等指标有足够 K 线（252 个日历日仅约 174 个交易日，会触发 IndexError）。
+    processes: 并行进程数；各 (参数, 窗口) 相互独立，并行时 cerebro_factory 须可 pickle。pool 同 grid_search。
     """
     import pandas as pd
     log = logger or Logger()
     train_cal = max(train_days, _WFA_MIN_CALENDAR_DAYS)
     lookback_cal = max(lookback_days, _WFA_MIN_CALENDAR_DAYS)
-    from_ts = pd.Timestamp(from_date)
-    to_ts = pd.Timestamp(to_date)
-    results_per_params = defaultdict(list)
+    windows = _wfa_windows(from_date, to_date, train_days, test_days, train_cal, lookback_cal)
+    tasks = [(params, w) for params in _expand_param_grid(param_grid) for w in windows]
+
+    n_workers = _worker_count(processes, len(tasks), cerebro_factory, log, "cerebro_factory", pool)
+    if n_workers > 1:
+        log.info(f"  并行 WFA: {len(tasks)} 个 (参数, 窗口) 任务 / {n_workers} 进程")
+        outputs = _parallel_map(_eval_wfa_window, n_workers, log, itertools.repeat(cerebro_factory),
+                                itertools.repeat(strategy_cls), [t[0] for t in tasks], [t[1] for t in tasks],
+                                itertools.repeat(metric), pool=pool)
+    else:
+        outputs = [_eval_wfa_window(cerebro_factory, strategy_cls, p, w, metric) for p, w in tasks]
 
-    for params in _expand_param_grid(param_grid):
-        current = from_ts
-        test_metrics = []
-        while current + pd.Timedelta(days=train_days + test_days) <= to_ts:
-            train_end = current + pd.Timedelta(days=train_days)
-            test_end = current + pd.Timedelta(days=train_days + test_days)
-            try:
-                # 训练窗口：至少加载 train_cal 天，保证 SMA200 有足够 K 线
-                train_start = train_end - pd.Timedelta(days=train_cal)
-                cerebro = cerebro_factory(
-                    train_start, train_end,
-                    strategy_cls, params
-                )
-                if cerebro is None:
-                    current = current + pd.Timedelta(days=test_days)
-                    continue
-                cerebro.run()
-                # 测试窗口：从 train_end 前 lookback_cal 天开始加载
-                test_start = train_end - pd.Timedelta(days=lookback_cal)
-                cerebro2 = cerebro_factory(
-                    test_start, test_end,
-                    strategy_cls, params
-                )
-                if cerebro2 is None:
-                    current = current + pd.Timedelta(days=test_days)
-                    continue
-                run_result = cerebro2.run()
-                strat = run_result[0] if run_result else None
-                value = _extract_metric(strat, metric)
-                if value is not None:
-                    test_metrics.append(value)
-            except Exception as e:
-                if logger:
-                    log.warning(f"WFA 窗口 {current}~{test_end} 失败: {e}")
-            current = current + pd.Timedelta(days=test_days)
+    test_metrics_by_params = {}
+    for (params, window), (value, err) in zip(tasks, outputs):
+        key = tuple(sorted(params.items()))
+        test_metrics_by_params.setdefault(key, [])
+        if err and logger:
+            log.warning(f"WFA 窗口 {window[1] - pd.Timedelta(days=train_days)}~{window[3]} 失败: {err}")
+        if value is not None:
+            test_metrics_by_params[key].append(value)
 
+    results_per_params = defaultdict(list)
+    for key, test_metrics in test_metrics_by_params.items():
         if test_metrics:
             avg = sum(test_metrics) / len(test_metrics)
-            results_per_params[tuple(sorted(params.items()))].append(avg)
+            results_per_params[key].append(avg)
 
     # 对每组参数取平均 metric，选最优
     best_params = None
@@ -794,23 +959,37 @@ def validate_parameter_selection(cerebro_factory, strategy_cls, selected_params,
     return {'mean': mean_v, 'std': std_v, 'per_window': per_window}
 
 
+def _call_metric(run_backtest_func, params):
+    """调用 run_backtest_func(params)，返回 (指标, 错误信息)；可在子进程执行。"""
+    try:
+        val = run_backtest_func(params)
+        return (float(val) if val is not None else None), None
+    except Exception as e:
+        return None, str(e)
+
+
 def run_bayesian_optimization(param_grid, fixed_params, run_backtest_func, n_calls=50, maximize=True,
-                              random_state=42, logger=None):
+                              random_state=42, logger=None, refit_every=5, processes=1, pool=None):
     """
     贝叶斯优化（需 scikit-optimize）：在连续/离散参数空间上优化，调用 run_backtest_func(params_dict) 得到指标。
     param_grid: 仅网格键与候选值，如 {'atr_period': [10, 14, 20], 'risk_per_trade_pct': [0.02, 0.03, 0.04]}
     fixed_params: 固定参数，与 param_grid 合并成完整 params 传入 run_backtest_func。
     run_backtest_func: (params_dict) -> metric_value (float or None)
     n_calls: 贝叶斯优化迭代次数。
+    refit_every: n_calls > 50 时每 K 次评估才重拟合一次 GP（拟合代价随样本数立方增长），
+        两次拟合之间在参数空间随机探索；最后一次评估后强制重拟合。n_calls <= 50 时逐次拟合。
+    processes: 并行进程数；>1 时每批 ask 出 processes 个点并行回测（run_backtest_func 须可 pickle），
+        此时每批拟合一次，refit_every 不生效。pool 同 grid_search。
     返回: (best_params_dict, best_value)
     """
     try:
-        from skopt import gp_minimize
+        from skopt import Optimizer
         from skopt.space import Integer, Real, Categorical
     except ImportError:
         if logger:
             logger.warning("未安装 scikit-optimize (pip install scikit-optimize)，无法运行贝叶斯优化")
         return {}, None
+    import numpy as np
 
     log = logger or Logger()
     param_names = []
@@ -829,7 +1008,7 @@ def run_bayesian_optimization(param_grid, fixed_params, run_backtest_func, n_cal
     if not dimensions:
         return {}, None
 
-    def objective(x):
+    def to_params(x):
         # x 是 list，与 dimensions 顺序一致；Categorical 时 x 是索引
         params_list = list(x)
         d = {}
@@ -843,25 +1022,54 @@ def run_bayesian_optimization(param_grid, fixed_params, run_backtest_func, n_cal
             if isinstance(dimensions[i], Categorical):
                 v = vals[int(v)] if isinstance(v, (int, float)) else v
             d[k] = v
-        full = {**fixed_params, **d}
+        return {**fixed_params, **d}
+
+    def record(val, err):
+        if err and log:
+            log.warning(f"贝叶斯优化单次运行失败: {err}")
+        if val is None:
+            val = float('-inf') if maximize else float('inf')
+        raw_values.append(val)
+        return sign * val
+
+    n_initial = min(5, n_calls)
+    opt = Optimizer(dimensions, base_estimator='GP', n_initial_points=n_initial, random_state=random_state)
+    sign = -1.0 if maximize else 1.0
+    raw_values = []
+    n_workers = _worker_count(processes, n_calls, run_backtest_func, log, "run_backtest_func", pool)
+    if n_workers > 1:
+        # 批量 ask（constant liar）→ 进程池并行评估 → 批量 tell，每批拟合一次 GP
+        log.info(f"  并行贝叶斯优化: 每批 {n_workers} 点")
+        own_pool = pool is None
+        if own_pool:
+            pool = make_worker_pool(n_workers, log)
         try:
-            metric_val = run_backtest_func(full)
-            if metric_val is None:
-                return float('-inf') if maximize else float('inf')
-            return float(metric_val)
-        except Exception as e:
-            if log:
-                log.warning(f"贝叶斯优化单次运行失败: {e}")
-            return float('-inf') if maximize else float('inf')
-
-    result = gp_minimize(
-        lambda x: -objective(x) if maximize else objective(x),
-        dimensions,
-        n_calls=n_calls,
-        random_state=random_state,
-        n_initial_points=min(5, n_calls),
-    )
-    best_x = result.x
+            while len(raw_values) < n_calls:
+                xs = opt.ask(n_points=min(n_workers, n_calls - len(raw_values)))
+                outputs = list(pool.map(_call_metric, itertools.repeat(run_backtest_func), [to_params(x) for x in xs]))
+                ys = [record(val, err) for val, err in outputs]
+                opt.tell(xs, ys)
+        finally:
+            if own_pool:
+                pool.shutdown()
+    else:
+        # ask/tell 循环：按 refit_every 控制 GP 重拟合频率
+        refit_every = max(1, int(refit_every or 1)) if n_calls > 50 else 1
+        rng = np.random.RandomState(random_state)
+        seen = set()
+        for i in range(n_calls):
+            x = opt.ask()
+            if i >= n_initial and tuple(x) in seen:
+                # 未重拟合时 ask 会返回上次模型给出的旧点，改为随机探索
+                x = opt.space.rvs(n_samples=1, random_state=rng)[0]
+            seen.add(tuple(x))
+            y = record(*_call_metric(run_backtest_func, to_params(x)))
+            n_told = i + 1
+            fit = n_told <= n_initial or (n_told - n_initial) % refit_every == 0 or n_told == n_calls
+            opt.tell(x, y, fit=fit)
+
+    best_idx = int(np.argmin(opt.yi))
+    best_x = opt.Xi[best_idx]
     best_params = {}
     for i, k in enumerate(param_names):
         if i >= len(best_x):
@@ -870,14 +1078,13 @@ def run_bayesian_optimization(param_grid, fixed_params, run_backtest_func, n_cal
         vals = param_grid[k]
         if isinstance(dimensions[i], Categorical):
             v = vals[int(v)] if (isinstance(v, (int, float)) and 0 <= int(v) < len(vals)) else (v if v in vals else vals[0])
-        elif all(isinstance(vv, int) for vv in vals) and isinstance(v, float):
+        elif all(isinstance(vv, int) for vv in vals):
             v = int(round(v))
             v = min(max(v, min(vals)), max(vals))
         best_params[k] = v
     full_best = {**fixed_params, **best_params}
-    best_value = run_backtest_func(full_best) if result.fun is not None else None
-    if maximize and best_value is None:
-        best_value = -result.fun
-    elif not maximize and best_value is None:
-        best_value = result.fun
+    # 最优点已评估过，直接复用其指标，无需再跑一次回测
+    best_value = raw_values[best_idx]
+    if best_value in (float('inf'), float('-inf')):
+        best_value = None
     return full_best, best_value
@@ -0,0 +1,107 @@
+"""
+回测结果磁盘缓存：按 (参数, 数据签名) 记住单次回测的指标值，重复评估同一组参数时直接返回。
+缓存位于 <data_dir>/_cache/bt/<key>.pkl；数据签名包含行情文件的最大 mtime、项目代码 mtime 与回测区间/资金/成本，
+任一变化即自然失效（旧文件留在目录中，可随时整个删除）。
+"""
+import hashlib
+import inspect
+import json
+import os
+import pickle
+
+from data.manager import CACHE_DIR_NAME
+
+BT_CACHE_SUBDIR = 'bt'
+# 回测结果依赖的项目包（策略、仓位、数据加载/对齐、引擎成本与分析器、工具），任一 .py 修改即失效
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CODE_PACKAGES = ('strategy', 'portfolio', 'data', 'engine', 'utils')
+
+
+def _max_mtime_ns(folder, suffix):
+    latest, count = 0, 0
+    try:
+        with os.scandir(folder) as it:
+            for entry in it:
+                if entry.name.endswith(suffix) and entry.is_file():
+                    latest = max(latest, entry.stat().st_mtime_ns)
+                    count += 1
+    except OSError:
+        pass
+    return latest, count
+
+
+def _code_mtime_ns():
+    """CODE_PACKAGES 下（含子包）所有 .py 的 (最大 mtime, 文件数)。"""
+    latest, count = 0, 0
+    for pkg in CODE_PACKAGES:
+        for folder, dirs, _ in os.walk(os.path.join(_PROJECT_ROOT, pkg)):
+            dirs[:] = [d for d in dirs if d != '__pycache__']
+            m, n = _max_mtime_ns(folder, '.py')
+            latest, count = max(latest, m), count + n
+    return latest, count
+
+
+def data_signature(data, strategy_cls=None):
+    """
+    数据签名：data_dir 下 CSV 的 (最大 mtime, 文件数)、回测所用项目包 .py 的最大 mtime、
+    策略所在目录 .py 的最大 mtime（策略定义在项目包外时），以及区间、股票池、资金与成本等影响回测结果的配置。
+    每次 run_optimization 计算一次即可。
+    """
+    data_dir = data.get('data_dir') or ''
+    parts = {
+        'csv': _max_mtime_ns(data_dir, '.csv'),
+        'pkgs': _code_mtime_ns(),
+        'keys': {k: str(data.get(k)) for k in ('from_date', 'to_date', 'universe_size', 'universe_seed',
+                                                'initial_capital', 'commission', 'slippage', 'min_bars')},
+    }
+    if strategy_cls is not None:
+        try:
+            src_dir = os.path.dirname(inspect.getsourcefile(strategy_cls))
+            parts['code'] = (f"{strategy_cls.__module__}.{strategy_cls.__qualname__}", _max_mtime_ns(src_dir, '.py'))
+        except (TypeError, OSError):
+            parts['code'] = strategy_cls.__qualname__
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+class CachedMetric:
+    """
+    包装 params -> metric 的回测函数（如贝叶斯优化目标），结果按参数哈希落盘。可 pickle，可在进程池中使用。
+    namespace 用于区分同一数据下的不同指标/用途（如 metric 名）。读写失败时退化为直接调用。
+    """
+
+    def __init__(self, func, cache_dir, data_sig, namespace=''):
+        self.func = func
+        self.cache_dir = cache_dir
+        self.data_sig = data_sig
+        self.namespace = str(namespace)
+
+    def key(self, params):
+        payload = json.dumps(params, sort_keys=True, default=str) + self.data_sig + self.namespace
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    def __call__(self, params):
+        path = os.path.join(self.cache_dir, self.key(params) + '.pkl')
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            pass  # 缺失、损坏或无法反序列化（如类定义已变）的缓存一律重算
+        value = self.func(params)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                pickle.dump(value, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+        return value
+
+
+def cached_metric(func, data, strategy_cls=None, namespace=''):
+    """用 data['data_dir']/_cache/bt 作为缓存目录包装 func；无 data_dir 时原样返回 func。"""
+    data_dir = data.get('data_dir')
+    if not data_dir:
+        return func
+    cache_dir = os.path.join(data_dir, CACHE_DIR_NAME, BT_CACHE_SUBDIR)
+    return CachedMetric(func, cache_dir, data_signature(data, strategy_cls), namespace=namespace)
@@ -12,6 +12,8 @@ def cli():
     parser = argparse.ArgumentParser(description='回测或下载数据')
     parser.add_argument('--download', action='store_true', help='下载 S&P 500 全量数据（使用 config 中的日期与目录）')
     parser.add_argument('--download-spy', action='store_true', help='仅下载 SPY（使用 config 中的日期与目录）')
+    parser.add_argument('--force-download', action='store_true', dest='force_download',
+                        help='配合 --download / --download-spy：忽略本地已有数据，全部重新下载')
     parser.add_argument('--download-fundamentals', action='store_true', dest='download_fundamentals',
                         help='拉取基本面（yfinance）并保存为 data_dir/fundamentals.csv')
     parser.add_argument('--optimize', action='store_true', help='参数优化：使用 config 中 optimization（默认 grid）')
@@ -21,20 +23,25 @@ def cli():
                         help='参数优化：贝叶斯优化（需 scikit-optimize，覆盖 config 中 method）')
     parser.add_argument('--multi-strategy', action='store_true', dest='multi_strategy',
                         help='多策略并行：按权重分配资金运行后合并收益曲线（使用 config 中 multi_strategy）')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='优化/多策略并行进程数（覆盖 config 中 optimization.processes；1=串行）')
+    parser.add_argument('--rebuild-cache', action='store_true', dest='rebuild_cache',
+                        help='忽略已有行情缓存（data_dir/_cache），从 CSV 全部重建')
     args = parser.parse_args()
     if args.download:
         config = load_config()
-        download_all(config)
+        download_all(config, force=args.force_download)
     elif args.download_spy:
         config = load_config()
-        download_spy_only(config)
+        download_spy_only(config, force=args.force_download)
     elif args.download_fundamentals:
         config = load_config()
         download_fundamentals(config)
     else:
         force_opt = args.optimize or args.optimize_wfa or args.optimize_bayesian
         method = 'walk_forward' if args.optimize_wfa else ('bayesian' if args.optimize_bayesian else None)
-        main(force_optimize=force_opt, force_multi_strategy=args.multi_strategy, optimize_method=method)
+        main(force_optimize=force_opt, force_multi_strategy=args.multi_strategy, optimize_method=method,
+             processes=args.processes, rebuild_cache=args.rebuild_cache)
 
 
 if __name__ == '__main__':
@@ -19,16 +19,10 @@ class PortfolioManager:
     def calculate_position_size(self, account_value, price, atr, method='risk_parity', **kwargs):
         if price <= 0:
             return 0
-        risk_pct = kwargs.get('risk_pct', self.default_risk_per_trade)
-        stop_mult = kwargs.get('stop_mult', self.default_stop_atr_mult)
-        return risk.position_size(
-            account_value, price, atr,
-            method=method,
-            max_positions=self.max_positions,
-            max_leverage=self.max_leverage,
-            risk_pct=risk_pct,
-            stop_mult=stop_mult
-        )
+        kwargs.setdefault('risk_pct', self.default_risk_per_trade)
+        kwargs.setdefault('stop_mult', self.default_stop_atr_mult)
+        return risk.position_size(account_value, price, atr, method=method, max_positions=self.max_positions,
+                                  max_leverage=self.max_leverage, **kwargs)
 
     def check_cash_availability(self, current_cash, estimated_cost):
         buffer = current_cash * 0.02
@@ -1,31 +1,44 @@
 """仓位与风险计算：风险平价、等权、杠杆检查等"""
 # 供 portfolio.manager 调用，也可单独用于回测外的测算
 
+def _risk_parity_shares(account_value, price, atr, max_positions, max_leverage, kwargs):
+    if atr <= 0:
+        return 0
+    risk_amount = account_value * kwargs.get('risk_pct', 0.02)
+    stop_distance = atr * kwargs.get('stop_mult', 3.0)
+    if stop_distance > 0:
+        return int(risk_amount / stop_distance)
+    return 0
+
+
+def _equal_weight_shares(account_value, price, atr, max_positions, max_leverage, kwargs):
+    allocation_pct = 1.0 / max_positions
+    target_value = account_value * allocation_pct * max_leverage
+    return int(target_value / price)
+
+
+def _fixed_fraction_shares(account_value, price, atr, max_positions, max_leverage, kwargs):
+    target_value = account_value * kwargs.get('fixed_pct', 0.10)
+    return int(target_value / price)
+
+
+# method → 股数计算函数，按表一次查找分派；未知 method 股数为 0
+SIZERS = {
+    'risk_parity': _risk_parity_shares,
+    'equal_weight': _equal_weight_shares,
+    'fixed_fraction': _fixed_fraction_shares,
+}
+
+
 def position_size(account_value, price, atr, method='risk_parity', max_positions=10, max_leverage=1.0, **kwargs):
     """
     计算应买股数。
-    method: risk_parity / equal_weight / fixed_fraction
+    method: risk_parity / equal_weight / fixed_fraction（见 SIZERS）
     """
     if price <= 0:
         return 0
-    risk_pct = kwargs.get('risk_pct', 0.02)
-    stop_mult = kwargs.get('stop_mult', 3.0)
-    target_shares = 0
-    if method == 'risk_parity':
-        if atr <= 0:
-            return 0
-        risk_amount = account_value * risk_pct
-        stop_distance = atr * stop_mult
-        if stop_distance > 0:
-            target_shares = int(risk_amount / stop_distance)
-    elif method == 'equal_weight':
-        allocation_pct = 1.0 / max_positions
-        target_value = account_value * allocation_pct * max_leverage
-        target_shares = int(target_value / price)
-    elif method == 'fixed_fraction':
-        fixed_pct = kwargs.get('fixed_pct', 0.10)
-        target_value = account_value * fixed_pct
-        target_shares = int(target_value / price)
+    sizer = SIZERS.get(method)
+    target_shares = sizer(account_value, price, atr, max_positions, max_leverage, kwargs) if sizer else 0
     max_allocation = account_value * 0.30
     if target_shares * price > max_allocation:
         target_shares = int(max_allocation / price)
@@ -1,5 +1,8 @@
 # 回测流程：配置 → 数据 → 选股 → 策略 → 引擎 → 运行 → 分析 → 可视化
+import contextlib
+import functools
 import math
+import numpy as np
 import pandas as pd
 from run.imports import (
     os,
@@ -15,11 +18,15 @@ from run.imports import (
     plot_beta_analysis,
     plot_trades_on_prices,
     report_from_returns,
-    get_beta_alpha_summary,
-    load_benchmark_returns,
+    compute_return_stats,
+    format_beta_alpha,
+    load_benchmark_close,
     get_sp500_tickers,
     download_data,
     download_spy,
+    universe_files,
+    build_ohlcv_cache,
+    SharedOHLCV,
     UNIVERSE_NAME,
     DEFAULT_DATA_DIR,
 )
@@ -30,8 +37,13 @@ from engine.optimizer import (
     run_bayesian_optimization,
     compute_composite_score,
     grid_search,
+    make_worker_pool,
+    resolve_processes,
     _extract_metric,
 )
+from engine.fast_eval import FastEvaluator, fast_grid_search
+from engine.result_cache import cached_metric
+from utils.jit import warm_cache
 from utils.logger import Logger, PREFIX_CONFIG, PREFIX_DATA, PREFIX_OPTIM, PREFIX_ENGINE, PREFIX_ANALYSIS, PREFIX_VALID
 
 # 多策略：名称 -> 策略类，便于 yaml 中写 name: screener
@@ -56,11 +68,45 @@ def _resolve_composite_weights(opt):
     return None
 
 
-def make_cerebro_factory(data, fixed_params=None, min_bars=252):
-    """返回 (start, end, strategy_cls, params) -> cerebro，用于 WFA / 多窗口验证。min_bars 保证窗口内 K 线不足的标的不加载，避免 SMA200 等越界。"""
-    def factory(start, end, strategy_cls, params):
-        full = {**fixed_params, **params} if fixed_params else params
-        data_w = {**data, 'from_date': start, 'to_date': end, 'min_bars': min_bars}
+class GridCerebroFactory:
+    """params -> cerebro（全区间回测），可 pickle，供并行网格搜索在子进程中构建引擎。"""
+
+    def __init__(self, data, fixed_params=None, strategy_cls=ModularScreenerStrategy):
+        self.data = data
+        self.fixed_params = dict(fixed_params or {})
+        self.strategy_cls = strategy_cls
+
+    def __call__(self, params):
+        full = self.fixed_params.copy()
+        full.update(params)
+        eng = BacktestEngine(
+            data=self.data,
+            strategy=self.strategy_cls,
+            strategy_params=full,
+            initial_capital=self.data['initial_capital'],
+            commission=self.data['commission'],
+            slippage=self.data['slippage'],
+        )
+        return eng.cerebro
+
+
+class WindowCerebroFactory:
+    """(start, end, strategy_cls, params) -> cerebro，可 pickle，供 WFA / 多窗口验证（含并行）使用。"""
+
+    def __init__(self, data, fixed_params=None, min_bars=252):
+        self.data = data
+        self.fixed_params = dict(fixed_params or {})
+        self.min_bars = min_bars
+        # 固定部分在构造时展开一次，每次调用只 copy + update
+        self._data_base = {**data, 'min_bars': min_bars}
+
+    def __call__(self, start, end, strategy_cls, params):
+        data = self.data
+        full = self.fixed_params.copy()
+        full.update(params)
+        data_w = self._data_base.copy()
+        data_w['from_date'] = start
+        data_w['to_date'] = end
         engine = BacktestEngine(
             data=data_w,
             strategy=strategy_cls,
@@ -70,7 +116,11 @@ def make_cerebro_factory(data, fixed_params=None, min_bars=252):
             slippage=data['slippage'],
         )
         return engine.cerebro
-    return factory
+
+
+def make_cerebro_factory(data, fixed_params=None, min_bars=252):
+    """返回 (start, end, strategy_cls, params) -> cerebro，用于 WFA / 多窗口验证。min_bars 保证窗口内 K 线不足的标的不加载，避免 SMA200 等越界。"""
+    return WindowCerebroFactory(data, fixed_params, min_bars=min_bars)
 
 
 def _run_single_backtest_metric(data, strategy_cls, params, metric):
@@ -126,21 +176,75 @@ def get_stock_universe(data):
     data_dir = data['data_dir']
     if not os.path.isdir(data_dir):
         return []
-    files = sorted([f for f in os.listdir(data_dir) if f.endswith('.csv')])
-    if 'SPY.csv' in files:
-        files.remove('SPY.csv')
-    universe_size = data.get('universe_size')
-    universe_seed = data.get('universe_seed')
-    if universe_size is not None and universe_size > 0:
-        if universe_seed is not None:
-            import random
-            rng = random.Random(universe_seed)
-            files = files.copy()
-            rng.shuffle(files)
-        files = files[:universe_size]
+    files = universe_files(data_dir, data.get('universe_size'), data.get('universe_seed'))
     return [f.replace('.csv', '') for f in files]
 
 
+@contextlib.contextmanager
+def _optimization_pool(data, processes, log, enabled=True):
+    """
+    优化阶段的进程池：主进程把 SPY 与股票池全量行情打包进共享内存（SharedOHLCV），
+    worker 初始化时挂载，之后每组参数回测只读内存、不再各自读盘解析。processes<=1 或未启用时产出 None。
+    """
+    n_workers = resolve_processes(processes)
+    data_dir = data.get('data_dir')
+    if not enabled or n_workers <= 1 or not data_dir or not os.path.isdir(data_dir):
+        yield None
+        return
+    files = ['SPY.csv'] + universe_files(data_dir, data.get('universe_size'), data.get('universe_seed'))
+    with SharedOHLCV(os.path.join(data_dir, f) for f in files if os.path.isfile(os.path.join(data_dir, f))) as shared:
+        log.info(f"  共享行情: {shared.n_frames} 只 / {shared.nbytes / 1e6:.1f} MB，{n_workers} 进程")
+        with make_worker_pool(n_workers, log, shared.spec) as pool:
+            yield pool
+
+
+class PoolSession:
+    """
+    main() 生命周期内共享的进程池：首次 pool() 时按 _optimization_pool 创建（挂载共享行情），
+    之后优化搜索、多策略等各阶段复用同一批 worker；退出 with 时统一关闭。processes<=1 时 pool() 为 None。
+    """
+
+    def __init__(self, data, processes, log):
+        self.data = data
+        self.processes = processes
+        self.log = log
+        self._stack = contextlib.ExitStack()
+        self._pool = None
+        self._opened = False
+
+    def pool(self):
+        if not self._opened:
+            self._opened = True
+            self._pool = self._stack.enter_context(_optimization_pool(self.data, self.processes, self.log))
+        return self._pool
+
+    def close(self):
+        self._stack.close()
+        self._pool, self._opened = None, False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _strategy_returns(data, strat_cls, params, capital):
+    """单个策略独立回测，返回 Returns 分析器的 {日期: 日收益}；可在进程池 worker 中执行。"""
+    engine = BacktestEngine(
+        data=data,
+        strategy=strat_cls,
+        strategy_params=params,
+        initial_capital=capital,
+        commission=data['commission'],
+        slippage=data['slippage'],
+    )
+    result = engine.run()
+    if result is not None and hasattr(result, 'analyzers') and hasattr(result.analyzers, 'returns'):
+        return dict(result.analyzers.returns.get_analysis())
+    return None
+
+
 def analyze_results(strategy_instance):
     """分析回测结果，返回 PerformanceAnalyzer 实例"""
     return PerformanceAnalyzer(strategy_instance)
@@ -151,23 +255,23 @@ def _date_str(dt):
     return dt.strftime('%Y-%m-%d') if hasattr(dt, 'strftime') else str(dt)[:10]
 
 
-def download_all(config):
-    """按配置下载 S&P 500 全量数据（使用 config 中的 data_dir 与日期）"""
+def download_all(config, force=False):
+    """按配置下载 S&P 500 全量数据（使用 config 中的 data_dir 与日期）；已覆盖区间的标的跳过"""
     bt_config = config['bt']
     data_dir = config['data_dir']
     start = _date_str(bt_config.get('start_date', '2017-01-01'))
     end = _date_str(bt_config.get('end_date', '2026-02-01'))
     tickers = get_sp500_tickers()
-    download_data(tickers, start_date=start, end_date=end, data_dir=data_dir)
+    download_data(tickers, start_date=start, end_date=end, data_dir=data_dir, force=force)
 
 
-def download_spy_only(config):
-    """按配置仅下载 SPY（使用 config 中的 data_dir 与日期）"""
+def download_spy_only(config, force=False):
+    """按配置仅下载 SPY（使用 config 中的 data_dir 与日期）；已覆盖区间时跳过"""
     bt_config = config['bt']
     data_dir = config['data_dir']
     start = _date_str(bt_config.get('start_date', '2017-01-01'))
     end = _date_str(bt_config.get('end_date', '2026-02-01'))
-    download_spy(start_date=start, end_date=end, data_dir=data_dir)
+    download_spy(start_date=start, end_date=end, data_dir=data_dir, force=force)
 
 
 def download_fundamentals(config, max_tickers=None):
@@ -205,8 +309,11 @@ def _build_optimization_grid_and_fixed(param_grid, strategy_defaults):
     return grid_only, fixed_params
 
 
-def run_optimization(config, data, method_override=None):
-    """参数优化：grid | walk_forward | bayesian，可选多窗口验证。method_override 供 CLI 快速切换。"""
+def run_optimization(config, data, method_override=None, ctx=None):
+    """
+    参数优化：grid | walk_forward | bayesian，可选多窗口验证。method_override 供 CLI 快速切换。
+    ctx 为 PoolSession 时复用其进程池，否则按需临时创建。
+    """
     opt = config.get('optimization', {})
     param_grid = opt.get('param_grid', {})
     if not param_grid:
@@ -229,40 +336,122 @@ def run_optimization(config, data, method_override=None):
         log.warning("metric=composite 需配置 composite_weights 或 composite_preset（balanced/aggressive/conservative）")
     max_combos = opt.get('max_combos')
     random_state = int(opt.get('random_state', 42))
+    processes = opt.get('processes')
 
     best_params, best_value, all_results = None, None, []
     log = Logger()
 
-    if method == 'grid':
-        product = math.prod(len(v) for v in grid_only.values()) if grid_only else 0
-        use_sampled_grid = max_combos is not None and product > max_combos
-        if use_sampled_grid:
-            def _grid_cerebro_factory(params):
-                full = {**fixed_params, **params}
-                eng = BacktestEngine(
+    product = math.prod(len(v) for v in grid_only.values()) if grid_only else 0
+    use_sampled_grid = max_combos is not None and product > max_combos
+    # 网格全量走 backtrader optstrategy（自带 maxcpus 多进程），其余并行路径共用一个挂载共享行情的进程池
+    evaluator = None
+    if opt.get('fast_eval', False) and method in ('grid', 'bayesian'):
+        try:
+            evaluator = FastEvaluator(data, metric)
+            log.info("  fast_eval: 以向量化选股代理指标评估参数（不跑 Cerebro），最终参数仍完整回测")
+        except ValueError as e:
+            log.warning(f"fast_eval 不可用，改用完整回测: {e}")
+    needs_pool = evaluator is None and (
+        method in ('walk_forward', 'bayesian') or (method == 'grid' and use_sampled_grid))
+    if ctx is not None:
+        pool_cm = contextlib.nullcontext(ctx.pool() if needs_pool else None)
+    else:
+        pool_cm = _optimization_pool(data, processes, log, enabled=needs_pool)
+    with pool_cm as pool:
+        if method == 'grid':
+            if evaluator is not None:
+                best_params, best_value, all_results = fast_grid_search(
+                    evaluator, grid_only, fixed_params, maximize=maximize,
+                    max_combos=max_combos, random_state=random_state,
+                )
+            elif use_sampled_grid:
+                _is_composite = metric and str(metric).lower() == 'composite' and composite_weights
+                _best, _val, _raw = grid_search(
+                    GridCerebroFactory(data, fixed_params),
+                    ModularScreenerStrategy,
+                    grid_only,
+                    metric=metric,
+                    maximize=maximize,
+                    max_combos=max_combos,
+                    random_state=random_state,
+                    composite_weights=composite_weights if _is_composite else None,
+                    logger=log,
+                    processes=processes,
+                    pool=pool,
+                )
+                all_results = [(p, v) for p, v, _ in _raw]
+                best_params, best_value = _best, _val
+            else:
+                engine = BacktestEngine(
                     data=data,
-                    strategy=ModularScreenerStrategy,
-                    strategy_params=full,
+                    strategy=None,
                     initial_capital=data['initial_capital'],
                     commission=data['commission'],
                     slippage=data['slippage'],
                 )
-                return eng.cerebro
-            _is_composite = metric and str(metric).lower() == 'composite' and composite_weights
-            _best, _val, _raw = grid_search(
-                _grid_cerebro_factory,
+                best_params, best_value, all_results = engine.run_optimization(
+                    ModularScreenerStrategy,
+                    param_grid=merged_params,
+                    metric=metric,
+                    maximize=maximize,
+                    composite_weights=composite_weights if (metric and str(metric).lower() == 'composite') else None,
+                    processes=processes,
+                )
+            if metric and str(metric).lower() == 'composite' and composite_weights and all_results and isinstance(all_results[0][1], dict):
+                all_results = compute_composite_score(all_results, composite_weights, maximize=maximize)
+                best_params = all_results[0][0] if all_results else None
+                best_value = all_results[0][1] if all_results else None
+            log.section("参数优化结果 (网格搜索)")
+        elif method == 'walk_forward':
+            train_days = int(opt.get('walk_forward_train_days', 252))
+            test_days = int(opt.get('walk_forward_test_days', 63))
+            lookback_days = int(opt.get('walk_forward_lookback_days', 252))  # 测试窗口前多加载天数，供 SMA200 等 warmup
+            cerebro_factory = make_cerebro_factory(data, fixed_params)
+            best_params, best_value, wfa_results = walk_forward_analysis(
+                cerebro_factory,
                 ModularScreenerStrategy,
                 grid_only,
+                train_days,
+                test_days,
+                data['from_date'],
+                data['to_date'],
+                data.get('data_dir'),
+                data.get('universe_size'),
+                lookback_days=lookback_days,
                 metric=metric,
                 maximize=maximize,
-                max_combos=max_combos,
+                logger=log,
+                processes=processes,
+                pool=pool,
+            )
+            all_results = [(p, v) for p, v, _ in wfa_results]
+            print("\n🔬 参数优化结果 (Walk-Forward)")
+        elif method == 'bayesian':
+            n_calls = int(opt.get('bayesian_n_calls', 50))
+            # partial 可 pickle，便于并行评估
+            run_backtest = functools.partial(_run_single_backtest_metric, data, ModularScreenerStrategy, metric=metric)
+            if evaluator is not None:
+                run_backtest = evaluator
+            elif opt.get('result_cache'):
+                # 同一组参数（含跨次运行）直接读 <data_dir>/_cache/bt，行情或策略代码变化自动失效
+                run_backtest = cached_metric(run_backtest, data, ModularScreenerStrategy, namespace=metric)
+            best_params, best_value = run_bayesian_optimization(
+                grid_only,
+                fixed_params,
+                run_backtest,
+                n_calls=n_calls,
+                maximize=maximize,
                 random_state=random_state,
-                composite_weights=composite_weights if _is_composite else None,
                 logger=log,
+                refit_every=int(opt.get('bayesian_refit_every', 5)),
+                processes=1 if evaluator is not None else processes,
+                pool=pool,
             )
-            all_results = [(p, v) for p, v, _ in _raw]
-            best_params, best_value = _best, _val
+            all_results = [(best_params, best_value)] if best_params else []
+            log.section("参数优化结果 (贝叶斯优化)")
         else:
+            log.warning(f"未知 optimization.method: {method}，使用 grid")
+            method = 'grid'
             engine = BacktestEngine(
                 data=data,
                 strategy=None,
@@ -275,64 +464,8 @@ def run_optimization(config, data, method_override=None):
                 param_grid=merged_params,
                 metric=metric,
                 maximize=maximize,
-                composite_weights=composite_weights if (metric and str(metric).lower() == 'composite') else None,
+                processes=processes,
             )
-        if metric and str(metric).lower() == 'composite' and composite_weights and all_results and isinstance(all_results[0][1], dict):
-            all_results = compute_composite_score(all_results, composite_weights, maximize=maximize)
-            best_params = all_results[0][0] if all_results else None
-            best_value = all_results[0][1] if all_results else None
-        log.section("参数优化结果 (网格搜索)")
-    elif method == 'walk_forward':
-        train_days = int(opt.get('walk_forward_train_days', 252))
-        test_days = int(opt.get('walk_forward_test_days', 63))
-        lookback_days = int(opt.get('walk_forward_lookback_days', 252))  # 测试窗口前多加载天数，供 SMA200 等 warmup
-        cerebro_factory = make_cerebro_factory(data, fixed_params)
-        best_params, best_value, wfa_results = walk_forward_analysis(
-            cerebro_factory,
-            ModularScreenerStrategy,
-            grid_only,
-            train_days,
-            test_days,
-            data['from_date'],
-            data['to_date'],
-            data.get('data_dir'),
-            data.get('universe_size'),
-            lookback_days=lookback_days,
-            metric=metric,
-            maximize=maximize,
-            logger=log,
-        )
-        all_results = [(p, v) for p, v, _ in wfa_results]
-        print("\n🔬 参数优化结果 (Walk-Forward)")
-    elif method == 'bayesian':
-        n_calls = int(opt.get('bayesian_n_calls', 50))
-        run_backtest = lambda p: _run_single_backtest_metric(data, ModularScreenerStrategy, p, metric)
-        best_params, best_value = run_bayesian_optimization(
-            grid_only,
-            fixed_params,
-            run_backtest,
-            n_calls=n_calls,
-            maximize=maximize,
-            logger=log,
-        )
-        all_results = [(best_params, best_value)] if best_params else []
-        log.section("参数优化结果 (贝叶斯优化)")
-    else:
-        log.warning(f"未知 optimization.method: {method}，使用 grid")
-        method = 'grid'
-        engine = BacktestEngine(
-            data=data,
-            strategy=None,
-            initial_capital=data['initial_capital'],
-            commission=data['commission'],
-            slippage=data['slippage'],
-        )
-        best_params, best_value, all_results = engine.run_optimization(
-            ModularScreenerStrategy,
-            param_grid=merged_params,
-            metric=metric,
-            maximize=maximize,
-        )
 
     # 最终参数：grid/walk_forward 可再经 plateau/robust 等选择；bayesian 直接用最优
     if method == 'bayesian' or not all_results:
@@ -414,8 +547,8 @@ def run_optimization(config, data, method_override=None):
     return final_params, final_metric, all_results
 
 
-def run_multi_strategy(config, data):
-    """多策略并行：各策略按权重分配资金独立运行，再合并收益曲线。"""
+def run_multi_strategy(config, data, ctx=None):
+    """多策略并行：各策略按权重分配资金独立运行，再合并收益曲线。ctx 为 PoolSession 时各策略在其进程池中并行回测。"""
     multi = config.get('multi_strategy', {})
     strategies_cfg = multi.get('strategies', [])
     log = Logger()
@@ -423,45 +556,39 @@ def run_multi_strategy(config, data):
         log.warning("multi_strategy.strategies 为空")
         return
     total_capital = data['initial_capital']
-    returns_list = []
-    weights = []
+    jobs = []
     for item in strategies_cfg:
         name = item.get('name', 'screener')
-        params = item.get('params', {})
         weight = float(item.get('weight', 1.0 / len(strategies_cfg)))
         strat_cls = STRATEGY_REGISTRY.get(name, ModularScreenerStrategy)
-        capital = total_capital * weight
-        engine = BacktestEngine(
-            data=data,
-            strategy=strat_cls,
-            strategy_params=params,
-            initial_capital=capital,
-            commission=data['commission'],
-            slippage=data['slippage'],
-        )
-        result = engine.run()
-        if result is not None and hasattr(result, 'analyzers') and hasattr(result.analyzers, 'returns'):
-            ret_dict = result.analyzers.returns.get_analysis()
-            ret_series = pd.Series(ret_dict)
-            ret_series.index = pd.to_datetime(ret_series.index)
-            returns_list.append(ret_series)
-    if not returns_list:
+        jobs.append((weight, (data, strat_cls, item.get('params', {}), total_capital * weight)))
+    pool = ctx.pool() if ctx is not None and len(jobs) > 1 else None
+    if pool is not None:
+        futures = [pool.submit(_strategy_returns, *args) for _, args in jobs]
+        ret_dicts = [f.result() for f in futures]
+    else:
+        ret_dicts = [_strategy_returns(*args) for _, args in jobs]
+    valid = [(w, d) for (w, _), d in zip(jobs, ret_dicts) if d is not None]
+    if not valid:
         print("⚠️ 无有效策略收益")
         return
-    # 对齐日期：并集，缺失填 0
-    all_index = returns_list[0].index
-    for r in returns_list[1:]:
-        all_index = all_index.union(r.index)
-    blended = pd.Series(0.0, index=all_index)
-    used_weights = weights[:len(returns_list)]
-    for ret_series, w in zip(returns_list, used_weights):
-        blended = blended.add(ret_series.reindex(all_index).fillna(0) * w, fill_value=0)
+    # 对齐日期：原始日期键取并集后只转换一次 DatetimeIndex，缺失填 0；按权重一次矩阵乘合成
+    keys = sorted(set().union(*(d.keys() for _, d in valid)))
+    pos = {k: i for i, k in enumerate(keys)}
+    mat = np.zeros((len(keys), len(valid)))
+    for j, (_, d) in enumerate(valid):
+        mat[[pos[k] for k in d], j] = list(d.values())
+    weights = np.array([w for w, _ in valid], dtype=np.float64)
+    blended = pd.Series(mat @ weights, index=pd.DatetimeIndex(keys))
     report_from_returns(blended)
     visualize_results(None, data['data_dir'], rets_override=blended)
 
 
 def visualize_results(report, data_dir, rets_override=None, logger=None):
-    """生成净值曲线、回撤图、滚动指标、月度热力图、Beta 分析。若 rets_override 有值则用其作为收益序列（多策略合并时）。"""
+    """
+    生成净值曲线、回撤图、滚动指标、月度热力图、Beta 分析。若 rets_override 有值则用其作为收益序列（多策略合并时）。
+    SPY 只读一次，净值/回撤/滚动指标/月度/Beta 由 compute_return_stats 一次算好后传给各图。
+    """
     benchmark_csv = os.path.join(data_dir, 'SPY.csv')
     rets = rets_override if rets_override is not None else (report.rets if report is not None and hasattr(report, 'rets') else None)
     if rets is None or (hasattr(rets, 'empty') and rets.empty):
@@ -469,15 +596,15 @@ def visualize_results(report, data_dir, rets_override=None, logger=None):
             logger.warning("无收益数据，跳过可视化")
         return
     out = lambda msg: (logger.info(msg) if logger else print(msg))
-    plot_equity_curve(rets, benchmark_csv=benchmark_csv, logger=logger)
-    plot_drawdown(rets, logger=logger)
-    plot_rolling_metrics(rets, window=252, save_path='rolling_metrics.png', logger=logger)
-    plot_monthly_heatmap(rets, save_path='monthly_heatmap.png', logger=logger)
-    plot_beta_analysis(rets, benchmark_csv=benchmark_csv, save_path='beta_analysis.png', logger=logger)
+    stats = compute_return_stats(rets, bench_close=load_benchmark_close(benchmark_csv), window=252)
+    plot_equity_curve(rets, benchmark_csv=benchmark_csv, logger=logger, stats=stats)
+    plot_drawdown(rets, logger=logger, stats=stats)
+    plot_rolling_metrics(rets, window=252, save_path='rolling_metrics.png', logger=logger, stats=stats)
+    plot_monthly_heatmap(rets, save_path='monthly_heatmap.png', logger=logger, stats=stats)
+    plot_beta_analysis(rets, benchmark_csv=benchmark_csv, save_path='beta_analysis.png', logger=logger, stats=stats)
     if report is not None and hasattr(report, 'strat'):
         plot_trades_on_prices(report.strat, data_dir, save_dir='.', max_stocks=30, logger=logger)
-    bench_rets = load_benchmark_returns(benchmark_csv)
-    beta_summary = get_beta_alpha_summary(rets, bench_rets)
+    beta_summary = format_beta_alpha(stats['beta'])
     if beta_summary:
         out("\n📊 基准对冲 (vs SPY)")
         out("-" * 40)
@@ -506,9 +633,12 @@ def _auto_max_pos_by_capital(initial_capital, base_max_pos):
     return max(base_max_pos, 15)
 
 
-def main(force_optimize=False, force_multi_strategy=False, optimize_method=None):
+def main(force_optimize=False, force_multi_strategy=False, optimize_method=None, processes=None,
+         rebuild_cache=False):
     # 1. 初始化配置
     config = load_config()
+    if processes is not None:
+        config.setdefault('optimization', {})['processes'] = processes
     log_cfg = config.get('logging') or {}
     log = Logger(
         log_dir=log_cfg.get('log_dir', 'logs'),
@@ -517,6 +647,8 @@ def main(force_optimize=False, force_multi_strategy=False, optimize_method=None)
         quiet_console_init=log_cfg.get('quiet_console_init', False),
     )
     log.info(f"{PREFIX_CONFIG} 配置已加载 | 数据源: {config['universe']} ({config['data_dir']})")
+    # Numba 内核预热：首次运行编译并缓存，之后直接加载（未安装 numba 时跳过）
+    warm_cache()
 
     # 2. 数据准备
     data = prepare_data(config)
@@ -524,14 +656,19 @@ def main(force_optimize=False, force_multi_strategy=False, optimize_method=None)
     # 3. 筛选股票池（获取待加载标的列表；策略内 Screener 逐日筛选）
     stock_universe = get_stock_universe(data)
     log.info(f"{PREFIX_DATA} 数据目录下共 {len(stock_universe)} 只标的可加载")
-
-    if force_optimize or config.get('optimization', {}).get('enabled'):
-        run_optimization(config, data, method_override=optimize_method)
-        return
-
-    if force_multi_strategy or config.get('multi_strategy', {}).get('enabled'):
-        run_multi_strategy(config, data)
-        return
+    # 行情二进制缓存：CSV 未变时后续每次回测（含优化的每组参数）直接读缓存
+    n_cached = build_ohlcv_cache(data['data_dir'], stock_universe + ['SPY'], rebuild=rebuild_cache, logger=log)
+    log.debug(f"{PREFIX_DATA} 行情缓存就绪: {n_cached} 只")
+
+    # 优化 / 多策略共用一个进程池（首次需要时创建），main 结束时关闭
+    with PoolSession(data, config.get('optimization', {}).get('processes'), log) as ctx:
+        if force_optimize or config.get('optimization', {}).get('enabled'):
+            run_optimization(config, data, method_override=optimize_method, ctx=ctx)
+            return
+
+        if force_multi_strategy or config.get('multi_strategy', {}).get('enabled'):
+            run_multi_strategy(config, data, ctx=ctx)
+            return
 
     # 4. 单策略回测
     strategy = ModularScreenerStrategy
@@ -4,7 +4,13 @@ import backtrader as bt
 from config.loader import ConfigLoader
 from engine.backtest import BacktestEngine
 from strategy.strategy import ModularScreenerStrategy
-from analysis.performance import PerformanceAnalyzer, report_from_returns, get_beta_alpha_summary
+from analysis.performance import (
+    PerformanceAnalyzer,
+    report_from_returns,
+    get_beta_alpha_summary,
+    compute_return_stats,
+    format_beta_alpha,
+)
 from analysis.visualizer import (
     plot_equity_curve,
     plot_drawdown,
@@ -13,8 +19,10 @@ from analysis.visualizer import (
     plot_beta_analysis,
     plot_trades_on_prices,
     load_benchmark_returns,
+    load_benchmark_close,
 )
 from data.providers import get_sp500_tickers, download_data, download_spy
+from data.manager import select_universe, universe_files, build_ohlcv_cache, SharedOHLCV
 
 UNIVERSE_NAME = 'SP500'
 DEFAULT_DATA_DIR = os.path.join('data', UNIVERSE_NAME)
@@ -22,8 +30,11 @@ DEFAULT_DATA_DIR = os.path.join('data', UNIVERSE_NAME)
 __all__ = [
     'os', 'bt', 'ConfigLoader', 'BacktestEngine', 'ModularScreenerStrategy',
     'PerformanceAnalyzer', 'report_from_returns', 'get_beta_alpha_summary',
+    'compute_return_stats', 'format_beta_alpha',
     'plot_equity_curve', 'plot_drawdown', 'plot_rolling_metrics', 'plot_monthly_heatmap',
     'plot_beta_analysis', 'plot_trades_on_prices', 'load_benchmark_returns',
-    'get_sp500_tickers', 'download_data', 'download_spy',
+    'load_benchmark_close',
+    'get_sp500_tickers', 'download_data', 'download_spy', 'select_universe',
+    'universe_files', 'build_ohlcv_cache', 'SharedOHLCV',
     'UNIVERSE_NAME', 'DEFAULT_DATA_DIR',
 ]
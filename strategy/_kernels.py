@@ -0,0 +1,366 @@
+"""
+选股数值内核。安装 numba 时走 njit 编译的循环，否则退化为等价的 Python/numpy 实现。
+- entry_masks：追涨 / 低吸两条筛选链共用的行情条件一次遍历算出两个布尔掩码，
+  与 StockScreener 的 filter_liquidity / filter_volume_vs_ma / filter_trend_alignment /
+  filter_gap_up / filter_rsi_setup / filter_dip_setup 逐项一致（NaN 比较为 False）；
+  标的数达到 PARALLEL_MIN_TICKERS 时改用 prange 多线程版本（各标的互不依赖，结果相同）
+- trend_template_mask：趋势模板五个条件融合为一次遍历（无 numba 时可选 numexpr 单遍求值）
+- composite_score：综合打分的 min-max 归一化与加权求和融合为一个内核，逐元素运算顺序同 numpy 版，结果逐位一致
+- rolling_mean / rolling_max / rolling_min / wilder_smooth：回测开始前整段预计算指标，
+  结果与 backtrader 的 SMA(math.fsum 窗口和) / Highest / Lowest / SMMA 逐位一致；
+  无 numba 时滑窗极值优先用 bottleneck 的 move_max / move_min（C 实现，O(N)），
+  滑窗均值不用 bottleneck.move_mean：其累加和与 fsum 口径有舍入差，会改变 MA 穿越判断
+"""
+import math
+
+import numpy as np
+
+from utils.jit import HAS_NUMBA, njit, prange, register_warmup
+
+try:
+    import bottleneck as bn
+    HAS_BOTTLENECK = True
+except ImportError:
+    bn = None
+    HAS_BOTTLENECK = False
+
+try:
+    import numexpr as ne
+    HAS_NUMEXPR = True
+except ImportError:
+    ne = None
+    HAS_NUMEXPR = False
+
+
+# 并行版本仅在大截面（如 Russell 3000）下启用：几百只标的时线程调度开销大于单线程遍历本身
+PARALLEL_MIN_TICKERS = 2000
+
+
+def _entry_masks_impl(valid, close, prev, vol, vol_ma, ma200, atr, rsi,
+                      min_price, use_dvol, min_dvol, use_avg_dvol, min_avg_dvol, use_vol_mult, vol_mult,
+                      gap_atr, max_rsi, dip_rsi, out_b, out_d):
+    for i in prange(close.shape[0]):
+        c = close[i]
+        ok = valid[i] and c >= min_price and vol[i] > 0 and c > ma200[i]
+        if ok and use_dvol:
+            ok = c * vol[i] >= min_dvol
+        if ok and use_avg_dvol:
+            ok = c * vol_ma[i] >= min_avg_dvol
+        if ok and use_vol_mult:
+            ok = vol[i] >= vol_ma[i] * vol_mult
+        r = rsi[i]
+        out_b[i] = ok and c - prev[i] > atr[i] * gap_atr and r >= 0 and r <= max_rsi
+        out_d[i] = ok and r < dip_rsi
+
+
+# 不开 fastmath：NaN 比较须为 False（未就绪指标即不通过），fastmath 假定无 NaN 会改变结果。
+# 并行版不落盘缓存：两个调度器共用同一 Python 函数，缓存索引会互相覆盖
+_entry_masks_nb = njit(_entry_masks_impl)
+_entry_masks_par = njit(parallel=True, cache=False)(_entry_masks_impl)
+
+
+def entry_masks(valid, cols, min_price=10.0, min_dollar_vol=None, min_avg_dollar_vol=None, vol_multiplier=None,
+                gap_atr=0.5, max_rsi=75, dip_rsi=35, parallel=None, out=None):
+    """
+    返回 (追涨掩码, 低吸掩码)：valid 为快照有效行，cols 为快照列（Close/PrevClose/Volume/Volume_MA20/MA200/ATR/RSI）。
+    参数为 None 的条件不生效；vol_multiplier<=0 同 None。
+    parallel=None 时按标的数自动选择（≥ PARALLEL_MIN_TICKERS 走多线程内核）。
+    out 为可选的预分配布尔缓冲对 (out_b, out_d)，给定时结果写入其中并原样返回。
+    """
+    close, prev, vol = cols['Close'], cols['PrevClose'], cols['Volume']
+    vol_ma, ma200, atr, rsi = cols['Volume_MA20'], cols['MA200'], cols['ATR'], cols['RSI']
+    use_vol_mult = vol_multiplier is not None and vol_multiplier > 0
+    if HAS_NUMBA:
+        if out is None:
+            out = np.empty(close.shape[0], dtype=np.bool_), np.empty(close.shape[0], dtype=np.bool_)
+        out_b, out_d = out
+        if parallel is None:
+            parallel = close.shape[0] >= PARALLEL_MIN_TICKERS
+        kernel = _entry_masks_par if parallel else _entry_masks_nb
+        kernel(valid, close, prev, vol, vol_ma, ma200, atr, rsi,
+               float(min_price), min_dollar_vol is not None, float(min_dollar_vol or 0.0),
+               min_avg_dollar_vol is not None, float(min_avg_dollar_vol or 0.0),
+               use_vol_mult, float(vol_multiplier or 0.0),
+               float(gap_atr), float(max_rsi), float(dip_rsi), out_b, out_d)
+        return out_b, out_d
+    ok = valid & (close >= min_price) & (vol > 0) & (close > ma200)
+    if min_dollar_vol is not None:
+        ok &= close * vol >= min_dollar_vol
+    if min_avg_dollar_vol is not None:
+        ok &= close * vol_ma >= min_avg_dollar_vol
+    if use_vol_mult:
+        ok &= vol >= vol_ma * vol_multiplier
+    mask_b = ok & (close - prev > atr * gap_atr) & (rsi >= 0) & (rsi <= max_rsi)
+    mask_d = ok & (rsi < dip_rsi)
+    if out is None:
+        return mask_b, mask_d
+    np.copyto(out[0], mask_b)
+    np.copyto(out[1], mask_d)
+    return out
+
+
+@njit
+def _trend_template_nb(close, ma50, ma150, ma200, high52, low52, mask):
+    for i in range(close.shape[0]):
+        if mask[i]:
+            c = close[i]
+            mask[i] = (c > ma50[i] and ma50[i] > ma150[i] and ma150[i] > ma200[i]
+                       and c >= low52[i] * 1.25 and c >= high52[i] * 0.75)
+
+
+def trend_template_mask(close, ma50, ma150, ma200, high52, low52, mask):
+    """
+    Minervini 趋势模板（Stage 2）五个条件一次遍历，结果原地 AND 进布尔数组 mask（不另分配中间数组）：
+    Close > MA50 > MA150 > MA200，Close ≥ 52 周低点 ×1.25，Close ≥ 52 周高点 ×0.75。
+    """
+    arrs = [np.asarray(a, dtype=np.float64) for a in (close, ma50, ma150, ma200, high52, low52)]
+    if HAS_NUMBA:
+        _trend_template_nb(*arrs, mask)
+        return mask
+    close, ma50, ma150, ma200, high52, low52 = arrs
+    if HAS_NUMEXPR:
+        # 无 numba 时用 numexpr 单遍求值整条表达式（NaN 比较同样为 False）
+        mask &= ne.evaluate('(close > ma50) & (ma50 > ma150) & (ma150 > ma200)'
+                            ' & (close >= low52 * 1.25) & (close >= high52 * 0.75)',
+                            local_dict=dict(close=close, ma50=ma50, ma150=ma150, ma200=ma200,
+                                            high52=high52, low52=low52))
+        return mask
+    mask &= ((close > ma50) & (ma50 > ma150) & (ma150 > ma200)
+             & (close >= low52 * 1.25) & (close >= high52 * 0.75))
+    return mask
+
+
+@njit
+def _composite_score_nb(mat, w, is_rsi, mask, out):
+    n = mat.shape[1]
+    for i in range(n):
+        out[i] = 0.0
+    for j in range(mat.shape[0]):
+        x = mat[j]
+        wj = w[j]
+        if is_rsi[j]:
+            for i in range(n):
+                v = x[i]
+                if v < 0.0:
+                    v = 0.0
+                elif v > 100.0:
+                    v = 100.0
+                out[i] = out[i] + wj * (v / 100.0)
+            continue
+        # 命中行内忽略 NaN 的 min / max
+        mn = np.inf
+        mx = -np.inf
+        for i in range(n):
+            v = x[i]
+            if mask[i] and v == v:
+                if v < mn:
+                    mn = v
+                if v > mx:
+                    mx = v
+        if mx > mn:
+            span = mx - mn
+            for i in range(n):
+                out[i] = out[i] + wj * ((x[i] - mn) / span)
+        else:
+            for i in range(n):
+                out[i] = out[i] + wj * 0.5
+    for i in range(n):
+        v = out[i] * 100.0
+        if v < 0.0:
+            v = 0.0
+        elif v > 100.0:
+            v = 100.0
+        out[i] = v
+
+
+def composite_score(columns, weights, is_rsi, mask):
+    """
+    综合打分 0-100：columns 为参与打分的各列数组，weights 为已归一化的权重，is_rsi 标记 RSI 列
+    （RSI 截断到 0-100 后 /100，其余列在 mask 命中行内 min-max 归一化，列全等或无有效值时取 0.5）。
+    """
+    n = len(mask)
+    if HAS_NUMBA:
+        mat = np.empty((len(columns), n))
+        for j, col in enumerate(columns):
+            mat[j] = col
+        out = np.empty(n)
+        _composite_score_nb(mat, np.asarray(weights, dtype=np.float64), np.asarray(is_rsi, dtype=np.bool_),
+                            np.asarray(mask, dtype=np.bool_), out)
+        return out
+    score = np.zeros(n)
+    for s, w, rsi in zip(columns, weights, is_rsi):
+        s = s.astype(np.float64, copy=False)
+        if rsi:
+            s_norm = np.clip(s, 0, 100) / 100.0
+        else:
+            # 命中行内 min-max 归一化到 0-1（忽略 NaN，同 pandas min/max）
+            sm = s[mask]
+            valid = sm[~np.isnan(sm)]
+            mn, mx = (valid.min(), valid.max()) if len(valid) else (np.nan, np.nan)
+            if mx > mn:
+                with np.errstate(invalid='ignore'):
+                    s_norm = (s - mn) / (mx - mn)
+            else:
+                s_norm = 0.5
+        score = score + w * s_norm
+    return np.clip(score * 100, 0, 100)
+
+
+_PARTIALS = 128  # 双精度下不重叠部分和最多约 40 个，留足余量
+
+
+@njit
+def _fsum_add(p, n, x):
+    # Shewchuk 部分和累加（同 CPython math.fsum 的内循环），返回新的部分和个数
+    i = 0
+    for j in range(n):
+        y = p[j]
+        if abs(x) < abs(y):
+            x, y = y, x
+        hi = x + y
+        lo = y - (hi - x)
+        if lo != 0.0:
+            p[i] = lo
+            i += 1
+        x = hi
+    if x != 0.0:
+        p[i] = x
+        i += 1
+    return i
+
+
+@njit
+def _fsum_value(p, n):
+    # 部分和 → 正确舍入的浮点和（同 CPython math.fsum 的收尾步骤）
+    hi = 0.0
+    if n > 0:
+        n -= 1
+        hi = p[n]
+        lo = 0.0
+        while n > 0:
+            x = hi
+            n -= 1
+            y = p[n]
+            hi = x + y
+            lo = y - (hi - x)
+            if lo != 0.0:
+                break
+        if n > 0 and ((lo < 0.0 and p[n - 1] < 0.0) or (lo > 0.0 and p[n - 1] > 0.0)):
+            y = lo * 2.0
+            x = hi + y
+            if y == x - hi:
+                hi = x
+    return hi
+
+
+@njit
+def _rolling_mean_nb(x, period, out):
+    # 滑窗精确和：新值加入、出窗值以相反数加入，部分和始终精确等于窗口和
+    p = np.empty(_PARTIALS)
+    n = 0
+    for i in range(x.shape[0]):
+        n = _fsum_add(p, n, x[i])
+        if i >= period:
+            n = _fsum_add(p, n, -x[i - period])
+        out[i] = _fsum_value(p, n) / period if i >= period - 1 else np.nan
+
+
+@njit
+def _rolling_extreme_nb(x, period, sign, out):
+    # 单调队列滑窗极值：sign=1 取最大，sign=-1 取最小
+    q = np.empty(x.shape[0], dtype=np.int64)
+    head = 0
+    tail = 0
+    for i in range(x.shape[0]):
+        v = x[i] * sign
+        while tail > head and x[q[tail - 1]] * sign <= v:
+            tail -= 1
+        q[tail] = i
+        tail += 1
+        if q[head] <= i - period:
+            head += 1
+        out[i] = x[q[head]] if i >= period - 1 else np.nan
+
+
+@njit
+def _wilder_nb(x, start, period, alpha, alpha1, out):
+    # SMMA：x 自 start 起有效；首值为前 period 个有效值的 fsum 均值，之后 prev*alpha1 + x*alpha
+    out[:] = np.nan
+    seed = start + period - 1
+    if seed >= x.shape[0]:
+        return
+    p = np.empty(_PARTIALS)
+    n = 0
+    for i in range(start, seed + 1):
+        n = _fsum_add(p, n, x[i])
+    prev = _fsum_value(p, n) / period
+    out[seed] = prev
+    for i in range(seed + 1, x.shape[0]):
+        prev = prev * alpha1 + x[i] * alpha
+        out[i] = prev
+
+
+def rolling_mean(x, period):
+    """简单移动平均，窗口和用 math.fsum 口径（同 backtrader SMA），前 period-1 个为 NaN。"""
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    out = np.empty(x.shape[0])
+    if HAS_NUMBA:
+        _rolling_mean_nb(x, int(period), out)
+        return out
+    out[:period - 1] = np.nan
+    for i in range(period - 1, x.shape[0]):
+        out[i] = math.fsum(x[i - period + 1:i + 1]) / period
+    return out
+
+
+def _rolling_extreme(x, period, sign):
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    out = np.full(x.shape[0], np.nan)
+    if HAS_NUMBA:
+        _rolling_extreme_nb(x, int(period), float(sign), out)
+    elif HAS_BOTTLENECK:
+        out = bn.move_max(x, period) if sign > 0 else bn.move_min(x, period)
+    elif x.shape[0] >= period:
+        view = np.lib.stride_tricks.sliding_window_view(x, period)
+        out[period - 1:] = view.max(axis=1) if sign > 0 else view.min(axis=1)
+    return out
+
+
+def rolling_max(x, period):
+    """滑窗最大值（同 backtrader Highest），前 period-1 个为 NaN。"""
+    return _rolling_extreme(x, period, 1)
+
+
+def rolling_min(x, period):
+    """滑窗最小值（同 backtrader Lowest），前 period-1 个为 NaN。"""
+    return _rolling_extreme(x, period, -1)
+
+
+def wilder_smooth(x, period, start=0):
+    """Wilder 平滑（同 backtrader SMMA，alpha=1/period）；x 自下标 start 起有效，首值在 start+period-1。"""
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    out = np.empty(x.shape[0])
+    alpha = 1.0 / period
+    alpha1 = 1.0 - alpha
+    if HAS_NUMBA:
+        _wilder_nb(x, int(start), int(period), alpha, alpha1, out)
+        return out
+    out[:] = np.nan
+    seed = start + period - 1
+    if seed < x.shape[0]:
+        prev = out[seed] = math.fsum(x[start:seed + 1]) / period
+        for i in range(seed + 1, x.shape[0]):
+            prev = out[i] = prev * alpha1 + x[i] * alpha
+    return out
+
+
+_SAMPLE = np.linspace(10.0, 20.0, 4)
+register_warmup(_entry_masks_nb, np.ones(4, dtype=np.bool_), _SAMPLE, _SAMPLE, _SAMPLE, _SAMPLE, _SAMPLE, _SAMPLE, _SAMPLE,
+                10.0, True, 1.0, True, 1.0, False, 0.0, 0.5, 75.0, 35.0,
+                np.empty(4, dtype=np.bool_), np.empty(4, dtype=np.bool_))
+register_warmup(_rolling_mean_nb, _SAMPLE, 2, np.empty(4))
+register_warmup(_rolling_extreme_nb, _SAMPLE, 2, 1.0, np.empty(4))
+register_warmup(_wilder_nb, _SAMPLE, 1, 2, 0.5, 0.5, np.empty(4))
+register_warmup(_trend_template_nb, _SAMPLE, _SAMPLE, _SAMPLE, _SAMPLE, _SAMPLE, _SAMPLE, np.ones(4, dtype=np.bool_))
+register_warmup(_composite_score_nb, np.vstack([_SAMPLE, _SAMPLE]), np.array([0.5, 0.5]), np.array([True, False]),
+                np.ones(4, dtype=np.bool_), np.empty(4))
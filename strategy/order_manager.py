@@ -2,23 +2,39 @@ import datetime
 import backtrader as bt
 from utils.logger import Logger
 
+_PENDING = (bt.Order.Submitted, bt.Order.Accepted)
+# 终态：收到后不再跟踪（过期单同样移除，避免长回测中逐日累积）
+_FINAL = (bt.Order.Completed, bt.Order.Canceled, bt.Order.Margin, bt.Order.Rejected, bt.Order.Expired)
+
 
 class OrderManager:
     def __init__(self, strategy, debug=True):
         self.strat = strategy
         self.debug = debug
         self.logger = Logger()
+        # 标的名 -> {'entries': {ref: order}, 'exits': {ref: order}}；bt.Order 定义了 __eq__ 而不可哈希，按 order.ref 建索引，
+        # 终态订单 O(1) 移除，字典里只留未了结的订单
         self.open_orders = {}
+        # 当前 bar 日期缓存：同一 bar 内（策略长度不变）多次下单/回报只做一次日期转换
+        self._bar_len = -1
+        self._bar_date = None
+
+    def _current_date(self):
+        n = len(self.strat)
+        if n != self._bar_len:
+            self._bar_len = n
+            self._bar_date = self.strat.data.datetime.date(0)
+        return self._bar_date
 
-    def _log(self, txt, dt=None):
+    def _log(self, fmt, *args):
+        """debug 关闭时直接返回：调用方传 % 格式串与参数，消息只在需要输出时才格式化。"""
         if self.debug:
-            dt = dt or self.strat.data.datetime.date(0)
-            self.logger.debug(f"{dt} [订单] {txt}")
+            self.logger.debug(f"{self._current_date()} [订单] {fmt % args if args else fmt}")
 
     def buy_market(self, data, size):
         if size == 0:
             return None
-        self._log(f"提交市价买单: {data._name} 数量:{size}")
+        self._log("提交市价买单: %s 数量:%s", data._name, size)
         order = self.strat.buy(data=data, size=size, exectype=bt.Order.Market)
         self._track_order(order, order_type='entries')
         return order
@@ -28,8 +44,8 @@ class OrderManager:
             return None
         valid = None
         if valid_days:
-            valid = self.strat.data.datetime.date(0) + datetime.timedelta(days=valid_days)
-        self._log(f"提交突破买单: {data._name} 触发价:{price:.2f}")
+            valid = self._current_date() + datetime.timedelta(days=valid_days)
+        self._log("提交突破买单: %s 触发价:%.2f", data._name, price)
         order = self.strat.buy(
             data=data, size=size,
             exectype=bt.Order.Stop,
@@ -43,12 +59,12 @@ class OrderManager:
         if size is None:
             pos_size = self.strat.getposition(data).size
             if pos_size > 0:
-                self._log(f"市价清仓: {data._name} 数量:{pos_size}")
+                self._log("市价清仓: %s 数量:%s", data._name, pos_size)
                 order = self.strat.close(data)
                 self._track_order(order, order_type='exits')
                 return order
         else:
-            self._log(f"市价卖出: {data._name} 数量:{size}")
+            self._log("市价卖出: %s 数量:%s", data._name, size)
             order = self.strat.sell(data=data, size=size, exectype=bt.Order.Market)
             self._track_order(order, order_type='exits')
             return order
@@ -66,35 +82,43 @@ class OrderManager:
             return order
         return None
 
+    def register_names(self, names):
+        """策略初始化时为已知标的预建跟踪表，之后 _track_order 只剩一次字典查找；未登记的标的仍按需创建。"""
+        for name in names:
+            self.open_orders.setdefault(name, {'entries': {}, 'exits': {}})
+
     def _track_order(self, order, order_type='entries'):
         name = order.data._name
-        if name not in self.open_orders:
-            self.open_orders[name] = {'entries': [], 'exits': []}
-        self.open_orders[name][order_type].append(order)
+        tracked = self.open_orders.get(name)
+        if tracked is None:
+            tracked = self.open_orders[name] = {'entries': {}, 'exits': {}}
+        tracked[order_type][order.ref] = order
 
     def has_pending_order(self, data):
-        name = data._name
-        if name in self.open_orders:
-            for o in self.open_orders[name]['entries']:
-                if o.status in [bt.Order.Submitted, bt.Order.Accepted]:
+        tracked = self.open_orders.get(data._name)
+        if tracked:
+            for o in tracked['entries'].values():
+                if o.status in _PENDING:
                     return True
         return False
 
     def cancel_all_orders(self, data, types=['entries', 'exits']):
         name = data._name
-        if name not in self.open_orders:
+        tracked = self.open_orders.get(name)
+        if tracked is None:
             return
         for t in types:
-            for o in self.open_orders[name][t][:]:
-                if o.status in [bt.Order.Submitted, bt.Order.Accepted]:
+            orders = tracked[t]
+            for o in list(orders.values()):
+                if o.status in _PENDING:
                     self.strat.cancel(o)
-                    self._log(f"撤单: {name} (类型:{t})")
-            self.open_orders[name][t] = []
+                    self._log("撤单: %s (类型:%s)", name, t)
+            orders.clear()
 
     def process_status(self, order):
-        dt = self.strat.data.datetime.date(0)
         name = order.data._name
         if order.status == bt.Order.Completed:
+            dt = self._current_date()
             if order.isbuy():
                 self.logger.log_trade(dt, "BUY", name, order.executed.price, order.executed.size, comm=order.executed.comm)
             else:
@@ -105,12 +129,11 @@ class OrderManager:
             self.logger.warning(f"订单被拒绝: {name}")
         elif order.status == bt.Order.Margin:
             self.logger.error(f"保证金不足，无法交易: {name}", exc_info=False)
-        if order.status in [bt.Order.Completed, bt.Order.Canceled, bt.Order.Margin, bt.Order.Rejected]:
+        if order.status in _FINAL:
             self._cleanup_tracking(order)
 
     def _cleanup_tracking(self, order):
-        name = order.data._name
-        if name in self.open_orders:
-            for t in ['entries', 'exits']:
-                if order in self.open_orders[name][t]:
-                    self.open_orders[name][t].remove(order)
+        tracked = self.open_orders.get(order.data._name)
+        if tracked is not None:
+            tracked['entries'].pop(order.ref, None)
+            tracked['exits'].pop(order.ref, None)
@@ -1,59 +1,216 @@
 import pandas as pd
 import numpy as np
 
+from strategy._kernels import composite_score, trend_template_mask
+
+__all__ = ['StockScreener', 'DEFAULT_SCORE_WEIGHTS', 'Signal_Breakout', 'Signal_Dip', 'sort_indexer', 'top_indexer']
+
 # 综合打分权重：长期趋势(ROC_126) 40% + 相对强弱(RSI) 30% + 短期爆发(ATR涨幅) 30%
 DEFAULT_SCORE_WEIGHTS = {'roc126': 0.40, 'rsi': 0.30, 'atr_pct': 0.30}
 
+# apply_pipeline 中命中行占比降到 1/_COMPACT_RATIO 以下时提前取出命中行
+_COMPACT_RATIO = 8
+
 # 双模信号类型
 Signal_Breakout = 'Breakout'
 Signal_Dip = 'Dip'
 
 
+def _isna(values):
+    """浮点列直接 np.isnan；object 列（如 Sector）才走 pd.isna。"""
+    if values.dtype.kind == 'f':
+        return np.isnan(values)
+    return np.asarray(pd.isna(values))
+
+
+def sort_indexer(values, ascending=True):
+    """与 pandas sort_values（nargsort, quicksort）相同的排序下标：NaN 置后，并列项顺序与 pandas 一致。"""
+    values = np.asarray(values)
+    mask = _isna(values)
+    idx = np.arange(len(values))
+    non_nans, non_nan_idx = values[~mask], idx[~mask]
+    if not ascending:
+        non_nans, non_nan_idx = non_nans[::-1], non_nan_idx[::-1]
+    indexer = non_nan_idx[non_nans.argsort(kind='quicksort')]
+    if not ascending:
+        indexer = indexer[::-1]
+    return np.concatenate([indexer, np.nonzero(mask)[0]])
+
+
+def top_indexer(values, k, ascending=True):
+    """
+    sort_indexer(values, ascending)[:k] 的部分排序版：argpartition 选出前 k 个后只排这 k 个，O(N + k log k)。
+    前 k 个内部或与第 k+1 个有并列（含 NaN）时退回完整排序，保证并列顺序仍与 pandas 一致。
+    """
+    values = np.asarray(values)
+    n = len(values)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k >= n or values.dtype.kind != 'f':
+        return sort_indexer(values, ascending)[:k]
+    key = values if ascending else -values
+    key = np.where(np.isnan(key), np.inf, key)
+    part = np.argpartition(key, k)
+    top = part[:k]
+    top_key = np.sort(key[top])
+    if top_key[-1] == key[part[k]] or (top_key[1:] == top_key[:-1]).any():
+        return sort_indexer(values, ascending)[:k]
+    return top[np.argsort(key[top])]
+
+
 class StockScreener:
-    def __init__(self, df_snapshot):
-        self.df = df_snapshot.copy()
-        self.initial_count = len(self.df)
-        self.logs = []
+    """
+    截面筛选器：列以 NumPy 数组保存（SoA）。各 filter_* 只把条件 AND 进布尔掩码 _mask，不复制数据；
+    排序/取结果前由 _materialize 按掩码一次性取出命中行。
+    可由快照 DataFrame 构造，或由策略预分配的列缓冲经 from_arrays 构造；df 属性按需还原为 DataFrame。
+    """
+
+    # 为 False 时各过滤步骤不写 logs（策略按 params.debug 设置，回测/优化时关闭）
+    debug = True
+
+    def __init__(self, df_snapshot, debug=True):
+        self.debug = debug
+        # 数值列构造时统一为 float64 数组（float64 列零拷贝），之后各过滤都走浮点快路径；文本列保持 object
+        cols = {}
+        for c in df_snapshot.columns:
+            s = df_snapshot[c]
+            cols[c] = s.to_numpy(dtype=np.float64, na_value=np.nan) if s.dtype.kind in 'iuf' else s.to_numpy()
+        self.reset(df_snapshot.index.to_numpy(dtype=object), cols)
+
+    @classmethod
+    def from_arrays(cls, tickers, columns, mask=None, debug=True):
+        """
+        由标的代码数组与 {列名: ndarray} 构造（数组等长，按行对齐）；输入数组不会被修改。
+        mask 为初始掩码（如快照有效行或内核算好的入场条件），之后的过滤在其上继续累积。
+        """
+        self = cls.__new__(cls)
+        self.debug = debug
+        return self.reset(tickers, columns, mask=mask)
+
+    def reset(self, tickers, columns, mask=None):
+        """
+        让实例重新指向新的标的 / 列数组（不复制），掩码置为 mask（缺省全 True），日志清空。
+        策略可每日复用同一实例，掩码缓冲在标的数不变时原地覆写。
+        """
+        self.tickers = np.asarray(tickers, dtype=object)
+        self.cols = dict(columns)
+        self._lower_cols = None
+        n = len(self.tickers)
+        buf = getattr(self, '_mask_buf', None)
+        if buf is None or len(buf) != n:
+            buf = self._mask_buf = np.empty(n, dtype=bool)
+        if mask is None:
+            buf.fill(True)
+        else:
+            np.copyto(buf, mask)
+        self._mask = buf
+        self.initial_count = n
+        if getattr(self, 'logs', None) is None:
+            self.logs = []
+        else:
+            self.logs.clear()
+        return self
+
+    def __len__(self):
+        return int(np.count_nonzero(self._mask))
+
+    @property
+    def columns(self):
+        return self.cols.keys()
+
+    @property
+    def df(self):
+        self._materialize()
+        return pd.DataFrame(self.cols, index=pd.Index(self.tickers, name='Ticker'))
+
+    def _keep(self, mask):
+        """把条件并入掩码（只保留 mask 为 True 的行）；不复制列数据。"""
+        self._mask &= np.asarray(mask, dtype=bool)
+
+    def _materialize(self):
+        """按掩码一次性取出命中行（所有列同步），之后掩码重置为全 True。"""
+        if self._mask.all():
+            return
+        idx = np.flatnonzero(self._mask)
+        self._take(idx)
+
+    def _take(self, order):
+        self.tickers = self.tickers.take(order)
+        self.cols = {k: v.take(order) for k, v in self.cols.items()}
+        self._mask = np.ones(len(self.tickers), dtype=bool)
+
+    def apply_pipeline(self, steps):
+        """
+        依次执行 steps 中的过滤步骤 [(方法名, kwargs), ...]（如 ('filter_rsi_setup', {'max_rsi': 75})），
+        各步只累积掩码，全部结束后一次性取出命中行；命中行不足总数 1/_COMPACT_RATIO 时提前取出，
+        让后面的过滤只处理剩余行（追涨/低吸链的入场掩码通常只剩个位数标的）。
+        """
+        for name, kwargs in steps:
+            if len(self) * _COMPACT_RATIO <= len(self.tickers):
+                # 命中行已很少：先取出命中行，后续过滤只在小数组上算（结果与日志不变）
+                self._materialize()
+            getattr(self, name)(**kwargs)
+        self._materialize()
+        return self
 
-    def _log(self, step_name):
-        remaining = len(self.df)
-        self.logs.append(f"{step_name}: 剩余 {remaining}")
+    def pipeline_mask(self, steps):
+        """
+        依次执行 steps 中的过滤步骤（格式同 apply_pipeline），只累积掩码、不取出命中行，返回按输入行对齐的掩码副本。
+        用于静态条件（如基本面）：初始化时算一次，之后逐日与行情掩码相与。
+        """
+        for name, kwargs in steps:
+            getattr(self, name)(**kwargs)
+        return self._mask.copy()
+
+    def _log(self, step_name, *args):
+        """debug 关闭时直接返回：步骤名按 args 延迟格式化，不计数也不拼字符串。"""
+        if not self.debug:
+            return
+        if args:
+            step_name = step_name.format(*args)
+        self.logs.append(f"{step_name}: 剩余 {len(self)}")
 
     def filter_liquidity(self, min_price=10.0, min_volume=0, min_dollar_vol=None, min_avg_dollar_vol=None):
         """流动性：价格 + 当日量；可选 min_avg_dollar_vol 用 20 日均额（需 Volume_MA20）保证持续成交能力。"""
-        self.df = self.df[
-            (self.df['Close'] >= min_price) &
-            (self.df['Volume'] > min_volume)
-        ]
+        # 各条件原地并入同一个局部掩码，最后一次并入 _mask
+        close, vol = self.cols['Close'], self.cols['Volume']
+        ok = close >= min_price
+        ok &= vol > min_volume
         if min_dollar_vol is not None:
-            self.df = self.df[self.df['Close'] * self.df['Volume'] >= min_dollar_vol]
-        if min_avg_dollar_vol is not None and 'Volume_MA20' in self.df.columns:
-            avg_dollar = self.df['Close'] * self.df['Volume_MA20']
-            self.df = self.df[avg_dollar >= min_avg_dollar_vol]
-            self._log(f"持续流动性(20日均额≥{min_avg_dollar_vol/1e6:.0f}M)")
+            ok &= close * vol >= min_dollar_vol
+        sustained = min_avg_dollar_vol is not None and 'Volume_MA20' in self.cols
+        if sustained:
+            ok &= close * self.cols['Volume_MA20'] >= min_avg_dollar_vol
+        self._keep(ok)
+        if sustained:
+            self._log("持续流动性(20日均额≥{:.0f}M)", min_avg_dollar_vol / 1e6)
         self._log("流动性过滤")
         return self
 
     def filter_volume_vs_ma(self, vol_multiplier=None):
         """量比过滤：当日量 >= Volume_MA20 * vol_multiplier 才保留；vol_multiplier 为 None 时不筛。"""
-        if vol_multiplier is None or vol_multiplier <= 0 or 'Volume_MA20' not in self.df.columns:
+        if vol_multiplier is None or vol_multiplier <= 0 or 'Volume_MA20' not in self.cols:
             return self
-        self.df = self.df[self.df['Volume'] >= self.df['Volume_MA20'] * vol_multiplier]
-        self._log(f"量比过滤(Volume≥MA20×{vol_multiplier})")
+        self._keep(self.cols['Volume'] >= self.cols['Volume_MA20'] * vol_multiplier)
+        self._log("量比过滤(Volume≥MA20×{})", vol_multiplier)
         return self
 
     def filter_trend_alignment(self):
-        self.df = self.df.dropna(subset=['MA200'])
-        self.df = self.df[self.df['Close'] > self.df['MA200']]
+        ma200 = self.cols['MA200']
+        if ma200.dtype.kind == 'f':
+            # 浮点列与 NaN 的比较恒为 False，一次比较即同时剔除 MA200 缺失行
+            self._keep(self.cols['Close'] > ma200)
+        else:
+            self._keep(~_isna(ma200) & (self.cols['Close'] > ma200))
         self._log("趋势过滤(>MA200)")
         return self
 
     def filter_rsi_setup(self, min_rsi=0, max_rsi=100):
-        self.df = self.df[
-            (self.df['RSI'] >= min_rsi) &
-            (self.df['RSI'] <= max_rsi)
-        ]
-        self._log(f"RSI过滤({min_rsi}-{max_rsi})")
+        rsi = self.cols['RSI']
+        ok = rsi >= min_rsi
+        ok &= rsi <= max_rsi
+        self._keep(ok)
+        self._log("RSI过滤({}-{})", min_rsi, max_rsi)
         return self
 
     def calculate_composite_score(self, weights=None):
@@ -63,144 +220,197 @@ class StockScreener:
         """
         weights = weights or DEFAULT_SCORE_WEIGHTS
         req = {'ROC_126': 'roc126', 'RSI': 'rsi', 'ATR_pct': 'atr_pct'}
-        available = {k: v for k, v in req.items() if k in self.df.columns}
+        available = {k: v for k, v in req.items() if k in self.cols}
         if not available:
             return self
         w_sum = sum(weights.get(v, 0) for v in available.values())
         if w_sum <= 0:
             return self
-        score = pd.Series(0.0, index=self.df.index)
-        for col, key in available.items():
-            w = weights.get(key, 0) / w_sum
-            s = self.df[col]
-            if col == 'RSI':
-                # RSI 已是 0-100
-                s_norm = s.clip(0, 100) / 100.0
-            else:
-                # ROC_126 / ATR_pct：min-max 归一化到 0-1
-                mn, mx = s.min(), s.max()
-                if mx > mn:
-                    s_norm = (s - mn) / (mx - mn)
-                else:
-                    s_norm = 0.5
-            score = score + w * s_norm
-        self.df['Score'] = (score * 100).clip(0, 100)
+        # RSI 已是 0-100；ROC_126 / ATR_pct 在命中行内 min-max 归一化到 0-1
+        self.cols['Score'] = composite_score([self.cols[c] for c in available],
+                                             [weights.get(k, 0) / w_sum for k in available.values()],
+                                             [c == 'RSI' for c in available], self._mask)
         self._log("综合打分")
         return self
 
     def filter_dip_setup(self):
         """低吸模式：价格 > 年线(MA200) 且 RSI < 35（牛回头）。"""
-        if 'MA200' not in self.df.columns or 'RSI' not in self.df.columns:
+        if 'MA200' not in self.cols or 'RSI' not in self.cols:
             return self
-        self.df = self.df[(self.df['Close'] > self.df['MA200']) & (self.df['RSI'] < 35)]
+        ok = self.cols['Close'] > self.cols['MA200']
+        ok &= self.cols['RSI'] < 35
+        self._keep(ok)
         self._log("低吸过滤(>MA200且RSI<35)")
         return self
 
     def filter_gap_up(self, threshold_atr=0.5):
-        if 'PrevClose' not in self.df.columns:
+        if 'PrevClose' not in self.cols:
             return self
-        change = self.df['Close'] - self.df['PrevClose']
-        min_change = self.df['ATR'] * threshold_atr
-        self.df = self.df[change > min_change]
+        c = self.cols
+        self._keep(c['Close'] - c['PrevClose'] > c['ATR'] * threshold_atr)
         self._log("动量启动过滤")
         return self
 
     def filter_volatility_control(self, max_atr_percent=0.05):
-        volatility = self.df['ATR'] / self.df['Close']
-        self.df = self.df[volatility <= max_atr_percent]
+        # ATR / Close <= max 改写为乘法比较（Close > 0），不做逐行除法
+        c = self.cols
+        ok = c['Close'] > 0
+        ok &= c['ATR'] <= c['Close'] * max_atr_percent
+        self._keep(ok)
         self._log("波动率风控")
         return self
 
     def rank_and_cut(self, sort_by='Score', ascending=False, top_n=5):
-        """sort_by: 'Score' 用综合打分，'RelativeStrength' 用 ATR 相对强度；无 Score 时 RelativeStrength 回退。"""
-        if sort_by == 'RelativeStrength' and 'Score' not in self.df.columns:
-            self.df['Score'] = (self.df['Close'] - self.df['PrevClose']) / self.df['ATR'].replace(0, np.nan)
-            sort_col = 'Score'
-        elif sort_by == 'Score' and 'Score' in self.df.columns:
+        """
+        sort_by: 'Score' 用综合打分，'RelativeStrength' 用 ATR 相对强度；
+        尚无 Score 列时两者都回退为相对强度 (Close - PrevClose) / ATR。
+        """
+        if sort_by in ('Score', 'RelativeStrength'):
+            if 'Score' not in self.cols and all(c in self.cols for c in ('Close', 'PrevClose', 'ATR')):
+                atr = self.cols['ATR'].astype(np.float64)
+                atr[atr == 0] = np.nan
+                with np.errstate(invalid='ignore'):
+                    self.cols['Score'] = (self.cols['Close'] - self.cols['PrevClose']) / atr
             sort_col = 'Score'
         else:
-            sort_col = sort_by if sort_by in self.df.columns else 'Score'
-        if sort_col in self.df.columns:
-            self.df = self.df.sort_values(by=sort_col, ascending=ascending)
-            self.df = self.df.head(top_n)
-            self._log(f"排序截断(Top {top_n}, by={sort_col})")
+            sort_col = sort_by if sort_by in self.cols else 'Score'
+        if sort_col in self.cols:
+            # 只在命中行上做部分排序，选中行一次取出（不先整表取命中行再取前 top_n）
+            values = self.cols[sort_col]
+            if self._mask.all():
+                self._take(top_indexer(values, top_n, ascending=ascending))
+            else:
+                idx = np.flatnonzero(self._mask)
+                self._take(idx[top_indexer(values[idx], top_n, ascending=ascending)])
+            self._log("排序截断(Top {}, by={})", top_n, sort_col)
         return self
 
     def get_result(self):
-        return self.df.index.tolist()
+        self._materialize()
+        return self.tickers.tolist()
 
     def get_scores(self):
         """返回 ticker -> score 的 Series，供末位淘汰等使用；无 Score 列时返回空 Series。"""
-        if 'Score' not in self.df.columns:
+        if 'Score' not in self.cols:
             return pd.Series(dtype=float)
-        return self.df['Score'].copy()
+        self._materialize()
+        return pd.Series(self.cols['Score'], index=self.tickers.copy())
+
+    def iter_scores(self):
+        """(ticker, score) 迭代器（不构造 Series）；无 Score 列时为空。"""
+        if 'Score' not in self.cols:
+            return iter(())
+        self._materialize()
+        return zip(self.tickers, self.cols['Score'])
 
     def filter_trend_template(self):
         required_cols = ['MA50', 'MA150', 'MA200', '52W_High', '52W_Low']
-        if not all(col in self.df.columns for col in required_cols):
+        if not all(col in self.cols for col in required_cols):
             return self
-        self.df = self.df[
-            (self.df['Close'] > self.df['MA50']) &
-            (self.df['MA50'] > self.df['MA150']) &
-            (self.df['MA150'] > self.df['MA200']) &
-            (self.df['Close'] >= self.df['52W_Low'] * 1.25) &
-            (self.df['Close'] >= self.df['52W_High'] * 0.75)
-        ]
+        c = self.cols
+        trend_template_mask(c['Close'], c['MA50'], c['MA150'], c['MA200'], c['52W_High'], c['52W_Low'], self._mask)
         self._log("超级趋势模板(Stage 2)")
         return self
 
     def filter_consolidation(self, max_bandwidth=0.10):
-        if 'BB_Upper' not in self.df.columns:
+        if 'BB_Upper' not in self.cols:
             return self
-        bandwidth = (self.df['BB_Upper'] - self.df['BB_Lower']) / self.df['MA20']
-        self.df = self.df[bandwidth <= max_bandwidth]
-        self._log(f"波动收缩(带宽<{max_bandwidth:.1%})")
+        c = self.cols
+        with np.errstate(invalid='ignore', divide='ignore'):
+            bandwidth = (c['BB_Upper'] - c['BB_Lower']) / c['MA20']
+        self._keep(bandwidth <= max_bandwidth)
+        self._log("波动收缩(带宽<{:.1%})", max_bandwidth)
         return self
 
     def filter_narrow_range(self, days=7):
-        if 'Range' in self.df.columns and f'MinRange{days}' in self.df.columns:
-            self.df = self.df[self.df['Range'] <= self.df[f'MinRange{days}']]
-            self._log(f"NR{days}收缩形态")
+        return self.filter_narrow_range_multi((days,))
+
+    def filter_narrow_range_multi(self, days_list=(4, 7)):
+        """多个 NRn 条件（Range ≤ MinRange{n}）并成一个掩码一次并入；缺少对应 MinRange 列的 n 跳过。"""
+        if 'Range' not in self.cols:
+            return self
+        rng = self.cols['Range']
+        ok, used = None, []
+        for days in days_list:
+            min_range = self.cols.get(f'MinRange{days}')
+            if min_range is None:
+                continue
+            if ok is None:
+                ok = rng <= min_range
+            else:
+                ok &= rng <= min_range
+            used.append(str(days))
+        if ok is not None:
+            self._keep(ok)
+            self._log("NR{}收缩形态", '/'.join(used))
         return self
 
     def filter_relative_strength(self, benchmark_pct_change):
-        if 'PrevClose' not in self.df.columns:
+        if 'PrevClose' not in self.cols:
             return self
-        stock_pct_change = (self.df['Close'] - self.df['PrevClose']) / self.df['PrevClose']
-        self.df = self.df[stock_pct_change > benchmark_pct_change]
+        # (Close - PrevClose) / PrevClose > 基准涨幅 改写为乘法比较（PrevClose > 0），不做逐行除法
+        c = self.cols
+        prev = c['PrevClose']
+        self._keep((prev > 0) & (c['Close'] - prev > prev * benchmark_pct_change))
         self._log("相对强弱(跑赢大盘)")
         return self
 
     def filter_inside_bar(self):
         cols = ['High', 'Low', 'PrevHigh', 'PrevLow']
-        if not all(c in self.df.columns for c in cols):
+        if not all(c in self.cols for c in cols):
             return self
-        self.df = self.df[
-            (self.df['High'] < self.df['PrevHigh']) &
-            (self.df['Low'] > self.df['PrevLow'])
-        ]
+        c = self.cols
+        self._keep((c['High'] < c['PrevHigh']) & (c['Low'] > c['PrevLow']))
         self._log("Inside Bar形态")
         return self
 
     def _col(self, *names):
-        """返回第一个存在的列名，用于兼容 PE/pe 等。"""
+        """返回第一个存在的列名（先精确、再不区分大小写），用于兼容 PE/pe/Pe 等。"""
         for n in names:
-            if n in self.df.columns:
+            if n in self.cols:
                 return n
+        lower = self._lower_cols
+        if lower is None:
+            # 小写列名映射在首次查找时建一次，同一实例的后续过滤直接查字典
+            lower = self._lower_cols = {c.lower(): c for c in self.cols if isinstance(c, str)}
+        for n in names:
+            c = lower.get(n.lower())
+            if c is not None:
+                return c
         return None
 
+    def _normalized(self, col):
+        """
+        文本列去空白、转小写后的 object 数组。按列数组对象缓存：策略每日复用同一基本面列，
+        逐元素的字符串处理只在列首次出现时做一次，之后板块过滤只剩一次向量比较。
+        """
+        values = self.cols[col]
+        cache = getattr(self, '_norm_cache', None)
+        if cache is None:
+            cache = self._norm_cache = {}
+        hit = cache.get(col)
+        if hit is None or hit[0] is not values:
+            hit = cache[col] = (values, np.array([str(x).strip().lower() for x in values], dtype=object))
+        return hit[1]
+
+    def _keep_na_or(self, col, ok):
+        """无数据（NaN）的行保留，其余行需满足 ok(values)。"""
+        values = self.cols[col]
+        with np.errstate(invalid='ignore'):
+            keep = _isna(values)
+            keep |= np.asarray(ok(values), dtype=bool)  # 原地 OR，不再为合并结果另分配数组
+        self._mask &= keep
+
     def filter_pe(self, max_pe=30, allow_negative=False):
         """市盈率过滤：有 PE 时需在 (0, max_pe]；无 PE 数据则保留。"""
         col = self._col('PE', 'pe')
         if col is None:
             return self
-        mask_na = self.df[col].isna()
         if allow_negative:
-            mask_ok = (self.df[col] <= max_pe) | (self.df[col] < 0)
+            self._keep_na_or(col, lambda v: (v <= max_pe) | (v < 0))
         else:
-            mask_ok = (self.df[col] > 0) & (self.df[col] <= max_pe)
-        self.df = self.df[mask_na | mask_ok]
-        self._log(f"PE过滤(≤{max_pe})")
+            self._keep_na_or(col, lambda v: (v > 0) & (v <= max_pe))
+        self._log("PE过滤(≤{})", max_pe)
         return self
 
     def filter_pb(self, max_pb=5, min_pb=0):
@@ -208,10 +418,8 @@ class StockScreener:
         col = self._col('PB', 'pb')
         if col is None:
             return self
-        mask_na = self.df[col].isna()
-        mask_ok = (self.df[col] >= min_pb) & (self.df[col] <= max_pb)
-        self.df = self.df[mask_na | mask_ok]
-        self._log(f"PB过滤({min_pb}~{max_pb})")
+        self._keep_na_or(col, lambda v: (v >= min_pb) & (v <= max_pb))
+        self._log("PB过滤({}~{})", min_pb, max_pb)
         return self
 
     def filter_roe(self, min_roe=0.10):
@@ -219,10 +427,8 @@ class StockScreener:
         col = self._col('ROE', 'roe')
         if col is None:
             return self
-        mask_na = self.df[col].isna()
-        mask_ok = self.df[col] >= min_roe
-        self.df = self.df[mask_na | mask_ok]
-        self._log(f"ROE过滤(≥{min_roe:.0%})")
+        self._keep_na_or(col, lambda v: v >= min_roe)
+        self._log("ROE过滤(≥{:.0%})", min_roe)
         return self
 
     def filter_revenue_growth(self, min_growth=0.05):
@@ -230,10 +436,8 @@ class StockScreener:
         col = self._col('RevenueGrowth', 'revenue_growth', 'revenuegrowth')
         if col is None:
             return self
-        mask_na = self.df[col].isna()
-        mask_ok = self.df[col] >= min_growth
-        self.df = self.df[mask_na | mask_ok]
-        self._log(f"营收增长过滤(≥{min_growth:.0%})")
+        self._keep_na_or(col, lambda v: v >= min_growth)
+        self._log("营收增长过滤(≥{:.0%})", min_growth)
         return self
 
     def filter_debt_to_equity(self, max_dte=2.0):
@@ -241,10 +445,8 @@ class StockScreener:
         col = self._col('DebtToEquity', 'debt_to_equity', 'debttoequity')
         if col is None:
             return self
-        mask_na = self.df[col].isna()
-        mask_ok = self.df[col] <= max_dte
-        self.df = self.df[mask_na | mask_ok]
-        self._log(f"负债权益比(≤{max_dte})")
+        self._keep_na_or(col, lambda v: v <= max_dte)
+        self._log("负债权益比(≤{})", max_dte)
         return self
 
     def filter_valuation(self, max_pe=50.0):
@@ -252,10 +454,8 @@ class StockScreener:
         col = self._col('PE', 'pe')
         if col is None:
             return self
-        mask_na = self.df[col].isna()
-        mask_ok = (self.df[col] > 0) & (self.df[col] <= max_pe)
-        self.df = self.df[mask_na | mask_ok]
-        self._log(f"估值过滤(0<PE≤{max_pe})")
+        self._keep_na_or(col, lambda v: (v > 0) & (v <= max_pe))
+        self._log("估值过滤(0<PE≤{})", max_pe)
         return self
 
     def filter_growth(self, min_eps_growth=None):
@@ -265,19 +465,16 @@ class StockScreener:
         col = self._col('EPS_Growth', 'eps_growth', 'epsgrowth')
         if col is None:
             return self
-        mask_na = self.df[col].isna()
-        mask_ok = self.df[col] >= min_eps_growth
-        self.df = self.df[mask_na | mask_ok]
-        self._log(f"成长过滤(EPS增长≥{min_eps_growth:.0%})")
+        self._keep_na_or(col, lambda v: v >= min_eps_growth)
+        self._log("成长过滤(EPS增长≥{:.0%})", min_eps_growth)
         return self
 
     def filter_sustained_liquidity(self, min_avg_dollar_vol=None):
         """持续流动性：20 日均成交额 ≥ min_avg_dollar_vol（需 Volume_MA20）。"""
-        if min_avg_dollar_vol is None or 'Volume_MA20' not in self.df.columns:
+        if min_avg_dollar_vol is None or 'Volume_MA20' not in self.cols:
             return self
-        avg_dollar = self.df['Close'] * self.df['Volume_MA20']
-        self.df = self.df[avg_dollar >= min_avg_dollar_vol]
-        self._log(f"持续流动性(20日均额≥{min_avg_dollar_vol/1e6:.0f}M)")
+        self._keep(self.cols['Close'] * self.cols['Volume_MA20'] >= min_avg_dollar_vol)
+        self._log("持续流动性(20日均额≥{:.0f}M)", min_avg_dollar_vol / 1e6)
         return self
 
     def filter_sector(self, sector_name=None):
@@ -287,18 +484,25 @@ class StockScreener:
         col = self._col('Sector', 'sector')
         if col is None:
             return self
-        self.df = self.df[self.df[col].astype(str).str.strip().str.lower() == str(sector_name).strip().lower()]
-        self._log(f"板块过滤({sector_name})")
+        target = str(sector_name).strip().lower()
+        self._keep(self._normalized(col) == target)
+        self._log("板块过滤({})", sector_name)
         return self
 
     def calculate_weights(self, method='equal'):
-        count = len(self.df)
+        self._materialize()
+        count = len(self.tickers)
         if count == 0:
             return self
         if method == 'equal':
-            self.df['Weight'] = 1.0 / count
+            self.cols['Weight'] = np.full(count, 1.0 / count)
         elif method == 'risk_parity':
-            inv_vol = 1.0 / self.df['ATR']
-            total_inv_vol = inv_vol.sum()
-            self.df['Weight'] = inv_vol / total_inv_vol
+            # 调用方已备好 InvATR（ATR 倒数）列时直接复用，否则算一次倒数；
+            # 之后原地乘以总和的倒数：只分配一次，整列除法改为一次标量除法
+            if 'InvATR' in self.cols:
+                inv_vol = np.array(self.cols['InvATR'], dtype=np.float64)
+            else:
+                inv_vol = np.divide(1.0, self.cols['ATR'], dtype=np.float64)
+            inv_vol *= 1.0 / np.nansum(inv_vol)
+            self.cols['Weight'] = inv_vol
         return self
@@ -1,47 +1,225 @@
 """信号与快照构建：供 strategy 调用"""
-import math
+import numpy as np
 import pandas as pd
 
+from strategy.screener import top_indexer
+from strategy._kernels import rolling_max, rolling_mean, rolling_min, wilder_smooth
 
-def build_snapshot(datas, spy, inds):
+# 当日截面快照的列（与 StockScreener 使用的列名一致）
+SNAPSHOT_COLUMNS = ('Close', 'PrevClose', 'Volume', 'Volume_MA20', 'MA20', 'MA50', 'MA150', 'MA200',
+                    'RSI', 'ATR', '52W_High', '52W_Low', 'ROC_126', 'ATR_pct')
+
+# 个股指标的最长预热期（52 周高低点）；策略在所有个股达到该 bar 数前不进入 next，同 backtrader 指标 minperiod
+INDICATOR_WARMUP = 252
+
+
+def precompute_indicators(close, high, low, volume, atr_period=14, rsi_period=14):
     """
-    从 Backtrader datas 构建当日全市场快照 DataFrame。
-    :param datas: self.datas
-    :param spy: self.spy (跳过)
-    :param inds: self.inds[d] 指标字典
-    :return: DataFrame, index=Ticker, columns=Close, PrevClose, Volume, Volume_MA20, MA50, MA150, MA200, RSI, ATR, 52W_High, 52W_Low
+    整段行情数组 → {指标名: ndarray}（键同策略 inds），回测开始前对每只标的算一次。
+    各值与 backtrader 的 SMA / ATR / RSI / Highest / Lowest / ROC 逐位一致，未就绪处为 NaN。
     """
-    snapshot_data = []
-    for d in datas:
-        if d is spy:
-            continue
-        if d not in inds:
+    close = np.asarray(close, dtype=np.float64)
+    prev = np.empty_like(close)
+    prev[:1] = np.nan
+    prev[1:] = close[:-1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tr = np.maximum(high, prev) - np.minimum(low, prev)
+        up = np.maximum(close - prev, 0.0)
+        down = np.maximum(prev - close, 0.0)
+        rs = wilder_smooth(up, rsi_period, start=1) / wilder_smooth(down, rsi_period, start=1)
+        roc = np.full_like(close, np.nan)
+        roc[126:] = (close[126:] - close[:-126]) / close[:-126]
+        return {
+            'ma20': rolling_mean(close, 20),
+            'ma50': rolling_mean(close, 50),
+            'ma150': rolling_mean(close, 150),
+            'ma200': rolling_mean(close, 200),
+            'atr': wilder_smooth(tr, atr_period, start=1),
+            'rsi': 100.0 - 100.0 / (1.0 + rs),
+            'vol_ma': rolling_mean(volume, 20),
+            'high52': rolling_max(high, 252),
+            'low52': rolling_min(low, 252),
+            'roc126': roc,  # 长期趋势，综合打分用
+        }
+
+
+# 堆叠矩阵的指标键 → 快照列（PrevClose 由 close 前一位取得）
+_STACK_COLUMNS = (('close', 'Close'), ('volume', 'Volume'), ('vol_ma', 'Volume_MA20'), ('ma20', 'MA20'),
+                  ('ma50', 'MA50'), ('ma150', 'MA150'), ('ma200', 'MA200'), ('rsi', 'RSI'), ('atr', 'ATR'),
+                  ('high52', '52W_High'), ('low52', '52W_Low'), ('roc126', 'ROC_126'))
+
+
+def alloc_snapshot(n):
+    """为 n 只标的预分配快照列缓冲（SoA：每列一个 float64 数组），在策略 __init__ 中调用一次。"""
+    return {name: np.empty(n, dtype=np.float64) for name in SNAPSHOT_COLUMNS}
+
+
+def fill_snapshot(tick_datas, inds, cols, warmup=0, out=None):
+    """
+    把当日各标的行情与指标逐只写入预分配的列缓冲 cols（按 tick_datas 顺序），返回有效行掩码。
+    out 为可选的预分配布尔缓冲，给定时掩码写入其中（逐日复用，不分配新数组）。
+    inds[d] 为整段指标与 close/volume 数组（见 precompute_indicators），按 len(d) - 1 直接取 ndarray 元素。
+    MA200 未就绪或指标取值失败的标的记为无效（其余列不保证有值）；
+    warmup 为最长指标周期，bar 数不足的标的直接跳过，不读取指标。
+    """
+    nan = float('nan')
+    close_c, prev_c, vol_c = cols['Close'], cols['PrevClose'], cols['Volume']
+    volma_c, ma20_c, ma50_c, ma150_c, ma200_c = cols['Volume_MA20'], cols['MA20'], cols['MA50'], cols['MA150'], cols['MA200']
+    rsi_c, atr_c, h52_c, l52_c, roc_c = cols['RSI'], cols['ATR'], cols['52W_High'], cols['52W_Low'], cols['ROC_126']
+    for i, d in enumerate(tick_datas):
+        if len(d) < warmup:
+            ma200_c[i] = nan
             continue
+        ind = inds[d]
+        j = len(d) - 1
         try:
-            if math.isnan(inds[d]['ma200'][0]):
-                continue
-            roc126 = inds[d]['roc126'][0] if 'roc126' in inds[d] else float('nan')
+            ma200 = ind['ma200'][j]
+            close = ind['close']
+            close_c[i] = close[j]
+            prev_c[i] = close[j - 1]
+            vol_c[i] = ind['volume'][j]
+            volma_c[i] = ind['vol_ma'][j]
+            ma20_c[i] = ind['ma20'][j] if 'ma20' in ind else nan
+            ma50_c[i] = ind['ma50'][j]
+            ma150_c[i] = ind['ma150'][j]
+            rsi_c[i] = ind['rsi'][j]
+            atr_c[i] = ind['atr'][j]
+            h52_c[i] = ind['high52'][j]
+            l52_c[i] = ind['low52'][j]
+            roc_c[i] = ind['roc126'][j] if 'roc126' in ind else nan
         except (IndexError, KeyError, TypeError):
+            ma200 = nan
+        ma200_c[i] = ma200
+    if out is None:
+        out = np.empty(len(tick_datas), dtype=bool)
+    return _finish_snapshot(cols, out)
+
+
+def _finish_snapshot(cols, out):
+    """列已填好后：原地算 ATR_pct，并把有效行掩码（MA200 非 NaN）写入 out 返回。"""
+    atr, pct = cols['ATR'], cols['ATR_pct']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # 短期爆发(ATR涨幅)；ATR 非正或缺失时为 0。全部原地计算，out 先借作 ATR 非正的掩码
+        np.subtract(cols['Close'], cols['PrevClose'], out=pct)
+        np.divide(pct, atr, out=pct)
+        np.less_equal(atr, 0.0, out=out)
+        np.copyto(pct, 0.0, where=out)
+        np.isnan(atr, out=out)
+        np.copyto(pct, 0.0, where=out)
+    ma200 = cols['MA200']
+    return np.equal(ma200, ma200, out=out)  # NaN 自比较为 False：一次比较得到有效行掩码
+
+
+def stack_indicators(tick_datas, inds):
+    """
+    把各标的整段指标数组按 tick_datas 顺序堆叠为 {指标键: (n, T) 矩阵}（T 为最长序列，短序列尾部补 NaN），
+    并把 inds[d][键] 换成矩阵对应行的视图（不额外占内存，按 len(d) - 1 取值的用法不变）。
+    之后每个 bar 的快照由 fill_snapshot_stacked 对每列做一次向量化 gather 得到。
+    """
+    n = len(tick_datas)
+    T = max((len(inds[d]['close']) for d in tick_datas), default=0)
+    stacked = {}
+    for key, _ in _STACK_COLUMNS:
+        if not all(key in inds[d] for d in tick_datas):
             continue
-        close, prev_close, atr = d.close[0], d.close[-1], inds[d]['atr'][0]
-        atr_pct = (close - prev_close) / atr if atr and atr > 0 else 0.0  # 短期爆发(ATR涨幅)
-        snapshot_data.append({
-            'Ticker': d._name,
-            'Close': close,
-            'PrevClose': prev_close,
-            'Volume': d.volume[0],
-            'Volume_MA20': inds[d]['vol_ma'][0],
-            'MA20': inds[d]['ma20'][0] if 'ma20' in inds[d] else float('nan'),
-            'MA50': inds[d]['ma50'][0],
-            'MA150': inds[d]['ma150'][0],
-            'MA200': inds[d]['ma200'][0],
-            'RSI': inds[d]['rsi'][0],
-            'ATR': atr,
-            '52W_High': inds[d]['high52'][0],
-            '52W_Low': inds[d]['low52'][0],
-            'ROC_126': roc126,
-            'ATR_pct': atr_pct,
-        })
-    if not snapshot_data:
+        m = np.full((n, T), np.nan)
+        for i, d in enumerate(tick_datas):
+            a = inds[d][key]
+            m[i, :len(a)] = a
+            inds[d][key] = m[i, :len(a)]
+        stacked[key] = m
+    return stacked
+
+
+def fill_snapshot_stacked(lens, stacked, cols, warmup=0, out=None):
+    """
+    fill_snapshot 的向量化版本：lens 为各标的当前 bar 数（len(d)），stacked 为 stack_indicators 的结果。
+    每列按扁平下标 行号*T + len(d)-1 一次 np.take 写入列缓冲；bar 数不足 warmup 的标的记为无效。
+    """
+    close = stacked['close']
+    n, T = close.shape
+    flat = np.maximum(lens - 1, 0)
+    flat += np.arange(0, n * T, T)
+    nan = float('nan')
+    for key, col in _STACK_COLUMNS:
+        m = stacked.get(key)
+        if m is None:
+            cols[col].fill(nan)
+        else:
+            np.take(m.reshape(-1), flat, out=cols[col])
+    flat -= 1
+    np.take(close.reshape(-1), flat, out=cols['PrevClose'])
+    cols['PrevClose'][lens < 2] = nan
+    cols['MA200'][lens < max(warmup, 1)] = nan
+    if out is None:
+        out = np.empty(n, dtype=bool)
+    return _finish_snapshot(cols, out)
+
+
+def build_snapshot(datas, spy, inds):
+    """
+    从 Backtrader datas 构建当日全市场快照 DataFrame（调试/兼容用；策略内直接使用 fill_snapshot 的列缓冲）。
+    :param datas: self.datas
+    :param spy: self.spy (跳过)
+    :param inds: self.inds[d] 预计算指标数组字典
+    :return: DataFrame, index=Ticker, columns=SNAPSHOT_COLUMNS
+    """
+    tick_datas = [d for d in datas if d is not spy and d in inds]
+    if not tick_datas:
         return pd.DataFrame()
-    return pd.DataFrame(snapshot_data).set_index('Ticker')
+    cols = alloc_snapshot(len(tick_datas))
+    valid = fill_snapshot(tick_datas, inds, cols)
+    if not valid.any():
+        return pd.DataFrame()
+    tickers = np.array([d._name for d in tick_datas], dtype=object)[valid]
+    # 布尔索引已得到新数组，直接交给 DataFrame，不再逐列复制一次
+    return pd.DataFrame({k: v[valid] for k, v in cols.items()}, index=pd.Index(tickers, name='Ticker'), copy=False)
+
+
+class Snapshot:
+    """
+    当日截面（SoA）：全部标的代码、等长列数组（行情指标 + 可选基本面列）与有效行掩码。
+    代码→行号映射在策略初始化时建好，按代码取单值为 O(1)，不构造 DataFrame。
+    """
+
+    def __init__(self, tickers, cols, valid, pos):
+        self.tickers = tickers
+        self.cols = cols
+        self.valid = valid
+        self._pos = pos
+
+    @property
+    def empty(self):
+        return not self.valid.any()
+
+    def has(self, col):
+        return col in self.cols
+
+    def __contains__(self, ticker):
+        i = self._pos.get(ticker)
+        return i is not None and bool(self.valid[i])
+
+    def get(self, ticker, col, default=None):
+        """有效标的的某列取值；标的无效或列不存在时返回 default。"""
+        i = self._pos.get(ticker)
+        if i is None or not self.valid[i] or col not in self.cols:
+            return default
+        return self.cols[col][i]
+
+
+def merge_candidates(screeners, limit):
+    """
+    合并多路筛选结果（同一标的取较高分，NaN 忽略），按得分降序取前 limit 个代码。
+    与 pd.concat + groupby(index).max() + sort_values(ascending=False).head(limit) 结果一致（含并列顺序）。
+    """
+    best = {}
+    for s in screeners:
+        for t, v in s.iter_scores():
+            old = best.get(t)
+            if old is None or old != old or v > old:
+                best[t] = v
+    if not best:
+        return []
+    keys = sorted(best)
+    order = top_indexer(np.array([best[k] for k in keys], dtype=np.float64), limit, ascending=False)
+    return [keys[i] for i in order]
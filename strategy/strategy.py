@@ -1,10 +1,12 @@
-import time
 import math
 import backtrader as bt
+import numpy as np
 import pandas as pd
 from strategy.screener import StockScreener
 from strategy.order_manager import OrderManager
-from strategy.signals import build_snapshot
+from strategy.signals import (INDICATOR_WARMUP, Snapshot, alloc_snapshot, fill_snapshot_stacked, merge_candidates,
+                               precompute_indicators, stack_indicators)
+from strategy._kernels import entry_masks, rolling_mean
 from portfolio.manager import PortfolioManager
 from utils.logger import Logger
 from data.manager import load_fundamentals
@@ -66,6 +68,8 @@ class ModularScreenerStrategy(bt.Strategy):
         ('min_eps_growth', None),
         ('sector', None),
         ('top_n', 5),
+        # 选股调仓日：None 为每日；0-6 为每周该日（0=周一）才筛选开新仓，其余交易日只管理持仓
+        ('rebalance_weekday', None),
         # 基本面开启时：提高流动性门槛，保证剩余标的成交充足；候选为 0 时是否用宽松基本面重试
         ('min_avg_dollar_vol', None),
         ('min_candidates_after_fundamentals', 0),
@@ -81,183 +85,240 @@ class ModularScreenerStrategy(bt.Strategy):
             max_leverage=1.0
         )
         self.om = OrderManager(self, debug=self.params.debug)
+        self.om.register_names(d._name for d in self.datas)
         self.fundamentals = None
         if self.params.fundamentals_enabled and getattr(self.params, 'data_dir', None):
             self.fundamentals = load_fundamentals(self.params.data_dir, logger=self.logger)
             if self.fundamentals is not None:
                 self.logger.info(f"📚 基本面数据已加载 {len(self.fundamentals)} 条，screener 将应用 PE/EPS 增长/板块等过滤")
-        self.spy_ma200 = bt.indicators.SMA(self.spy.close, period=200)
+        # 指标在回测开始前按整段行情一次算好（preload 后 d.close.array 已是全部 bar），
+        # next 中按 len(d) - 1 取当前值，不再由 backtrader 逐 bar 递推
+        spy_close = np.asarray(self.spy.close.array)
+        self.spy_ma200 = rolling_mean(spy_close, 200)
+        # 熊市掩码（SPY < MA200）整段算一次，next 中按 bar 下标查表；MA200 未就绪处 NaN 比较为 False
+        with np.errstate(invalid='ignore'):
+            self._bear = spy_close < self.spy_ma200
+        # MA200 在第 200 根 bar 起有值且此后一直有效：预热判断用 len(d)，不再逐 bar 探测 NaN
+        self._warmup = 200
+        self._warm = False
         self.inds = {}
         self.logger.info("🛠️ 初始化指标计算中...")
         for d in self.datas:
             if d is self.spy:
                 continue
-            self.inds[d] = {
-                'ma20': bt.indicators.SMA(d.close, period=20),
-                'ma50': bt.indicators.SMA(d.close, period=50),
-                'ma150': bt.indicators.SMA(d.close, period=150),
-                'ma200': bt.indicators.SMA(d.close, period=200),
-                'atr': bt.indicators.ATR(d, period=self.params.atr_period),
-                'rsi': bt.indicators.RSI(d.close, period=self.params.rsi_period),
-                'vol_ma': bt.indicators.SMA(d.volume, period=20),
-                'high52': bt.indicators.Highest(d.high, period=252),
-                'low52': bt.indicators.Lowest(d.low, period=252),
-                'roc126': bt.indicators.ROC(d.close, period=126),  # 长期趋势，综合打分用
-            }
+            # 复制出独立数组：保留对 array.array 的 buffer 视图会使 backtrader 之后无法扩展该 line
+            close, volume = np.array(d.close.array), np.array(d.volume.array)
+            self.inds[d] = precompute_indicators(
+                close, np.asarray(d.high.array), np.asarray(d.low.array), volume,
+                atr_period=self.params.atr_period, rsi_period=self.params.rsi_period)
+            # 原始行情也存为 ndarray，热路径按下标直接取值，不经 LineBuffer.__getitem__
+            self.inds[d]['close'] = close
+            self.inds[d]['volume'] = volume
             d.highest_price = 0.0
             d.buy_date = None
             d.entry_price = None
             d.target_shares = None  # 金字塔目标股数，首仓 50% 后加仓用
-            d.take_profit_levels_hit = []  # 已触发的分批止盈级别（ATR倍数），避免重复止盈
+            d.take_profit_levels_hit = 0  # 已触发的分批止盈级别位掩码（第 i 位对应第 i 个 ATR 倍数），避免重复止盈
+        # 当日快照列缓冲（SoA）：每列一个数组，按 _tick_datas 顺序逐日覆写，不再逐日构造 DataFrame
+        self._tick_datas = tuple(d for d in self.datas if d is not self.spy)
+        self._by_name = {d._name: d for d in self.datas}
+        names = [d._name for d in self._tick_datas]
+        self._tickers = np.array(names, dtype=object)
+        self._ticker_pos = {t: i for i, t in enumerate(names)}
+        self._col = alloc_snapshot(len(self._tick_datas))
+        # 各标的指标堆叠为 (标的数, bar 数) 矩阵，inds[d] 改为其行视图；每日快照每列一次 gather
+        self._stacked = stack_indicators(self._tick_datas, self.inds)
+        self._entry_kw, fund_steps = self._screen_config()
+        # 板块止损系数按「去空格 + 小写」键建一次（同名规范化后取先出现者，同原逐项匹配）
+        self._sector_factors_lower = {}
+        for k, v in (self.params.sector_stop_mult_factors or {}).items():
+            self._sector_factors_lower.setdefault(str(k).strip().lower(), v)
+        # 当前持仓（size > 0）：data -> 其在 broker.positions 中的次序，在 notify_order 中维护；
+        # 持仓管理按该次序遍历，与原先遍历 broker.positions 的下单顺序一致
+        self._open = {}
+        self._tick_index = {d: i for i, d in enumerate(self._tick_datas)}
+        self._positions_registered = False
+        # 三个筛选器（全市场打分 / 追涨 / 低吸）只建一次，每日 reset 指向当日列缓冲
+        self._scr_all, self._scr_b, self._scr_d = (StockScreener.__new__(StockScreener) for _ in range(3))
+        for scr in (self._scr_all, self._scr_b, self._scr_d):
+            scr.debug = self.params.debug
+        # 基本面静态，按标的顺序对齐一次，每日与快照列一起使用
+        self._fund_cols = {}
+        if self.fundamentals is not None and not self.fundamentals.empty:
+            fund = self.fundamentals[~self.fundamentals.index.duplicated()].reindex(names)
+            self._fund_cols = {c: fund[c].to_numpy() for c in fund.columns}
+        # 基本面过滤条件全部静态：按标的顺序算一次掩码，逐日只与入场掩码相与，不再每日对两条链重跑
+        self._fund_mask = None
+        if fund_steps:
+            self._fund_mask = StockScreener.from_arrays(self._tickers, self._fund_cols, debug=False).pipeline_mask(fund_steps)
+        # 当日截面全部列（行情列缓冲 + 基本面列）与三个布尔掩码缓冲：标的数固定，逐日原地覆写，next 中不再分配数组
+        self._cols = {**self._col, **self._fund_cols}
+        n = len(self._tick_datas)
+        self._valid = np.empty(n, dtype=bool)
+        self._entry_out = (np.empty(n, dtype=bool), np.empty(n, dtype=bool))
 
     def next(self):
-        self.logger.show_progress(self.data.datetime.datetime(0))
-        t_start = time.time()
+        if not self._warm:
+            # 同 backtrader 指标 minperiod：SPY 满 200 根、每只个股满 INDICATOR_WARMUP 根后才开始交易
+            if len(self.spy) < self._warmup or any(len(d) < INDICATOR_WARMUP for d in self._tick_datas):
+                return
+            self._warm = True
+        # 当日日期只转换一次，之后各分支复用 dt / month_head；参数代理只取一次
+        p = self.params
         dt = self.data.datetime.date(0)
-        if math.isnan(self.spy_ma200[0]):
-            return
-        if self.spy.close[0] < self.spy_ma200[0]:
-            if self.params.debug and dt.day == 1:
+        month_head = p.debug and dt.day == 1
+        # 进度条每 64 根 bar 才尝试刷新一次（其内部另有 1 秒节流），不再每根 bar 取时间
+        if not len(self) & 63:
+            self.logger.show_progress(self.data.datetime.datetime(0))
+        # 大盘风控先于一切逐标的工作：熊市日不建快照
+        if self._bear[len(self.spy) - 1]:
+            if month_head:
                 print(f"🛑 {dt} [风控] 熊市保护生效 (SPY < MA200)")
             return
 
-        df_today = build_snapshot(self.datas, self.spy, self.inds)
-        if df_today.empty:
+        lens = np.fromiter(map(len, self._tick_datas), dtype=np.intp, count=len(self._tick_datas))
+        valid = fill_snapshot_stacked(lens, self._stacked, self._col, warmup=self._warmup, out=self._valid)
+        if not valid.any():
             return
-        if self.fundamentals is not None and not self.fundamentals.empty:
-            df_today = df_today.join(self.fundamentals, how='left')
-
-        min_avg = getattr(self.params, 'min_avg_dollar_vol', None)
-        vol_mult = getattr(self.params, 'vol_multiplier', None)
-        top_n = getattr(self.params, 'top_n', 5)
-
-        # 全市场综合打分，供末位淘汰时查任意标的得分
-        screener_all = StockScreener(df_today.copy())
-        screener_all.calculate_composite_score()
-        all_scores = screener_all.get_scores()
-
-        def _fundamentals_chain(s):
-            if self.fundamentals is not None and not self.fundamentals.empty:
-                s = s.filter_valuation(max_pe=self.params.max_pe)
-                if getattr(self.params, 'min_eps_growth', None) is not None:
-                    s = s.filter_growth(min_eps_growth=self.params.min_eps_growth)
-                if getattr(self.params, 'sector', None):
-                    s = s.filter_sector(sector_name=self.params.sector)
-                s = (
-                    s.filter_pb(max_pb=self.params.max_pb)
-                    .filter_roe(min_roe=self.params.min_roe)
-                    .filter_revenue_growth(min_growth=self.params.min_revenue_growth)
-                    .filter_debt_to_equity(max_dte=self.params.max_debt_to_equity)
-                )
-            return s
-
-        # 追涨：动量启动 + RSI 0–75
-        screener_b = StockScreener(df_today.copy())
-        chain_b = (
-            screener_b
-            .filter_liquidity(
-                min_price=self.params.min_price,
-                min_dollar_vol=self.params.min_dollar_vol,
-                min_avg_dollar_vol=min_avg,
-            )
-            .filter_volume_vs_ma(vol_multiplier=vol_mult)
-            .filter_trend_alignment()
-            .filter_gap_up(threshold_atr=0.5)
-            .filter_rsi_setup(max_rsi=75)
-        )
-        chain_b = _fundamentals_chain(chain_b)
-        chain_b.calculate_composite_score().rank_and_cut(sort_by='Score', ascending=False, top_n=top_n)
-        breakout_tickers = chain_b.get_result()
-        breakout_scores = chain_b.get_scores()
-
-        # 低吸：价格 > 年线 且 RSI < 35
-        screener_d = StockScreener(df_today.copy())
-        chain_d = (
-            screener_d
-            .filter_liquidity(
-                min_price=self.params.min_price,
-                min_dollar_vol=self.params.min_dollar_vol,
-                min_avg_dollar_vol=min_avg,
-            )
-            .filter_volume_vs_ma(vol_multiplier=vol_mult)
-            .filter_trend_alignment()
-            .filter_dip_setup()
-        )
-        chain_d = _fundamentals_chain(chain_d)
-        chain_d.calculate_composite_score().rank_and_cut(sort_by='Score', ascending=False, top_n=top_n)
-        dip_tickers = chain_d.get_result()
-        dip_scores = chain_d.get_scores()
-
-        # 合并两类信号（同一标的取较高分），按综合得分排序取前 top_n
-        candidate_scores = pd.concat([breakout_scores, dip_scores])
-        candidate_scores = candidate_scores.groupby(candidate_scores.index).max().sort_values(ascending=False).head(top_n * 2)
-        target_tickers = candidate_scores.index.tolist()[:top_n]
-        if self.params.debug and (breakout_tickers or dip_tickers):
+        cols = self._cols
+        snap = Snapshot(self._tickers, cols, valid, self._ticker_pos)
+        tickers = self._tickers
+
+        top_n = getattr(p, 'top_n', 5)
+
+        # 行情条件由内核一次遍历算出：追涨（动量启动 + RSI 0–75）/ 低吸（价格 > 年线 且 RSI < 35），再叠加基本面过滤
+        weekday = p.rebalance_weekday
+        if weekday is not None and dt.weekday() != weekday:
+            # 非调仓日：不算入场条件与筛选链，下方 execute_trades 仍照常止损/止盈
+            mask_b = mask_d = None
+        else:
+            mask_b, mask_d = entry_masks(valid, cols, out=self._entry_out, **self._entry_kw)
+            if self._fund_mask is not None:
+                mask_b &= self._fund_mask
+                mask_d &= self._fund_mask
+        if mask_b is not None and (mask_b.any() or mask_d.any()):
+            chain_b = self._scr_b.reset(tickers, cols, mask=mask_b)
+            chain_b.calculate_composite_score().rank_and_cut(sort_by='Score', ascending=False, top_n=top_n)
+            breakout_tickers = chain_b.get_result()
+
+            chain_d = self._scr_d.reset(tickers, cols, mask=mask_d)
+            chain_d.calculate_composite_score().rank_and_cut(sort_by='Score', ascending=False, top_n=top_n)
+            dip_tickers = chain_d.get_result()
+
+            # 合并两类信号（同一标的取较高分），按综合得分排序取前 top_n
+            target_tickers = merge_candidates((chain_b, chain_d), top_n * 2)[:top_n]
+        else:
+            # 非调仓日或无标的通过行情条件（含流动性）：跳过筛选链与打分，仍照常管理持仓
+            breakout_tickers = dip_tickers = target_tickers = []
+        if p.debug and (breakout_tickers or dip_tickers):
             print(f"\n📅 {dt} 选股: 追涨 {breakout_tickers} | 低吸 {dip_tickers} → 合并 {target_tickers}")
 
-        self.execute_trades(target_tickers, all_scores=all_scores, df_today=df_today)
+        # 全市场综合打分只用于满仓时的末位淘汰：持仓在 next 内不变（由 notify_order 维护），未满仓或无候选的 bar 不算
+        all_scores = None
+        if target_tickers and len(self._open) >= p.max_pos:
+            screener_all = self._scr_all.reset(tickers, cols, mask=valid)
+            # 只按代码取少数几个分数：直接建 dict，不构造 Series（Series.get 每次都走索引引擎）
+            all_scores = dict(screener_all.calculate_composite_score().iter_scores())
+
+        self.execute_trades(target_tickers, all_scores=all_scores, snap=snap, dt=dt)
+
+    def _ind(self, d, name):
+        """标的 d 当前 bar 的预计算指标值（含 'close' / 'volume'）。"""
+        return self.inds[d][name][len(d) - 1]
 
-    def _position_sector_counts(self, df_today=None):
-        """当前持仓按板块计数；df_today 需含 Sector 列（来自 fundamentals join）。"""
+    def _screen_config(self):
+        """
+        选股配置，只依赖参数，初始化时构建一次：entry_masks 的行情条件参数，
+        以及基本面过滤步骤 [(方法名, kwargs), ...]（初始化时由 StockScreener.pipeline_mask 算成静态掩码）。
+        """
+        p = self.params
+        entry_kw = dict(
+            min_price=p.min_price,
+            min_dollar_vol=p.min_dollar_vol,
+            min_avg_dollar_vol=getattr(p, 'min_avg_dollar_vol', None),
+            vol_multiplier=getattr(p, 'vol_multiplier', None),
+            gap_atr=0.5, max_rsi=75, dip_rsi=35,
+        )
+        fundamentals = []
+        if self.fundamentals is not None and not self.fundamentals.empty:
+            fundamentals.append(('filter_valuation', dict(max_pe=p.max_pe)))
+            if getattr(p, 'min_eps_growth', None) is not None:
+                fundamentals.append(('filter_growth', dict(min_eps_growth=p.min_eps_growth)))
+            if getattr(p, 'sector', None):
+                fundamentals.append(('filter_sector', dict(sector_name=p.sector)))
+            fundamentals += [
+                ('filter_pb', dict(max_pb=p.max_pb)),
+                ('filter_roe', dict(min_roe=p.min_roe)),
+                ('filter_revenue_growth', dict(min_growth=p.min_revenue_growth)),
+                ('filter_debt_to_equity', dict(max_dte=p.max_debt_to_equity)),
+            ]
+        return entry_kw, fundamentals
+
+    def _held(self):
+        """
+        当前持仓标的，按 _tick_datas 顺序。首次调用时逐只 getposition 一遍：getposition 会把标的登记进
+        broker.positions，登记顺序决定 _open 的次序（即持仓管理的下单顺序），须与原先的全量扫描一致；
+        之后所有标的都已登记，直接由 _open 得到，不再逐只扫描。
+        """
+        if not self._positions_registered:
+            self._positions_registered = True
+            return [d for d in self._tick_datas if self.getposition(d).size > 0]
+        return sorted(self._open, key=self._tick_index.get)
+
+    def _position_sector_counts(self, snap=None):
+        """当前持仓按板块计数；snap 需含 Sector 列（来自 fundamentals）。"""
         sector_col = 'Sector'
-        if df_today is None or sector_col not in df_today.columns:
+        if snap is None or not snap.has(sector_col):
             return {}
         from collections import Counter
         counts = Counter()
-        for d in self.datas:
-            if d is self.spy:
-                continue
-            pos = self.getposition(d)
-            if pos.size <= 0:
-                continue
+        for d in self._held():
             ticker = d._name
-            if ticker not in df_today.index:
+            if ticker not in snap:
                 continue
-            sec = df_today.loc[ticker, sector_col]
+            sec = snap.get(ticker, sector_col)
             if pd.isna(sec):
                 sec = '_Unknown'
             counts[str(sec).strip()] += 1
         return dict(counts)
 
-    def _effective_stop_mult(self, data, df_today=None):
+    def _effective_stop_mult(self, data, snap=None):
         """
         计算单只股票的动态 ATR 倍数：
         1) 按 ATR% 分组决定基础倍数
         2) 再按板块做系数调整（可选）
         """
-        base = float(self.params.stop_atr_mult)
-        if not getattr(self.params, 'dynamic_stop_enabled', False):
+        p = self.params
+        base = float(p.stop_atr_mult)
+        if not getattr(p, 'dynamic_stop_enabled', False):
             return base
         try:
-            atr = float(self.inds[data]['atr'][0])
-            price = float(data.close[0])
+            atr = float(self._ind(data, 'atr'))
+            price = float(self._ind(data, 'close'))
         except Exception:
             return base
         if price <= 0 or atr <= 0:
             return base
         atr_pct = atr / price
-        low = float(getattr(self.params, 'atr_pct_low', 0.02))
-        high = float(getattr(self.params, 'atr_pct_high', 0.05))
+        low = float(getattr(p, 'atr_pct_low', 0.02))
+        high = float(getattr(p, 'atr_pct_high', 0.05))
         if atr_pct <= low:
-            mult = float(getattr(self.params, 'stop_mult_low_vol', base))
+            mult = float(getattr(p, 'stop_mult_low_vol', base))
         elif atr_pct >= high:
-            mult = float(getattr(self.params, 'stop_mult_high_vol', base))
+            mult = float(getattr(p, 'stop_mult_high_vol', base))
         else:
             mult = base
 
         # 板块加成/收紧
-        factors = getattr(self.params, 'sector_stop_mult_factors', None) or {}
-        if df_today is not None and (not df_today.empty) and 'Sector' in df_today.columns and data._name in df_today.index:
-            sec = df_today.loc[data._name, 'Sector']
+        factors = getattr(p, 'sector_stop_mult_factors', None) or {}
+        if snap is not None and snap.has('Sector') and data._name in snap:
+            sec = snap.get(data._name, 'Sector')
             if not pd.isna(sec):
                 sec_key = str(sec).strip()
                 f = factors.get(sec_key)
                 if f is None:
-                    # 兼容大小写/空格差异
-                    for k, v in factors.items():
-                        if str(k).strip().lower() == sec_key.lower():
-                            f = v
-                            break
+                    # 兼容大小写/空格差异：规范化键表在 __init__ 建好，直接查
+                    f = self._sector_factors_lower.get(sec_key.lower())
                 if f is not None:
                     try:
                         mult = mult * float(f)
@@ -266,121 +327,127 @@ class ModularScreenerStrategy(bt.Strategy):
         # 合理范围保护
         return max(1.0, float(mult))
 
-    def execute_trades(self, target_tickers, all_scores=None, df_today=None):
-        dt = self.data.datetime.date(0)
+    def execute_trades(self, target_tickers, all_scores=None, snap=None, dt=None):
+        p = self.params
+        dt = dt if dt is not None else self.data.datetime.date(0)
+        # debug 输出先攒在本 bar 的列表里，结束时一次写出；debug 关闭时为 None，各处只做一次 is 判断
+        msgs = [] if p.debug else None
         account_val = self.broker.get_value()
         current_cash = self.broker.get_cash()
-        all_scores = all_scores if all_scores is not None else pd.Series(dtype=float)
-        df_today = df_today if df_today is not None else pd.DataFrame()
+        all_scores = all_scores if all_scores is not None else {}
 
-        for d in self.broker.positions:
+        # 持仓的现价 / ATR / RSI 从当日列缓冲按行号一次取出，最高价、跟踪止损价与移动止盈价整体向量化计算；
+        # 下单仍按持仓次序逐只进行（现金等状态依次传递）
+        held = sorted(self._open, key=self._open.get)
+        n_held = len(held)
+        rows = np.fromiter(map(self._tick_index.__getitem__, held), dtype=np.intp, count=n_held)
+        closes, atrs, rsis = (self._col[c][rows] for c in ('Close', 'ATR', 'RSI'))
+        highs = np.fromiter((d.highest_price for d in held), dtype=np.float64, count=n_held)
+        np.fmax(highs, closes, out=highs)  # 现价 NaN 时保留原最高价
+        stop_mults = np.fromiter((self._effective_stop_mult(d, snap=snap) for d in held), dtype=np.float64, count=n_held)
+        stops = highs - atrs * stop_mults
+        take_profits = highs * (1 - p.take_profit_pct)
+        for d, close, atr, rsi, highest, stop_mult, stop_price, take_profit_price in zip(
+                held, closes.tolist(), atrs.tolist(), rsis.tolist(), highs.tolist(), stop_mults.tolist(), stops.tolist(),
+                take_profits.tolist()):
             pos = self.getposition(d)
-            if pos.size <= 0:
-                continue
-            if d.close[0] > d.highest_price:
-                d.highest_price = d.close[0]
-            atr = self.inds[d]['atr'][0]
-            rsi = self.inds[d]['rsi'][0]
+            d.highest_price = highest
             entry_price = getattr(d, 'entry_price', None) or pos.price
             target_shares = getattr(d, 'target_shares', None) or pos.size
 
             # 1) ATR 跟踪止损
-            stop_mult = self._effective_stop_mult(d, df_today=df_today)
-            stop_price = d.highest_price - (atr * stop_mult)
-            if d.close[0] < stop_price:
-                if self.params.debug:
-                    print(f"🛡️ {dt} [止损] {d._name} 离场 (现价{d.close[0]:.2f} < 止损{stop_price:.2f}, mult={stop_mult:.2f})")
+            if close < stop_price:
+                if msgs is not None:
+                    msgs.append(f"🛡️ {dt} [止损] {d._name} 离场 (现价{close:.2f} < 止损{stop_price:.2f}, mult={stop_mult:.2f})")
                 self.om.sell_market(d)
                 continue
             # 2) 时间止损：买入后 N 天未涨则清仓（time_stop_enabled=False 时跳过）
-            if self.params.time_stop_enabled and getattr(d, 'buy_date', None) is not None and getattr(d, 'entry_price', None) is not None:
+            if p.time_stop_enabled and getattr(d, 'buy_date', None) is not None and getattr(d, 'entry_price', None) is not None:
                 days_held = (dt - d.buy_date).days
-                if days_held >= self.params.time_stop_days and d.close[0] <= d.entry_price:
-                    if self.params.debug:
-                        print(f"⏱️ {dt} [时间止损] {d._name} 持有{days_held}天未涨 (现价{d.close[0]:.2f} ≤ 成本{d.entry_price:.2f})")
+                if days_held >= p.time_stop_days and close <= d.entry_price:
+                    if msgs is not None:
+                        msgs.append(f"⏱️ {dt} [时间止损] {d._name} 持有{days_held}天未涨 (现价{close:.2f} ≤ 成本{d.entry_price:.2f})")
                     self.om.sell_market(d)
                     continue
             # 3) 移动止盈：价格创新高后，回撤超过 take_profit_pct 时止盈
-            if self.params.take_profit_enabled and d.highest_price > 0 and atr and atr > 0:
-                take_profit_price = d.highest_price * (1 - self.params.take_profit_pct)
-                if d.close[0] < take_profit_price:
-                    if self.params.debug:
-                        print(f"💰 {dt} [移动止盈] {d._name} 回撤{self.params.take_profit_pct:.1%} (最高{d.highest_price:.2f} → 现价{d.close[0]:.2f})")
+            if p.take_profit_enabled and highest > 0 and atr and atr > 0:
+                if close < take_profit_price:
+                    if msgs is not None:
+                        msgs.append(f"💰 {dt} [移动止盈] {d._name} 回撤{p.take_profit_pct:.1%} (最高{d.highest_price:.2f} → 现价{close:.2f})")
                     self.om.sell_market(d)
                     continue
 
             # 4) 分批止盈：浮盈达到不同 ATR 倍数时分别止盈一部分
-            if self.params.take_profit_atr_enabled and atr and atr > 0 and entry_price:
-                unrealized = d.close[0] - entry_price
+            if p.take_profit_atr_enabled and atr and atr > 0 and entry_price:
+                unrealized = close - entry_price
                 unrealized_atr = unrealized / atr if atr > 0 else 0
-                levels_hit = getattr(d, 'take_profit_levels_hit', [])
-                levels = self.params.take_profit_atr_levels
-                pcts = self.params.take_profit_atr_pcts
+                levels_hit = getattr(d, 'take_profit_levels_hit', 0)
+                levels = p.take_profit_atr_levels
+                pcts = p.take_profit_atr_pcts
                 for i, (level, pct) in enumerate(zip(levels, pcts)):
-                    if unrealized_atr >= level and i not in levels_hit and pos.size >= 2:
+                    if unrealized_atr >= level and not levels_hit >> i & 1 and pos.size >= 2:
                         reduce_size = max(1, int(pos.size * pct))
-                        if self.params.debug:
-                            print(f"📊 {dt} [分批止盈] {d._name} 浮盈{unrealized_atr:.1f}ATR 止盈{pct:.0%} ({reduce_size}/{pos.size})")
+                        if msgs is not None:
+                            msgs.append(f"📊 {dt} [分批止盈] {d._name} 浮盈{unrealized_atr:.1f}ATR 止盈{pct:.0%} ({reduce_size}/{pos.size})")
                         self.om.sell_market(d, size=reduce_size)
-                        levels_hit.append(i)
-                        d.take_profit_levels_hit = levels_hit
+                        d.take_profit_levels_hit = levels_hit | 1 << i
                         break  # 一次只触发一个级别
 
             # 5) RSI 超买止盈：分批止盈 50%
-            if not math.isnan(rsi) and rsi > self.params.rsi_overbought and pos.size >= 2:
-                reduce_size = max(1, int(pos.size * self.params.rsi_reduce_pct))
-                if self.params.debug:
-                    print(f"📉 {dt} [RSI止盈] {d._name} RSI={rsi:.1f}>80 减仓 {reduce_size}/{pos.size}")
+            if not math.isnan(rsi) and rsi > p.rsi_overbought and pos.size >= 2:
+                reduce_size = max(1, int(pos.size * p.rsi_reduce_pct))
+                if msgs is not None:
+                    msgs.append(f"📉 {dt} [RSI止盈] {d._name} RSI={rsi:.1f}>80 减仓 {reduce_size}/{pos.size}")
                 self.om.sell_market(d, size=reduce_size)
                 continue
             # 6) 金字塔加仓：浮盈 > 1.5 ATR 且 仓位 < 目标，加仓剩余 30%–50%
             if target_shares is not None and pos.size < target_shares and atr and atr > 0:
-                unrealized = d.close[0] - entry_price
+                unrealized = close - entry_price
                 if unrealized > 1.5 * atr:
                     add_max = target_shares - pos.size
                     add_size = max(1, int(add_max * 0.4))  # 加仓剩余 40%
-                    if add_size > 0 and current_cash >= add_size * d.close[0]:
-                        trigger = d.close[0] * 1.001
+                    if add_size > 0 and current_cash >= add_size * close:
+                        trigger = close * 1.001
                         self.om.buy_stop(data=d, size=min(add_size, add_max), price=trigger, valid_days=1)
-                        current_cash -= add_size * d.close[0]
-                        if self.params.debug:
-                            print(f"📈 {dt} [金字塔] {d._name} 浮盈>{1.5*atr:.2f} 加仓 {add_size}")
+                        current_cash -= add_size * close
+                        if msgs is not None:
+                            msgs.append(f"📈 {dt} [金字塔] {d._name} 浮盈>{1.5*atr:.2f} 加仓 {add_size}")
                 continue
 
-        current_pos_count = len([d for d in self.broker.positions if self.getposition(d).size > 0])
-        sector_counts = self._position_sector_counts(df_today)
+        current_pos_count = len(self._open)
+        sector_counts = self._position_sector_counts(snap)
 
         def sector_ok(ticker):
-            if df_today.empty or ticker not in df_today.index or 'Sector' not in df_today.columns:
+            if snap is None or ticker not in snap or not snap.has('Sector'):
                 return True
-            sec = df_today.loc[ticker, 'Sector']
+            sec = snap.get(ticker, 'Sector')
             if pd.isna(sec):
                 return True
             return sector_counts.get(str(sec).strip(), 0) < 2
 
         # 末位淘汰：满仓时若最强候选得分 > 最弱持仓得分 * 1.2，则卖出最弱、买入最强
-        if current_pos_count >= self.params.max_pos and target_tickers and not all_scores.empty:
-            held = [x for x in self.datas if x is not self.spy and self.getposition(x).size > 0]
+        if current_pos_count >= p.max_pos and target_tickers and all_scores:
+            held = self._held()
             held_scores = [(d, all_scores.get(d._name, 0)) for d in held]
             if held_scores:
                 weakest_d, weakest_score = min(held_scores, key=lambda t: t[1])
                 best_ticker = target_tickers[0]
                 best_score = all_scores.get(best_ticker, 0)
-                ratio = float(getattr(self.params, 'replace_stronger_ratio', 1.2))
+                ratio = float(getattr(p, 'replace_stronger_ratio', 1.2))
 
                 # 安全阀：保护“及格持仓”和“高浮盈持仓”
-                if getattr(self.params, 'replace_protect_enabled', True):
+                if getattr(p, 'replace_protect_enabled', True):
                     # 1) 及格线：得分≥floor 或 价格在 MA20 上方则不轮动
-                    good_floor = float(getattr(self.params, 'replace_good_score_floor', 60.0))
+                    good_floor = float(getattr(p, 'replace_good_score_floor', 60.0))
                     good_enough = weakest_score >= good_floor
                     close_now = None
                     ma20 = None
                     rsi_now = None
-                    if not df_today.empty and weakest_d._name in df_today.index:
-                        close_now = df_today.loc[weakest_d._name, 'Close'] if 'Close' in df_today.columns else None
-                        ma20 = df_today.loc[weakest_d._name, 'MA20'] if 'MA20' in df_today.columns else None
-                        rsi_now = df_today.loc[weakest_d._name, 'RSI'] if 'RSI' in df_today.columns else None
-                    if getattr(self.params, 'replace_good_above_ma20', True) and close_now is not None and ma20 is not None:
+                    if snap is not None and weakest_d._name in snap:
+                        close_now = snap.get(weakest_d._name, 'Close')
+                        ma20 = snap.get(weakest_d._name, 'MA20')
+                        rsi_now = snap.get(weakest_d._name, 'RSI')
+                    if getattr(p, 'replace_good_above_ma20', True) and close_now is not None and ma20 is not None:
                         try:
                             if not pd.isna(close_now) and not pd.isna(ma20) and float(close_now) > float(ma20):
                                 good_enough = True
@@ -388,18 +455,18 @@ class ModularScreenerStrategy(bt.Strategy):
                             pass
 
                     # 2) 大赢家保护：浮盈≥winner_pct 不轮动
-                    winner_pct = float(getattr(self.params, 'replace_winner_protect_pct', 0.10))
+                    winner_pct = float(getattr(p, 'replace_winner_protect_pct', 0.10))
                     profit_pct = 0.0
                     try:
                         entry = getattr(weakest_d, 'entry_price', None) or self.getposition(weakest_d).price
                         if entry and entry > 0:
-                            profit_pct = (float(weakest_d.close[0]) - float(entry)) / float(entry)
+                            profit_pct = (float(self._ind(weakest_d, 'close')) - float(entry)) / float(entry)
                     except Exception:
                         profit_pct = 0.0
                     winner_protect = profit_pct >= winner_pct
 
                     # 3) “确实走弱”条件：跌破 MA20 或 RSI < floor_rsi 才允许轮动
-                    weak_rsi_floor = float(getattr(self.params, 'replace_weak_rsi_floor', 50.0))
+                    weak_rsi_floor = float(getattr(p, 'replace_weak_rsi_floor', 50.0))
                     is_weak = False
                     if close_now is not None and ma20 is not None:
                         try:
@@ -416,7 +483,7 @@ class ModularScreenerStrategy(bt.Strategy):
 
                     if good_enough or winner_protect or (not is_weak):
                         # 满足任一保护条件则不替换
-                        if self.params.debug and (good_enough or winner_protect):
+                        if msgs is not None and (good_enough or winner_protect):
                             why = []
                             if good_enough:
                                 why.append("good_enough")
@@ -424,73 +491,77 @@ class ModularScreenerStrategy(bt.Strategy):
                                 why.append(f"winner({profit_pct:.1%})")
                             if not is_weak:
                                 why.append("not_weak")
-                            print(f"🧯 {dt} [轮动保护] 保留 {weakest_d._name}({weakest_score:.1f}) 原因: {', '.join(why)}")
+                            msgs.append(f"🧯 {dt} [轮动保护] 保留 {weakest_d._name}({weakest_score:.1f}) 原因: {', '.join(why)}")
                         best_score = -1  # 强制不触发替换
 
                 if best_score > weakest_score * ratio and sector_ok(best_ticker):
-                    if self.params.debug:
-                        print(f"🔄 {dt} [末位淘汰] 卖出最弱 {weakest_d._name}({weakest_score:.1f}) 买入 {best_ticker}({best_score:.1f}) ratio={ratio:.2f}")
+                    if msgs is not None:
+                        msgs.append(f"🔄 {dt} [末位淘汰] 卖出最弱 {weakest_d._name}({weakest_score:.1f}) 买入 {best_ticker}({best_score:.1f}) ratio={ratio:.2f}")
                     self.om.sell_market(weakest_d)
                     current_pos_count -= 1
-                    current_cash += self.getposition(weakest_d).size * weakest_d.close[0]
+                    current_cash += self.getposition(weakest_d).size * self._ind(weakest_d, 'close')
                     target_tickers = [t for t in target_tickers if t != best_ticker]
-                    d_new = next((x for x in self.datas if x._name == best_ticker), None)
+                    d_new = self._by_name.get(best_ticker)
                     if d_new and not self.om.has_pending_order(d_new) and self.getposition(d_new).size == 0:
-                        atr = self.inds[d_new]['atr'][0]
+                        atr = self._ind(d_new, 'atr')
+                        close_new = self._ind(d_new, 'close')
                         size_full = self.pm.calculate_position_size(
                             account_value=account_val,
-                            price=d_new.close[0],
+                            price=close_new,
                             atr=atr,
                             method='risk_parity',
-                            risk_pct=self.params.risk_per_trade_pct,
-                            stop_mult=self._effective_stop_mult(d_new, df_today=df_today),
+                            risk_pct=p.risk_per_trade_pct,
+                            stop_mult=self._effective_stop_mult(d_new, snap=snap),
                         )
                         entry_size = self.pm.get_first_entry_size(size_full)
-                        est = entry_size * d_new.close[0]
+                        est = entry_size * close_new
                         if self.pm.check_cash_availability(current_cash, est) and entry_size > 0:
                             d_new.target_shares = size_full
-                            trigger = d_new.close[0] * 1.001
+                            trigger = close_new * 1.001
                             self.om.buy_stop(data=d_new, size=entry_size, price=trigger, valid_days=1)
                             current_cash -= est
                             current_pos_count += 1
 
         for ticker in target_tickers:
-            if current_pos_count >= self.params.max_pos:
+            if current_pos_count >= p.max_pos:
                 break
             if not sector_ok(ticker):
-                if self.params.debug:
-                    print(f"🚫 {dt} [板块熔断] {ticker} 所属板块已满 2 只，跳过")
+                if msgs is not None:
+                    msgs.append(f"🚫 {dt} [板块熔断] {ticker} 所属板块已满 2 只，跳过")
                 continue
-            d = next((x for x in self.datas if x._name == ticker), None)
+            d = self._by_name.get(ticker)
             if not d:
                 continue
             if self.om.has_pending_order(d):
                 continue
             if self.getposition(d).size > 0:
                 continue
-            atr = self.inds[d]['atr'][0]
+            atr = self._ind(d, 'atr')
+            close = self._ind(d, 'close')
             size_full = self.pm.calculate_position_size(
                 account_value=account_val,
-                price=d.close[0],
+                price=close,
                 atr=atr,
                 method='risk_parity',
-                risk_pct=self.params.risk_per_trade_pct,
-                stop_mult=self._effective_stop_mult(d, df_today=df_today),
+                risk_pct=p.risk_per_trade_pct,
+                stop_mult=self._effective_stop_mult(d, snap=snap),
             )
             entry_size = self.pm.get_first_entry_size(size_full)
-            est_cost = entry_size * d.close[0]
+            est_cost = entry_size * close
             if not self.pm.check_cash_availability(current_cash, est_cost):
-                if self.params.debug:
-                    print(f"⚠️ {dt} [资金不足] 无法买入 {ticker} (需 {est_cost:.0f}, 有 {current_cash:.0f})")
+                if msgs is not None:
+                    msgs.append(f"⚠️ {dt} [资金不足] 无法买入 {ticker} (需 {est_cost:.0f}, 有 {current_cash:.0f})")
                 continue
             if entry_size > 0:
                 d.target_shares = size_full
-                trigger = d.close[0] * 1.001
+                trigger = close * 1.001
                 self.om.buy_stop(data=d, size=entry_size, price=trigger, valid_days=1)
                 current_cash -= est_cost
                 current_pos_count += 1
-                if self.params.debug:
-                    print(f"⚡ {dt} [挂单] {d._name} 首仓50% (ATR:{atr:.2f} 股数:{entry_size}/{size_full})")
+                if msgs is not None:
+                    msgs.append(f"⚡ {dt} [挂单] {d._name} 首仓50% (ATR:{atr:.2f} 股数:{entry_size}/{size_full})")
+        if msgs:
+            print('\n'.join(msgs))
 
     def stop(self):
         print("")
@@ -499,6 +570,11 @@ class ModularScreenerStrategy(bt.Strategy):
     def notify_order(self, order):
         self.om.process_status(order)
         if order.status == order.Completed:
+            if self.getposition(order.data).size > 0:
+                if order.data not in self._open:
+                    self._open[order.data] = list(self.broker.positions).index(order.data)
+            else:
+                self._open.pop(order.data, None)
             if order.isbuy():
                 # 更新最高价（如果新成交价更高）
                 if order.executed.price > getattr(order.data, 'highest_price', 0):
@@ -508,7 +584,7 @@ class ModularScreenerStrategy(bt.Strategy):
                 if pos.size == order.executed.size:  # 首次买入（持仓等于本次买入量）
                     order.data.entry_price = order.executed.price
                     order.data.buy_date = self.data.datetime.date(0)
-                    order.data.take_profit_levels_hit = []  # 首次买入时重置分批止盈状态
+                    order.data.take_profit_levels_hit = 0  # 首次买入时重置分批止盈状态
                 elif not hasattr(order.data, 'entry_price') or order.data.entry_price is None:
                     # 如果没有成本价，设置（加仓情况）
                     order.data.entry_price = order.executed.price
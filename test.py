@@ -1,7 +1,6 @@
 # strategies.py (修复版：解决了 TypeError 问题)
 import backtrader as bt
 import datetime
-import math 
 
 class GapUpStrategy(bt.Strategy):
     params = (
@@ -26,6 +25,7 @@ class GapUpStrategy(bt.Strategy):
         self.spy = self.datas[0] 
         
         self.spy_ma200 = bt.indicators.SMA(self.spy.close, period=200)
+        self._warmup = 200  # MA200 就绪所需 bar 数
 
         # 记录策略启动的第一天
         self.first_run = True
@@ -42,6 +42,12 @@ class GapUpStrategy(bt.Strategy):
             }
             self.orders[d] = None
             d.highest_price = 0.0 
+
+        # 个股列表与代码->data 映射只建一次，next 中不再逐 bar 扫描 self.datas
+        self._tick_datas = tuple(d for d in self.datas if d is not self.spy)
+        self._by_name = {d._name: d for d in self.datas}
+        # 当前持仓 data -> 其在 broker.positions 中的次序（notify_order 维护），免去逐 bar 扫描全部持仓
+        self._open = {}
         
 
     def log(self, txt, dt=None):
@@ -54,10 +60,17 @@ class GapUpStrategy(bt.Strategy):
             return
 
         if order.status in [order.Completed]:
+            if self.getposition(order.data).size > 0:
+                if order.data not in self._open:
+                    self._open[order.data] = list(self.broker.positions).index(order.data)
+            else:
+                self._open.pop(order.data, None)
+            verbose = self.params.debug_verbose  # 先判开关再格式化，关闭时不构造日志字符串
             if order.isbuy():
-                self.log(f"🟢 [成交] 买入 {order.data._name} 价格: {order.executed.price:.2f}")
+                if verbose:
+                    self.log(f"🟢 [成交] 买入 {order.data._name} 价格: {order.executed.price:.2f}")
                 order.data.highest_price = order.executed.price
-            elif order.issell():
+            elif order.issell() and verbose:
                 self.log(f"🔴 [成交] 卖出 {order.data._name} 价格: {order.executed.price:.2f} 盈亏: {order.executed.pnl:.2f}")
             self.orders[order.data] = None
 
@@ -67,40 +80,40 @@ class GapUpStrategy(bt.Strategy):
             self.orders[order.data] = None
 
     def next(self):
-        # 1. 检查数据预热情况
-        if self.first_run:
-            print(f"\n📢 [系统] 策略在 {self.data.datetime.date(0)} 开始正式运行 (Next循环启动)")
-            self.first_run = False
-
         # ----------------------------
-        # 2. 大盘风控诊断
+        # 1. 大盘风控诊断（最先执行：未通过的 bar 不做任何逐标的工作）
         # ----------------------------
-        spy_price = self.spy.close[0]
-        spy_ma = self.spy_ma200[0]
-
-        if math.isnan(spy_ma):
-            if self.data.datetime.date(0).day == 1:
+        if len(self.spy) < self._warmup:
+            if self.params.debug_verbose and self.data.datetime.date(0).day == 1:
                 self.log(f"⏳ [预热中] SPY MA200 尚未生成，跳过交易...")
             return
 
+        spy_price = self.spy.close[0]
+        spy_ma = self.spy_ma200[0]
         if spy_price < spy_ma:
-            if self.data.datetime.date(0).day == 1:
+            if self.params.debug_verbose and self.data.datetime.date(0).day == 1:
                 self.log(f"🛑 [风控] 熊市保护生效 (SPY {spy_price:.1f} < MA {spy_ma:.1f})")
             return 
 
+        # 2. 启动提示（仅 debug_verbose 时输出）
+        if self.first_run:
+            if self.params.debug_verbose:
+                print(f"\n📢 [系统] 策略在 {self.data.datetime.date(0)} 开始正式运行 (Next循环启动)")
+            self.first_run = False
+
         # ----------------------------
         # 3. 持仓管理
         # ----------------------------
-        for d in self.broker.positions:
-            if self.getposition(d).size > 0:
-                if d.close[0] > d.highest_price:
-                    d.highest_price = d.close[0]
-                
-                atr = self.inds[d]['atr'][0]
-                stop_price = d.highest_price - (atr * self.params.stop_loss_atr)
-                
-                if d.close[0] < stop_price:
-                    self.close(d)
+        for d in sorted(self._open, key=self._open.get):
+            if d.close[0] > d.highest_price:
+                d.highest_price = d.close[0]
+
+            atr = self.inds[d]['atr'][0]
+            stop_price = d.highest_price - (atr * self.params.stop_loss_atr)
+
+            if d.close[0] < stop_price:
+                self.close(d)
+                if self.params.debug_verbose:
                     self.log(f"🛡️ [止损触发] {d._name} 现价 {d.close[0]:.2f} < 止损线 {stop_price:.2f}")
 
         # ----------------------------
@@ -109,18 +122,15 @@ class GapUpStrategy(bt.Strategy):
         reject_stats = {'price':0, 'trend':0, 'vol':0, 'rsi':0, 'atr':0, 'passed':0}
         candidates = []
 
-        current_pos = len([d for d in self.broker.positions if self.getposition(d).size > 0])
+        current_pos = len(self._open)
         if current_pos >= self.params.max_pos:
             return
 
-        for d in self.datas:
-            # 【修复点 2】必须用 'is' 而不是 '=='
-            if d is self.spy: continue
-            
+        for d in self._tick_datas:
             if self.getposition(d).size > 0 or self.orders[d] is not None: continue
             
             # 检查个股指标是否预热完成
-            if math.isnan(self.inds[d]['sma200'][0]): continue
+            if len(d) < self._warmup: continue
 
             # --- 漏斗筛选 ---
             if d.close[0] < self.params.min_price: 
@@ -150,7 +160,7 @@ class GapUpStrategy(bt.Strategy):
                 reject_stats['atr'] += 1
 
         # 仅当有信号时打印统计
-        if len(candidates) > 0:
+        if candidates and self.params.debug_verbose:
             self.log(f"🔎 [扫描统计] 趋势不符:{reject_stats['trend']} | 无量:{reject_stats['vol']} | 没涨够:{reject_stats['atr']} | ✅通过:{reject_stats['passed']}")
 
         # ----------------------------
@@ -180,7 +190,8 @@ class GapUpStrategy(bt.Strategy):
                     data=target, size=size, exectype=bt.Order.Stop, 
                     price=trigger, valid=datetime.timedelta(days=1)
                 )
-                self.log(f"⚡ [挂单] {target._name} 现价:{target.close[0]:.2f} 触发价:{trigger:.2f} (ATR:{atr:.2f})")
+                if self.params.debug_verbose:
+                    self.log(f"⚡ [挂单] {target._name} 现价:{target.close[0]:.2f} 触发价:{trigger:.2f} (ATR:{atr:.2f})")
 
     def stop(self):
         print("\n=== 回测结束：当前持仓状态 ===")
@@ -0,0 +1,24 @@
+"""ConfigLoader 单元测试：YAML 解析缓存"""
+import os
+from config import loader
+from config.loader import ConfigLoader
+
+
+class TestConfigLoaderCache:
+    def test_cache_hit_returns_independent_copy(self, tmp_path):
+        path = tmp_path / "settings.yaml"
+        path.write_text("strategy:\n  max_pos: 10\n", encoding="utf-8")
+        a = ConfigLoader(str(path))
+        a.get_strategy_config()["max_pos"] = 99
+        b = ConfigLoader(str(path))
+        assert b.get_strategy_config()["max_pos"] == 10
+        assert os.path.abspath(str(path)) in loader._CACHE
+
+    def test_file_change_invalidates(self, tmp_path):
+        path = tmp_path / "settings.yaml"
+        path.write_text("strategy:\n  max_pos: 10\n", encoding="utf-8")
+        assert ConfigLoader(str(path)).get_strategy_config()["max_pos"] == 10
+        path.write_text("strategy:\n  max_pos: 5\n", encoding="utf-8")
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        assert ConfigLoader(str(path)).get_strategy_config()["max_pos"] == 5
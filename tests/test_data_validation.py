@@ -1,7 +1,10 @@
 """数据验证层单元测试：validate_data 行为"""
 import pandas as pd
 import pytest
-from data.manager import validate_data
+from data.manager import (
+    validate_data, select_universe, universe_files, build_ohlcv_cache, _read_csv_to_df, SharedOHLCV,
+)
+from engine.optimizer import make_worker_pool
 
 
 def _ohlc_df(rows):
@@ -65,3 +68,137 @@ class TestValidateDataZeroOhlc:
         ])
         with pytest.raises(ValueError, match="OHLC 全为 0"):
             validate_data(df, strict=True)
+
+
+class TestSelectUniverse:
+    def test_no_size_returns_all(self):
+        files = ["A.csv", "B.csv", "C.csv"]
+        assert select_universe(files, None, 7) == files
+        assert select_universe(files, 0, 7) == files
+
+    def test_no_seed_takes_first_k(self):
+        assert select_universe(["A", "B", "C", "D"], 2) == ["A", "B"]
+
+    def test_seed_sample_reproducible(self):
+        files = [f"T{i}" for i in range(50)]
+        a = select_universe(files, 10, 243)
+        b = select_universe(files, 10, 243)
+        assert a == b
+        assert len(set(a)) == 10 and set(a) <= set(files)
+
+    def test_size_larger_than_pool(self):
+        """K 不小于文件数时按原（已排序）顺序取全部，不报错"""
+        files = ["A", "B", "C"]
+        assert select_universe(files, 10, 1) == files
+        assert select_universe(files, 3, 1) == files
+
+    def test_universe_files_memo_invalidated_by_new_file(self, tmp_path):
+        """目录扫描结果被记忆，新增文件（目录 mtime 变化）后重新扫描"""
+        for t in ("SPY", "BBB", "AAA"):
+            (tmp_path / f"{t}.csv").write_text("x")
+        assert universe_files(str(tmp_path)) == ["AAA.csv", "BBB.csv"]
+        (tmp_path / "CCC.csv").write_text("x")
+        assert universe_files(str(tmp_path)) == ["AAA.csv", "BBB.csv", "CCC.csv"]
+
+
+def _write_csv(path, closes):
+    lines = ["Price,Close,High,Low,Open,Volume", "Ticker,X,X,X,X,X", "Date,,,,,"]
+    for i, c in enumerate(closes):
+        lines.append(f"2024-01-{i + 1:02d},{c},{c + 1},{c - 1},{c},1000")
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+class TestOhlcvCache:
+    def test_cache_written_and_reused(self, tmp_path):
+        csv = tmp_path / "AAA.csv"
+        _write_csv(csv, [10, 11, 12])
+        df = _read_csv_to_df(str(csv), "2024-01-01", "2024-01-31")
+        assert list(df["Close"]) == [10, 11, 12]
+        assert (tmp_path / "_cache" / "AAA.pkl").is_file()
+        again = _read_csv_to_df(str(csv), "2024-01-02", "2024-01-31")
+        assert list(again["Close"]) == [11, 12]
+
+    def test_stale_cache_rebuilt_when_csv_changes(self, tmp_path):
+        csv = tmp_path / "AAA.csv"
+        _write_csv(csv, [10, 11, 12])
+        _read_csv_to_df(str(csv), "2024-01-01", "2024-01-31")
+        _write_csv(csv, [20, 21, 22, 23])
+        df = _read_csv_to_df(str(csv), "2024-01-01", "2024-01-31")
+        assert list(df["Close"]) == [20, 21, 22, 23]
+
+    def test_build_cache_counts_files(self, tmp_path):
+        _write_csv(tmp_path / "AAA.csv", [10, 11])
+        _write_csv(tmp_path / "BBB.csv", [10, 11])
+        assert build_ohlcv_cache(str(tmp_path)) == 2
+        assert build_ohlcv_cache(str(tmp_path), tickers=["AAA"], rebuild=True) == 1
+
+
+class TestSharedOHLCV:
+    def test_worker_reads_from_shared_memory(self, tmp_path):
+        """worker 挂载共享行情后不再读盘：删除 CSV 与缓存仍能取到数据"""
+        csv = tmp_path / "AAA.csv"
+        _write_csv(csv, [10, 11, 12])
+        with SharedOHLCV([str(csv)]) as shared:
+            assert shared.n_frames == 1
+            csv.unlink()
+            for f in (tmp_path / "_cache").iterdir():
+                f.unlink()
+            with make_worker_pool(1, shared_spec=shared.spec) as pool:
+                df = pool.submit(_read_csv_to_df, str(csv), "2024-01-02", "2024-01-31").result()
+        assert list(df["Close"]) == [11, 12]
+        assert _read_csv_to_df(str(csv), "2024-01-01", "2024-01-31") is None
+
+
+class TestDownloadCoverage:
+    def _write(self, path, dates):
+        rows = "".join(f"{d},1,1,1,1,100\n" for d in dates)
+        path.write_text("Date,Open,High,Low,Close,Volume\n" + rows)
+
+    def test_covered_file_is_skipped(self, tmp_path):
+        """本地首末日已覆盖 [start, end) 时不再下载；end 为周日时以周五为末个交易日"""
+        pytest.importorskip("yfinance")
+        from data.providers.manager import _needs_download
+        path = tmp_path / "AAA.csv"
+        self._write(path, ["2024-01-02", "2024-01-03", "2024-02-02"])
+        assert _needs_download(str(path), "2024-01-01", "2024-02-04") is False
+        assert _needs_download(str(path), "2024-01-01", "2024-02-07") is True
+        assert _needs_download(str(path), "2023-12-01", "2024-02-04") is True
+        assert _needs_download(str(tmp_path / "missing.csv"), "2024-01-01", "2024-02-04") is True
+
+    def test_three_row_header_format(self, tmp_path):
+        """加载器的三行表头格式（Price / Ticker / Date）同样识别首末日，已覆盖时跳过"""
+        pytest.importorskip("yfinance")
+        from data.providers.manager import _file_date_span, _needs_download
+        path = tmp_path / "SPY.csv"
+        rows = "".join(f"{d},1,1,1,1,100\n" for d in ["2024-01-02", "2024-01-03", "2024-02-02"])
+        path.write_text("Price,Close,High,Low,Open,Volume\nTicker,SPY,SPY,SPY,SPY,SPY\nDate,,,,,\n" + rows)
+        assert _file_date_span(str(path)) == (pd.Timestamp("2024-01-02"), pd.Timestamp("2024-02-02"))
+        assert _needs_download(str(path), "2024-01-01", "2024-02-04") is False
+
+
+class TestColumnarFeed:
+    """ColumnarPandasData 整列预加载：line 缓冲与逐行加载的 PandasData 完全一致，回测中逐 bar 推进正常"""
+
+    def test_matches_row_by_row_preload(self):
+        import datetime
+        import backtrader as bt
+        import numpy as np
+        from data.manager import ColumnarPandasData
+
+        idx = pd.bdate_range("2023-01-02", periods=60)
+        close = np.linspace(10, 20, 60)
+        df = pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                           "Volume": np.arange(60) * 100}, index=idx)
+        kw = dict(dataname=df, fromdate=datetime.datetime(2023, 1, 10), todate=datetime.datetime(2023, 3, 1),
+                  openinterest=None)
+        runs = []
+        for cls in (bt.feeds.PandasData, ColumnarPandasData):
+            cerebro = bt.Cerebro(stdstats=False)
+            cerebro.adddata(cls(**kw))
+            cerebro.addstrategy(bt.Strategy)
+            data = cerebro.run()[0].datas[0]
+            runs.append([np.array(line.array) for line in data.lines] + [len(data)])
+        row, col = runs
+        assert row[-1] == col[-1] > 0
+        for a, b in zip(row[:-1], col[:-1]):
+            assert np.array_equal(a, b, equal_nan=True)
@@ -0,0 +1,38 @@
+"""免回测快速评估单元测试：面板向量化选股代理指标"""
+import numpy as np
+import pandas as pd
+import pytest
+from engine.fast_eval import FastEvaluator, fast_grid_search
+
+
+def _panel(n=320, k=6, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2023-01-02", periods=n)
+    cols = [f"T{i}" for i in range(k)]
+    close = pd.DataFrame(50 * np.cumprod(1 + rng.normal(0.001, 0.02, (n, k)), axis=0), index=idx, columns=cols)
+    spread = close * 0.01
+    volume = pd.DataFrame(rng.integers(1e6, 2e6, (n, k)).astype(float), index=idx, columns=cols)
+    spy = pd.Series(300 * np.cumprod(1 + rng.normal(0.001, 0.005, n)), index=idx)
+    return {'close': close, 'high': close + spread, 'low': close - spread, 'volume': volume, 'spy': spy}
+
+
+class TestFastEvaluator:
+    def test_returns_and_metric(self):
+        """收益序列按持有日对齐，指标为有限值；相同参数结果可复现"""
+        ev = FastEvaluator({'initial_capital': 100000, 'commission': 0.0005}, 'sharperatio', panel=_panel())
+        params = {'atr_period': 14, 'rsi_period': 14, 'min_price': 1, 'min_dollar_vol': 0, 'top_n': 2}
+        rets = ev.returns(params)
+        assert len(rets) == 319 and rets.index[0] == ev.panel['close'].index[1]
+        assert (rets.iloc[:199] == 0).all()  # MA200 预热期无持仓
+        value = ev(params)
+        assert value is not None and np.isfinite(value)
+        assert ev(params) == value
+
+    def test_grid_and_unsupported_metric(self):
+        ev = FastEvaluator({}, 'cagr', panel=_panel(seed=1))
+        best, val, results = fast_grid_search(ev, {'atr_period': [10, 20], 'risk_per_trade_pct': [0.02, 0.04]},
+                                              {'min_price': 1, 'min_dollar_vol': 0})
+        assert len(results) == 4 and best in [p for p, _ in results]
+        assert val == max(v for _, v in results if v is not None)
+        with pytest.raises(ValueError):
+            FastEvaluator({}, 'win_rate', panel=_panel())
@@ -0,0 +1,36 @@
+"""utils.jit 可选 Numba 封装单元测试"""
+import numpy as np
+from utils import jit
+
+
+class TestNjitShim:
+    def test_bare_and_called_decorator(self):
+        @jit.njit
+        def add(a, b):
+            return a + b
+
+        @jit.njit(fastmath=True)
+        def total(x):
+            s = 0.0
+            for v in x:
+                s += v
+            return s
+
+        assert add(1.0, 2.0) == 3.0
+        assert total(np.arange(4.0)) == 6.0
+
+    def test_warm_cache_runs_registered(self):
+        calls = []
+
+        def kernel(x):
+            calls.append(x)
+
+        jit.register_warmup(kernel, 1)
+        try:
+            n = jit.warm_cache()
+            if jit.HAS_NUMBA:
+                assert n >= 1 and calls == [1]
+            else:
+                assert n == 0
+        finally:
+            jit._WARMUPS.remove((kernel, (1,)))
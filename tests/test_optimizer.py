@@ -1,14 +1,20 @@
 """参数选择策略单元测试：best / plateau / robust（不依赖 sklearn/scipy）"""
+import logging
+import backtrader as bt
+import numpy as np
+import pandas as pd
 import pytest
 from engine.optimizer import (
     select_final_params,
     compute_robustness_score,
+    compute_robustness_scores,
     _params_match,
     _params_in_results,
     _snap_params_to_grid,
     _grid_param_index,
     _closest_in_list,
     _get_top_runs_by_pct_or_threshold,
+    run_bayesian_optimization,
 )
 
 
@@ -82,6 +88,22 @@ class TestSelectFinalParamsPlateauFreq:
         assert len(top2) == 2
 
 
+class TestRobustnessScoresBatched:
+    def test_matches_per_item(self):
+        """批量稳健性得分与逐条 compute_robustness_score 一致（含 None 指标）"""
+        rng = np.random.default_rng(0)
+        grid = {"a": [1, 2, 3, 4], "b": [0.1, 0.2, 0.3]}
+        results = []
+        for a in grid["a"]:
+            for b in grid["b"]:
+                v = None if rng.random() < 0.15 else float(rng.normal())
+                results.append(({"a": a, "b": b}, v))
+        for radius in (1, 2):
+            batched = compute_robustness_scores(results, grid, metric_idx=1, radius=radius)
+            single = [compute_robustness_score(i, results, grid, metric_idx=1, radius=radius) for i in range(len(results))]
+            np.testing.assert_allclose(batched, single, rtol=1e-9, atol=1e-9)
+
+
 class TestParamsHelpers:
     def test_params_match(self):
         assert _params_match({"a": 1, "b": 2}, {"a": 1, "b": 2}) is True
@@ -96,3 +118,100 @@ class TestParamsHelpers:
         out = _snap_params_to_grid({"a": 13.2, "b": 0.025}, {"a": [10, 14, 20], "b": [0.02, 0.03]})
         assert out["a"] == 14
         assert out["b"] in [0.02, 0.03]
+
+
+class TestBayesianOptimization:
+    def test_finds_peak_and_reuses_best_value(self):
+        """ask/tell 循环能找到离散最优点，返回值即最优点评估值（不额外重跑）"""
+        pytest.importorskip("skopt")
+        calls = []
+
+        def run(params):
+            calls.append(dict(params))
+            return -((params["a"] - 14) ** 2)
+
+        best, val = run_bayesian_optimization(
+            {"a": [10, 14, 20]}, {"fixed": 1}, run, n_calls=12, maximize=True, random_state=0,
+            logger=logging.getLogger("test_bayesian"),
+        )
+        assert len(calls) == 12
+        assert best == {"fixed": 1, "a": 14}
+        assert val == 0
+
+
+class _TrendFactory:
+    """可 pickle 的 cerebro 工厂：合成单标的行情 + 按 period 参数的均线策略"""
+
+    def __call__(self, params):
+        idx = pd.bdate_range("2020-01-01", periods=120)
+        close = 100 + np.cumsum(np.sin(np.arange(120) / 5.0))
+        df = pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": 1e6}, index=idx)
+        cerebro = bt.Cerebro(stdstats=False)
+        cerebro.adddata(bt.feeds.PandasData(dataname=df, openinterest=None))
+        cerebro.addstrategy(_SmaCross, period=params["period"])
+        cerebro.broker.setcash(10000.0)
+        return cerebro
+
+
+class _SmaCross(bt.Strategy):
+    params = (("period", 5),)
+
+    def __init__(self):
+        self.sma = bt.indicators.SMA(self.data.close, period=self.p.period)
+
+    def next(self):
+        if not self.position and self.data.close[0] > self.sma[0]:
+            self.buy(size=10)
+        elif self.position and self.data.close[0] < self.sma[0]:
+            self.close()
+
+
+class TestGridSearchParallel:
+    def test_parallel_matches_serial(self):
+        """多进程网格搜索与串行结果一致（顺序、指标值）"""
+        from engine.optimizer import grid_search
+        grid = {"period": [3, 5, 8, 13]}
+        log = logging.getLogger("test_grid")
+        b1, v1, r1 = grid_search(_TrendFactory(), None, grid, metric="final_value", logger=log, processes=1)
+        b2, v2, r2 = grid_search(_TrendFactory(), None, grid, metric="final_value", logger=log, processes=2)
+        assert b1 == b2 and v1 == v2
+        assert [(p, v) for p, v, _ in r1] == [(p, v) for p, v, _ in r2]
+        assert all(s is None for _, _, s in r2)
+
+
+class _WindowTrendFactory(_TrendFactory):
+    """(start, end, strategy_cls, params) 版本：按窗口截取合成行情"""
+
+    def __call__(self, start, end, strategy_cls, params):
+        idx = pd.bdate_range("2020-01-01", periods=400)
+        close = 100 + np.cumsum(np.sin(np.arange(400) / 5.0))
+        df = pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": 1e6}, index=idx)
+        df = df[(df.index >= start) & (df.index <= end)]
+        cerebro = bt.Cerebro(stdstats=False)
+        cerebro.adddata(bt.feeds.PandasData(dataname=df, openinterest=None))
+        cerebro.addstrategy(strategy_cls, period=params["period"])
+        cerebro.broker.setcash(10000.0)
+        return cerebro
+
+
+def _quadratic_metric(params):
+    return -((params["a"] - 14) ** 2)
+
+
+class TestParallelDrivers:
+    def test_wfa_parallel_matches_serial(self):
+        from engine.optimizer import walk_forward_analysis
+        args = (_WindowTrendFactory(), _SmaCross, {"period": [3, 8]}, 60, 30,
+                pd.Timestamp("2020-01-01"), pd.Timestamp("2021-06-01"), None)
+        log = logging.getLogger("test_wfa")
+        serial = walk_forward_analysis(*args, lookback_days=60, metric="final_value", logger=log, processes=1)
+        parallel = walk_forward_analysis(*args, lookback_days=60, metric="final_value", logger=log, processes=2)
+        assert serial[2] and serial == parallel
+
+    def test_bayesian_batch_parallel(self):
+        pytest.importorskip("skopt")
+        best, val = run_bayesian_optimization(
+            {"a": [10, 14, 20]}, {}, _quadratic_metric, n_calls=10, random_state=0,
+            logger=logging.getLogger("test_bayesian"), processes=2,
+        )
+        assert best == {"a": 14} and val == 0
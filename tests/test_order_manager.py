@@ -0,0 +1,72 @@
+"""OrderManager 订单跟踪单元测试：按 ref 登记、终态移除、挂单判断与撤单"""
+import datetime
+from types import SimpleNamespace
+
+import backtrader as bt
+
+from strategy.order_manager import OrderManager
+
+
+class _Data:
+    def __init__(self, name):
+        self._name = name
+
+
+class _Order:
+    _next_ref = 0
+
+    def __init__(self, data, status=bt.Order.Submitted):
+        _Order._next_ref += 1
+        self.ref = _Order._next_ref
+        self.data = data
+        self.status = status
+
+    def __eq__(self, other):  # 同 bt.Order：按 ref 比较，不可哈希
+        return other is not None and self.ref == other.ref
+
+
+class _Strat:
+    def __init__(self):
+        self.canceled = []
+        self.data = SimpleNamespace(datetime=SimpleNamespace(date=lambda ago=0: datetime.date(2024, 1, 2)))
+
+    def __len__(self):
+        return 1
+
+    def cancel(self, order):
+        self.canceled.append(order.ref)
+        order.status = bt.Order.Canceled
+
+
+class TestOrderTracking:
+    """挂单判断只看未了结的买单；终态（含过期）订单移除；撤单只撤挂单并清空该类"""
+
+    def test_pending_cancel_and_cleanup(self):
+        strat = _Strat()
+        om = OrderManager(strat, debug=False)
+        d = _Data("AAA")
+        assert not om.has_pending_order(d)
+
+        o1, o2 = _Order(d), _Order(d, status=bt.Order.Accepted)
+        om._track_order(o1, 'entries')
+        om._track_order(o2, 'exits')
+        assert om.has_pending_order(d)
+
+        # 终态（含过期）订单移除后不再算挂单
+        o1.status = bt.Order.Expired
+        om.process_status(o1)
+        assert not om.has_pending_order(d)
+        assert list(om.open_orders["AAA"]["entries"]) == []
+
+        om.cancel_all_orders(d, types=['exits'])
+        assert strat.canceled == [o2.ref]
+        assert om.open_orders["AAA"]["exits"] == {}
+
+    def test_register_names_preallocates(self):
+        om = OrderManager(_Strat(), debug=False)
+        om.register_names(["AAA", "BBB"])
+        assert om.open_orders["BBB"] == {'entries': {}, 'exits': {}}
+        o = _Order(_Data("AAA"))
+        om._track_order(o, 'entries')
+        om.register_names(["AAA"])  # 重复登记不清空已有订单
+        assert om.has_pending_order(_Data("AAA")) and not om.has_pending_order(_Data("BBB"))
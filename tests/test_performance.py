@@ -0,0 +1,75 @@
+"""绩效派生量单元测试：compute_return_stats 与逐图计算口径一致"""
+import numpy as np
+import pandas as pd
+from analysis.performance import (
+    compute_return_stats, compute_rolling_metrics, get_beta_alpha_summary, format_beta_alpha,
+)
+
+
+def _series(seed=0, n=300):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2023-01-02", periods=n)
+    rets = pd.Series(rng.normal(0.0005, 0.01, n), index=idx)
+    bench_close = pd.Series(100 * np.cumprod(1 + rng.normal(0.0003, 0.008, n + 1)),
+                            index=pd.bdate_range("2022-12-30", periods=n + 1))
+    return rets, bench_close
+
+
+class TestComputeReturnStats:
+    def test_matches_per_plot_formulas(self):
+        """净值/回撤/滚动指标/Beta 与原各函数单独计算的结果一致"""
+        rets, bench_close = _series()
+        stats = compute_return_stats(rets, bench_close=bench_close, window=60)
+        wealth = (1 + rets).cumprod()
+        close = dict(check_dtype=False, rtol=1e-5)  # 绘图序列为 float32
+        pd.testing.assert_series_equal(stats['wealth'], wealth, **close)
+        pd.testing.assert_series_equal(stats['drawdown'], (wealth - wealth.cummax()) / wealth.cummax(), **close)
+        sharpe, vol = compute_rolling_metrics(rets, window=60)
+        pd.testing.assert_series_equal(stats['rolling_sharpe'], sharpe, **close)
+        pd.testing.assert_series_equal(stats['rolling_vol'], vol, **close)
+        assert stats['wealth'].dtype == np.float32 and stats['rets'].dtype == np.float64
+        bench_rets = bench_close.pct_change().dropna()
+        assert format_beta_alpha(stats['beta']) == get_beta_alpha_summary(rets, bench_rets)
+        assert np.isclose(np.nansum(stats['monthly'].values), rets.sum())
+
+    def test_without_benchmark(self):
+        """无基准时 beta/aligned 为空，format_beta_alpha 返回空 dict"""
+        rets, _ = _series(n=20)
+        stats = compute_return_stats(rets)
+        assert stats['beta'] is None and stats['aligned'] is None
+        assert format_beta_alpha(stats['beta']) == {}
+
+
+class TestKernels:
+    def test_kernels_match_pandas(self):
+        """回撤/滚动均值标准差/Beta 内核与 pandas 口径一致"""
+        from analysis._kernels import drawdown, max_drawdown, rolling_mean_std, beta_alpha
+        rets, bench_close = _series(seed=3)
+        w = (1 + rets).cumprod()
+        expected_dd = (w - w.cummax()) / w.cummax()
+        np.testing.assert_allclose(drawdown(w.values), expected_dd.values)
+        assert np.isclose(max_drawdown(w.values), -expected_dd.min())
+        mean, std = rolling_mean_std(rets.values, 20)
+        np.testing.assert_allclose(mean, rets.rolling(20).mean().values, equal_nan=True)
+        np.testing.assert_allclose(std, rets.rolling(20).std().values, equal_nan=True)
+        mean32, std32 = rolling_mean_std(rets.values.astype(np.float32), 20)
+        assert mean32.dtype == np.float64
+        np.testing.assert_allclose(std32, std, rtol=1e-5, equal_nan=True)
+        b = bench_close.pct_change().dropna().reindex(rets.index)
+        beta, alpha, _ = beta_alpha(rets.values, b.values)
+        assert np.isclose(beta, rets.cov(b) / b.var())
+        assert np.isclose(alpha, rets.mean() - beta * b.mean())
+
+
+class TestBenchmarkCache:
+    def test_close_cached_until_file_changes(self, tmp_path):
+        """SPY 收盘价按 (路径, mtime, size) 缓存，文件更新后重读"""
+        from analysis.visualizer import load_benchmark_close
+        path = tmp_path / "SPY.csv"
+        header = "Price,Close,High,Low,Open,Volume\nTicker,SPY,,,,\nDate,,,,,\n"
+        path.write_text(header + "2024-01-02,100,101,99,100,1\n2024-01-03,101,102,100,101,1\n")
+        first = load_benchmark_close(str(path))
+        assert list(first) == [100.0, 101.0]
+        assert load_benchmark_close(str(path)) is first
+        path.write_text(header + "2024-01-02,100,101,99,100,1\n2024-01-03,105,106,104,105,1\n2024-01-04,106,107,105,106,1\n")
+        assert list(load_benchmark_close(str(path))) == [100.0, 105.0, 106.0]
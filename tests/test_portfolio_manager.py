@@ -49,6 +49,11 @@ class TestPortfolioManagerPositionSize:
         assert size >= 0
         assert size != float("inf")
 
+    def test_kwargs_forwarded_and_unknown_method(self, pm):
+        # fixed_pct 透传到 risk：20% / 50 = 400 股；未知 method 为 0
+        assert pm.calculate_position_size(100_000, 50.0, 2.0, method="fixed_fraction", fixed_pct=0.2) == 400
+        assert pm.calculate_position_size(100_000, 50.0, 2.0, method="nope") == 0
+
 
 class TestRiskModulePositionSize:
     """直接测 risk.position_size 边界"""
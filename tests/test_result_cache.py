@@ -0,0 +1,62 @@
+"""回测结果缓存单元测试：同参数只回测一次，数据变化后失效"""
+import os
+from engine import result_cache
+from engine.result_cache import cached_metric, data_signature
+
+
+class _Counter:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, params):
+        self.calls += 1
+        return params['a'] * 2.0
+
+
+def _data(tmp_path):
+    (tmp_path / "AAA.csv").write_text("Date,Open,High,Low,Close,Volume\n")
+    return {'data_dir': str(tmp_path), 'from_date': '2024-01-01', 'to_date': '2024-12-31'}
+
+
+class TestCachedMetric:
+    def test_repeat_params_hit_disk_cache(self, tmp_path):
+        data = _data(tmp_path)
+        func = _Counter()
+        cached = cached_metric(func, data, namespace='sharperatio')
+        assert cached({'a': 1, 'b': 2}) == 2.0
+        assert cached({'b': 2, 'a': 1}) == 2.0
+        assert func.calls == 1
+        assert len(os.listdir(tmp_path / "_cache" / "bt")) == 1
+        # 新实例（如下一次运行）同样命中
+        assert cached_metric(_Counter(), data, namespace='sharperatio')({'a': 1, 'b': 2}) == 2.0
+
+    def test_signature_changes_with_data(self, tmp_path):
+        data = _data(tmp_path)
+        sig = data_signature(data)
+        st = os.stat(tmp_path / "AAA.csv")
+        os.utime(tmp_path / "AAA.csv", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        assert data_signature(data) != sig
+        assert data_signature({**data, 'to_date': '2025-01-01'}) != data_signature(data)
+
+    def test_signature_changes_with_project_code(self, tmp_path, monkeypatch):
+        """仓位/数据/引擎等项目包的代码修改同样让缓存失效"""
+        pkg = tmp_path / "proj" / "portfolio"
+        pkg.mkdir(parents=True)
+        (pkg / "risk.py").write_text("x = 1\n")
+        monkeypatch.setattr(result_cache, "_PROJECT_ROOT", str(tmp_path / "proj"))
+        data = _data(tmp_path)
+        sig = data_signature(data)
+        st = os.stat(pkg / "risk.py")
+        os.utime(pkg / "risk.py", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        assert data_signature(data) != sig
+
+    def test_unloadable_entry_recomputes(self, tmp_path):
+        """缓存文件无法反序列化时退回重算，不中断优化"""
+        data = _data(tmp_path)
+        func = _Counter()
+        cached = cached_metric(func, data)
+        path = os.path.join(cached.cache_dir, cached.key({'a': 1}) + '.pkl')
+        os.makedirs(cached.cache_dir, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b"\x80\x04cno_such_module\nThing\n.")
+        assert cached({'a': 1}) == 2.0 and func.calls == 1
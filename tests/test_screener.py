@@ -26,6 +26,17 @@ class TestStockScreenerLiquidity:
         assert result == ["A"]
         assert "流动性过滤" in screener.logs[0]
 
+    def test_debug_off_skips_logs(self):
+        df = _fake_snapshot([
+            {"Symbol": "A", "Close": 15.0, "Volume": 1000, "MA200": 12.0, "RSI": 50},
+            {"Symbol": "B", "Close": 5.0, "Volume": 1000, "MA200": 4.0, "RSI": 50},
+        ])
+        screener = StockScreener(df, debug=False).filter_liquidity(min_price=10.0).filter_rsi_setup(max_rsi=70)
+        assert screener.get_result() == ["A"]
+        assert screener.logs == []
+        # 开启时步骤名按参数延迟格式化
+        assert StockScreener(df).filter_rsi_setup(0, 70).logs == ["RSI过滤(0-70): 剩余 2"]
+
     def test_filter_liquidity_min_volume(self):
         df = _fake_snapshot([
             {"Symbol": "A", "Close": 20.0, "Volume": 500, "MA200": 18.0, "RSI": 50},
@@ -59,6 +70,14 @@ class TestStockScreenerTrendAndRsi:
         screener.filter_liquidity(min_price=0).filter_trend_alignment()
         assert screener.get_result() == ["A"]
 
+    def test_filter_trend_alignment_drops_missing_ma200(self):
+        df = _fake_snapshot([
+            {"Symbol": "A", "Close": 110.0, "Volume": 1000, "MA200": 100.0, "RSI": 50},
+            {"Symbol": "B", "Close": 120.0, "Volume": 1000, "MA200": float("nan"), "RSI": 50},
+        ])
+        screener = StockScreener(df).filter_trend_alignment()
+        assert screener.get_result() == ["A"]
+
     def test_filter_rsi_setup_range(self):
         df = _fake_snapshot([
             {"Symbol": "A", "Close": 20.0, "Volume": 1000, "MA200": 18.0, "RSI": 60},
@@ -97,3 +116,309 @@ class TestStockScreenerRankAndCut:
         screener.filter_liquidity(min_price=10.0, min_volume=1)
         result = screener.get_result()
         assert result == []
+
+
+class TestStockScreenerFromArrays:
+    """由列数组构造：与 DataFrame 构造结果一致，且不修改输入数组"""
+
+    def test_from_arrays_matches_dataframe(self):
+        rows = [
+            {"Symbol": "A", "Close": 20.0, "Volume": 1000, "MA200": 15.0, "RSI": 50, "ROC_126": 0.2, "ATR_pct": 1.0},
+            {"Symbol": "B", "Close": 22.0, "Volume": 1000, "MA200": 23.0, "RSI": 40, "ROC_126": 0.1, "ATR_pct": 2.0},
+            {"Symbol": "C", "Close": 21.0, "Volume": 1000, "MA200": 14.0, "RSI": 70, "ROC_126": 0.3, "ATR_pct": 0.5},
+        ]
+        df = _fake_snapshot(rows)
+        cols = {c: df[c].to_numpy(dtype=float) for c in df.columns}
+        before = {k: v.copy() for k, v in cols.items()}
+        s_arr = StockScreener.from_arrays(df.index.to_numpy(), cols)
+        s_df = StockScreener(df)
+        for s in (s_arr, s_df):
+            s.filter_liquidity(min_price=0).filter_trend_alignment().calculate_composite_score()
+            s.rank_and_cut(top_n=2)
+        assert s_arr.get_result() == s_df.get_result() == ["C", "A"]
+        pd.testing.assert_series_equal(s_arr.get_scores(), s_df.get_scores(), check_dtype=False)
+        for k, v in cols.items():
+            assert (v == before[k]).all()
+
+
+class TestStockScreenerPipeline:
+    """apply_pipeline：掩码累积后一次取出，结果与逐步链式调用一致"""
+
+    def test_pipeline_matches_chain(self):
+        df = _fake_snapshot([
+            {"Symbol": "A", "Close": 20.0, "Volume": 1000, "MA200": 15.0, "RSI": 50},
+            {"Symbol": "B", "Close": 5.0, "Volume": 1000, "MA200": 4.0, "RSI": 50},
+            {"Symbol": "C", "Close": 21.0, "Volume": 1000, "MA200": 22.0, "RSI": 50},
+            {"Symbol": "D", "Close": 30.0, "Volume": 1000, "MA200": 20.0, "RSI": 80},
+        ])
+        steps = [("filter_liquidity", {"min_price": 10.0}), ("filter_trend_alignment", {}),
+                 ("filter_rsi_setup", {"max_rsi": 75})]
+        piped = StockScreener(df).apply_pipeline(steps)
+        chained = StockScreener(df).filter_liquidity(min_price=10.0).filter_trend_alignment().filter_rsi_setup(max_rsi=75)
+        assert piped.get_result() == chained.get_result() == ["A"]
+        assert piped.logs == chained.logs
+        assert len(piped.cols["Close"]) == 1
+
+    def test_pipeline_compacts_sparse_mask(self):
+        """初始掩码很稀疏时提前取出命中行，结果与日志同不取出"""
+        import numpy as np
+        rng = np.random.default_rng(4)
+        n = 200
+        names = np.array([f"T{i:03d}" for i in range(n)], dtype=object)
+        cols = {"PE": rng.uniform(-5, 60, n), "PB": rng.uniform(0, 8, n), "ROE": rng.uniform(-0.1, 0.3, n)}
+        cols["PE"][::7] = np.nan
+        mask = rng.random(n) < 0.08
+        steps = [("filter_valuation", {"max_pe": 40}), ("filter_pb", {"max_pb": 5}), ("filter_roe", {"min_roe": 0.05})]
+        piped = StockScreener.from_arrays(names, cols, mask=mask).apply_pipeline(steps)
+        chained = StockScreener.from_arrays(names, cols, mask=mask)
+        chained.filter_valuation(max_pe=40).filter_pb(max_pb=5).filter_roe(min_roe=0.05)
+        assert piped.get_result() == chained.get_result()
+        assert piped.logs == chained.logs
+
+    def test_pipeline_mask_precomputed(self):
+        """静态步骤先算成掩码、逐日与入场掩码相与，结果同每日跑 apply_pipeline"""
+        import numpy as np
+        rng = np.random.default_rng(5)
+        n = 50
+        names = np.array([f"T{i:02d}" for i in range(n)], dtype=object)
+        cols = {"PE": rng.uniform(-5, 60, n), "PB": rng.uniform(0, 8, n)}
+        cols["PB"][::5] = np.nan
+        steps = [("filter_valuation", {"max_pe": 40}), ("filter_pb", {"max_pb": 5})]
+        static = StockScreener.from_arrays(names, cols).pipeline_mask(steps)
+        assert len(static) == n
+        entry = rng.random(n) < 0.5
+        piped = StockScreener.from_arrays(names, cols, mask=entry).apply_pipeline(steps)
+        masked = StockScreener.from_arrays(names, cols, mask=entry & static)
+        assert masked.get_result() == piped.get_result()
+
+
+class TestMergeCandidates:
+    """merge_candidates 与 pandas concat + groupby.max + sort_values 结果一致"""
+
+    def test_matches_pandas(self):
+        import numpy as np
+        from strategy.signals import merge_candidates
+        rng = np.random.default_rng(3)
+        names = np.array([f"T{i:02d}" for i in range(12)], dtype=object)
+        screeners, series = [], []
+        for _ in range(2):
+            pick = rng.choice(len(names), 8, replace=False)
+            score = np.round(rng.uniform(0, 100, 8), 0)
+            score[0] = np.nan
+            s = StockScreener.from_arrays(names[pick], {"Score": score})
+            screeners.append(s)
+            series.append(pd.Series(score, index=names[pick]))
+        expected = pd.concat(series)
+        expected = expected.groupby(expected.index).max().sort_values(ascending=False).head(10).index.tolist()
+        assert merge_candidates(screeners, 10) == expected
+
+
+class TestEntryMasks:
+    """entry_masks 内核与 StockScreener 追涨/低吸过滤链结果一致（含 NaN 行）"""
+
+    def test_matches_screener_chain(self):
+        import numpy as np
+        from strategy._kernels import entry_masks
+        rng = np.random.default_rng(7)
+        n = 200
+        names = np.array([f"T{i:03d}" for i in range(n)], dtype=object)
+        close = rng.uniform(5, 50, n)
+        cols = {
+            "Close": close, "PrevClose": close - rng.normal(0, 1.5, n), "Volume": rng.uniform(0, 2e5, n),
+            "Volume_MA20": rng.uniform(5e4, 1.5e5, n), "MA200": close * rng.uniform(0.8, 1.2, n),
+            "ATR": rng.uniform(0.2, 2.0, n), "RSI": rng.uniform(10, 90, n),
+        }
+        for c in ("MA200", "RSI", "ATR"):
+            cols[c][rng.choice(n, 10, replace=False)] = np.nan
+        valid = ~np.isnan(cols["MA200"])
+        kw = dict(min_price=10.0, min_dollar_vol=1e5, min_avg_dollar_vol=5e5, vol_multiplier=1.2)
+        mask_b, mask_d = entry_masks(valid, cols, **kw)
+
+        common = [("filter_liquidity", dict(min_price=10.0, min_dollar_vol=1e5, min_avg_dollar_vol=5e5)),
+                  ("filter_volume_vs_ma", dict(vol_multiplier=1.2)), ("filter_trend_alignment", {})]
+        breakout = common + [("filter_gap_up", dict(threshold_atr=0.5)), ("filter_rsi_setup", dict(max_rsi=75))]
+        dip = common + [("filter_dip_setup", {})]
+        for mask, steps in ((mask_b, breakout), (mask_d, dip)):
+            expected = StockScreener.from_arrays(names, cols, mask=valid).apply_pipeline(steps).get_result()
+            assert names[mask].tolist() == expected
+            assert len(expected) > 0
+
+        # 多线程内核与单线程结果一致
+        par_b, par_d = entry_masks(valid, cols, parallel=True, **kw)
+        assert np.array_equal(par_b, mask_b) and np.array_equal(par_d, mask_d)
+
+        # 预分配缓冲：结果原地写入并原样返回
+        out = (np.empty(n, dtype=bool), np.empty(n, dtype=bool))
+        res = entry_masks(valid, cols, out=out, **kw)
+        assert res[0] is out[0] and res[1] is out[1]
+        assert np.array_equal(out[0], mask_b) and np.array_equal(out[1], mask_d)
+
+
+class TestTopIndexer:
+    """top_indexer 与 sort_indexer(...)[:k] 一致（含并列与 NaN）"""
+
+    @pytest.mark.parametrize("ascending", [True, False])
+    def test_matches_full_sort(self, ascending):
+        import numpy as np
+        from strategy.screener import sort_indexer, top_indexer
+        rng = np.random.default_rng(5)
+        for _ in range(50):
+            n = int(rng.integers(1, 80))
+            values = rng.uniform(0, 100, n)
+            if rng.random() < 0.5:
+                values = np.round(values / 10)  # 制造并列
+            values[rng.random(n) < 0.1] = np.nan
+            for k in (1, 3, 5, n):
+                assert top_indexer(values, k, ascending).tolist() == sort_indexer(values, ascending)[:k].tolist()
+
+    def test_rank_and_cut_on_pending_mask(self):
+        """rank_and_cut 直接在未取出的掩码上截断，与先取出命中行再截断结果一致"""
+        import numpy as np
+        rng = np.random.default_rng(8)
+        n = 60
+        names = np.array([f"T{i:02d}" for i in range(n)], dtype=object)
+        cols = {"Score": np.round(rng.uniform(0, 20, n)), "Close": rng.uniform(1, 2, n)}
+        mask = rng.random(n) < 0.5
+        direct = StockScreener.from_arrays(names, cols, mask=mask).rank_and_cut(top_n=7)
+        staged = StockScreener.from_arrays(names[mask], {k: v[mask] for k, v in cols.items()}).rank_and_cut(top_n=7)
+        assert direct.get_result() == staged.get_result()
+        assert np.array_equal(direct.cols["Close"], staged.cols["Close"])
+
+
+class TestTrendTemplate:
+    """filter_trend_template：融合内核与五个条件逐项比较结果一致（NaN 行剔除）"""
+
+    def test_matches_expression(self):
+        import numpy as np
+        rng = np.random.default_rng(9)
+        n = 300
+        close = rng.uniform(50, 100, n)
+        cols = {"Close": close, "MA50": close * rng.uniform(0.85, 1.05, n), "MA150": close * rng.uniform(0.8, 1.0, n),
+                "MA200": close * rng.uniform(0.75, 0.95, n), "52W_High": close * rng.uniform(1.0, 1.5, n),
+                "52W_Low": close * rng.uniform(0.5, 0.9, n)}
+        cols["MA150"][::13] = np.nan
+        names = np.array([f"T{i:03d}" for i in range(n)], dtype=object)
+        c = cols
+        expected = ((c["Close"] > c["MA50"]) & (c["MA50"] > c["MA150"]) & (c["MA150"] > c["MA200"])
+                    & (c["Close"] >= c["52W_Low"] * 1.25) & (c["Close"] >= c["52W_High"] * 0.75))
+        s = StockScreener.from_arrays(names, cols).filter_trend_template()
+        assert s.get_result() == names[expected].tolist()
+        assert 0 < expected.sum() < n
+
+
+class TestStockScreenerReset:
+    """reset 复用实例：结果与新建实例一致，日志不跨日累积"""
+
+    def test_reset_matches_fresh(self):
+        import numpy as np
+        names = np.array(["A", "B", "C"], dtype=object)
+        day1 = {"Close": np.array([20.0, 5.0, 30.0]), "Volume": np.ones(3), "MA200": np.array([15.0, 4.0, 35.0])}
+        day2 = {"Close": np.array([20.0, 25.0, 30.0]), "Volume": np.ones(3), "MA200": np.array([25.0, 4.0, 25.0])}
+        s = StockScreener.__new__(StockScreener)
+        for cols in (day1, day2):
+            s.reset(names, cols, mask=np.array([True, True, False]))
+            s.filter_liquidity(min_price=10.0).filter_trend_alignment()
+            fresh = StockScreener.from_arrays(names, cols, mask=np.array([True, True, False]))
+            fresh.filter_liquidity(min_price=10.0).filter_trend_alignment()
+            assert s.get_result() == fresh.get_result()
+            assert s.logs == fresh.logs and len(s.logs) == 2
+        assert s.get_result() == ["B"]
+
+
+class TestDivisionFreeFilters:
+    """相对强弱 / 波动率过滤改写为乘法比较后，与原除法口径结果一致"""
+
+    def test_relative_strength_and_volatility(self):
+        import numpy as np
+        rng = np.random.default_rng(21)
+        n = 200
+        prev = rng.uniform(10, 100, n)
+        close = prev * rng.uniform(0.95, 1.05, n)
+        atr = close * rng.uniform(0.01, 0.08, n)
+        names = np.array([f"T{i:03d}" for i in range(n)], dtype=object)
+        cols = {"Close": close, "PrevClose": prev, "ATR": atr}
+        rs = StockScreener.from_arrays(names, cols).filter_relative_strength(0.01).get_result()
+        assert rs == names[(close - prev) / prev > 0.01].tolist()
+        vc = StockScreener.from_arrays(names, cols).filter_volatility_control(0.05).get_result()
+        assert vc == names[atr / close <= 0.05].tolist()
+
+
+class TestCalculateWeights:
+    """risk_parity 权重与 ATR 倒数成正比、合计为 1；等权每只 1/n"""
+
+    def test_risk_parity_and_equal(self):
+        import numpy as np
+        names = np.array(["A", "B", "C"], dtype=object)
+        cols = {"ATR": np.array([1.0, 2.0, 4.0])}
+        w = StockScreener.from_arrays(names, cols).calculate_weights("risk_parity").cols["Weight"]
+        assert np.allclose(w, [4 / 7, 2 / 7, 1 / 7]) and np.isclose(w.sum(), 1.0)
+        cols_inv = {"ATR": cols["ATR"], "InvATR": 1.0 / cols["ATR"]}
+        assert np.array_equal(StockScreener.from_arrays(names, cols_inv).calculate_weights("risk_parity").cols["Weight"], w)
+        w = StockScreener.from_arrays(names, cols).calculate_weights("equal").cols["Weight"]
+        assert np.allclose(w, 1 / 3)
+
+
+class TestFilterSector:
+    """板块过滤：忽略大小写与首尾空白，缺失值不匹配；复用实例时结果随列数据更新"""
+
+    def test_matches_and_reuses_cache(self):
+        import numpy as np
+        names = np.array(["A", "B", "C", "D"], dtype=object)
+        sector = np.array([" Technology", "energy", None, "TECHNOLOGY "], dtype=object)
+        s = StockScreener.from_arrays(names, {"Sector": sector})
+        assert s.filter_sector("technology").get_result() == ["A", "D"]
+        assert s.reset(names, {"Sector": sector}).filter_sector("Energy").get_result() == ["B"]
+        other = np.array(["energy", "energy", "x", "y"], dtype=object)
+        assert s.reset(names, {"Sector": other}).filter_sector("energy").get_result() == ["A", "B"]
+
+
+class TestCompositeScore:
+    """composite_score：numba 内核与 numpy 实现逐位一致（含 NaN、列全等、RSI 越界）"""
+
+    def test_kernel_matches_numpy(self, monkeypatch):
+        import numpy as np
+        from strategy import _kernels
+        rng = np.random.default_rng(13)
+        n = 300
+        roc = rng.normal(0, 0.3, n)
+        rsi = rng.uniform(-10, 110, n)
+        pct = rng.normal(0, 1, n)
+        for a in (roc, rsi, pct):
+            a[rng.choice(n, 15, replace=False)] = np.nan
+        mask = rng.random(n) < 0.7
+        cases = [([roc, rsi, pct], [0.4, 0.3, 0.3], [False, True, False]),
+                 ([np.full(n, 2.0), rsi], [0.5, 0.5], [False, True])]
+        for columns, weights, is_rsi in cases:
+            got = _kernels.composite_score(columns, weights, is_rsi, mask)
+            monkeypatch.setattr(_kernels, "HAS_NUMBA", False)
+            expected = _kernels.composite_score(columns, weights, is_rsi, mask)
+            monkeypatch.undo()
+            assert np.array_equal(got, expected, equal_nan=True)
+
+
+class TestColumnLookup:
+    """基本面列名匹配不区分大小写，精确列名优先"""
+
+    def test_case_insensitive(self):
+        import numpy as np
+        names = np.array(["A", "B", "C"], dtype=object)
+        s = StockScreener.from_arrays(names, {"Pe": np.array([10.0, 80.0, np.nan])})
+        assert s.filter_pe(max_pe=30).get_result() == ["A", "C"]
+        s = StockScreener.from_arrays(names, {"pe": np.array([10.0, 80.0, 5.0]), "PE": np.array([90.0, 20.0, 5.0])})
+        assert s.filter_pe(max_pe=30).get_result() == ["B", "C"]
+
+
+class TestNarrowRange:
+    """NR 多周期一次过滤与逐个 filter_narrow_range 结果一致"""
+
+    def test_multi_matches_chain(self):
+        import numpy as np
+        rng = np.random.default_rng(17)
+        n = 100
+        names = np.array([f"T{i:03d}" for i in range(n)], dtype=object)
+        r = rng.uniform(0.5, 2.0, n)
+        cols = {"Range": r, "MinRange4": r * rng.uniform(0.9, 1.2, n), "MinRange7": r * rng.uniform(0.8, 1.1, n)}
+        multi = StockScreener.from_arrays(names, cols).filter_narrow_range_multi((4, 7, 14))
+        chained = StockScreener.from_arrays(names, cols).filter_narrow_range(4).filter_narrow_range(7)
+        assert multi.get_result() == chained.get_result()
+        assert multi.logs[-1].startswith("NR4/7收缩形态")
@@ -1,7 +1,14 @@
 """通用辅助函数"""
 import datetime
+from functools import lru_cache
 
 
 def parse_date(date_str):
     """YAML 日期字符串 -> datetime"""
-    return datetime.datetime.strptime(str(date_str), "%Y-%m-%d")
+    return _parse_ymd(str(date_str))
+
+
+@lru_cache(maxsize=1024)
+def _parse_ymd(text):
+    # 优化/批量回测会反复解析同几个起止日期：按字符串缓存（datetime 不可变，可直接共享）
+    return datetime.datetime.strptime(text, "%Y-%m-%d")
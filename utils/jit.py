@@ -0,0 +1,58 @@
+"""
+可选 Numba 加速：安装 numba 时用 njit 编译数值内核，未安装时退化为原 Python 函数。
+- 默认 cache=True：编译产物写入 __pycache__，之后每次 CLI 启动直接加载，免去 1~3s/函数 的 JIT 编译
+- 内核可用 register_warmup 登记一组小样本参数，warm_cache() 在入口处统一触发编译/加载
+- 环境变量 QUANT_DISABLE_NUMBA=1 可强制走纯 Python/numpy 路径（便于对比与排查）
+- prange：并行内核的循环区间，未安装 numba 时即内置 range
+"""
+import os
+
+try:
+    from numba import njit as _numba_njit, prange
+    HAS_NUMBA = os.environ.get('QUANT_DISABLE_NUMBA', '') != '1'
+except ImportError:
+    _numba_njit = None
+    prange = range
+    HAS_NUMBA = False
+
+_WARMUPS = []
+
+
+def njit(*args, **kwargs):
+    """
+    与 numba.njit 用法相同（@njit 或 @njit(fastmath=True)），默认 cache=True。
+    未安装 numba 时原样返回函数。
+    """
+    kwargs.setdefault('cache', True)
+
+    def _wrap(fn):
+        if not HAS_NUMBA:
+            return fn
+        return _numba_njit(**kwargs)(fn)
+
+    if len(args) == 1 and callable(args[0]):
+        return _wrap(args[0])
+    return _wrap
+
+
+def register_warmup(fn, *args):
+    """登记内核的预热参数（小样本即可），供 warm_cache 调用。"""
+    _WARMUPS.append((fn, args))
+    return fn
+
+
+def warm_cache():
+    """
+    用登记的小样本调用各内核，首次运行触发编译并落盘缓存，之后仅加载缓存。
+    未安装 numba 或设置 QUANT_WARM_CACHE=0 时跳过。返回实际预热的内核数。
+    """
+    if not HAS_NUMBA or os.environ.get('QUANT_WARM_CACHE', '') == '0':
+        return 0
+    n = 0
+    for fn, args in _WARMUPS:
+        try:
+            fn(*args)
+            n += 1
+        except Exception:
+            pass
+    return n
@@ -20,13 +20,14 @@ class Logger:
     _instance = None
 
     def __new__(cls, *args, **kwargs):
-        if not cls._instance:
-            cls._instance = super(Logger, cls).__new__(cls)
+        # 单例：只在首次创建时初始化，之后 Logger() 直接返回同一实例（参数忽略）
+        if cls._instance is None:
+            inst = super(Logger, cls).__new__(cls)
+            inst._init(*args, **kwargs)
+            cls._instance = inst
         return cls._instance
 
-    def __init__(self, log_dir='logs', file_name=None, console_level=logging.INFO, file_level=logging.DEBUG, quiet_console_init=False, retain_count=10):
-        if hasattr(self, 'initialized'):
-            return
+    def _init(self, log_dir='logs', file_name=None, console_level=logging.INFO, file_level=logging.DEBUG, quiet_console_init=False, retain_count=10):
         # Windows 下控制台默认 gbk，含 emoji/中文时易报 UnicodeEncodeError，统一用 utf-8
         if sys.platform == 'win32' and getattr(sys.stdout, 'buffer', None) is not None:
             try:
@@ -56,7 +57,6 @@ class Logger:
         self.logger.addHandler(console_handler)
         self.start_time = time.time()
         self.last_progress_update = 0
-        self.initialized = True
         if quiet_console_init:
             self.logger.debug(f"日志系统启动: {self.log_path}")
         else:
@@ -99,6 +99,8 @@ class Logger:
         self.logger.warning(f"⚠️ {msg}")
 
     def log_trade(self, dt, action, ticker, price, size, pnl=0.0, comm=0.0):
+        if not self.logger.isEnabledFor(logging.INFO):
+            return  # INFO 未开启时不格式化成交记录
         pnl_str = f"| PnL: {pnl:+.2f}" if pnl != 0 else ""
         msg = f"🛒 [TRADE] {dt} | {action:<4} | {ticker:<5} | @{price:.2f} | Vol:{size} | Comm:{comm:.2f} {pnl_str}"
         self.logger.info(msg)